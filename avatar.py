@@ -0,0 +1,59 @@
+# 头像处理：只在用户选了新头像时才导入 (Pillow 更是用到时才加载)
+import os
+import shutil # 用于复制文件
+
+# ==========================================
+# 头像缩略图
+# 原图只解码一次，居中裁成正方形，存成一张小 JPEG 放在本地
+# 写入页打开时读的是几 KB 的缩略图，而不是几 MB 的原图
+# Pillow 是可选依赖：没有安装或解不开这张图片时，退回直接复制原图
+# ==========================================
+AVATAR_DISPLAY_SIZE = 240 # 写入页显示 120，按 2x 屏存一份就够清楚
+
+def _remove_quietly(*paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def _copy_original(src_path, dst_dir, stem):
+    """退回方案：不做缩略图，直接用原图的一份副本"""
+    _, ext = os.path.splitext(src_path)
+    dst_path = os.path.join(dst_dir, f"{stem}{ext}")
+    try:
+        shutil.copy(src_path, dst_path)
+    except Exception:
+        _remove_quietly(dst_path) # 复制了一半 (比如空间不够) 的文件不留下
+        raise
+    return dst_path
+
+def make_avatar_thumbnail(src_path, dst_dir, stem):
+    """生成缩略图，返回文件路径
+    失败时已经写出的文件在这里删掉再抛出，调用方拿不到路径，也就没法替它清理"""
+    try:
+        from PIL import Image, ImageOps # 可选依赖，用到时才加载
+    except ImportError:
+        return _copy_original(src_path, dst_dir, stem)
+
+    size = AVATAR_DISPLAY_SIZE
+    try:
+        with Image.open(src_path) as img:
+            # JPEG 直接按缩小比例解码，省内存也快很多
+            img.draft("RGB", (size * 2, size * 2))
+            img = ImageOps.exif_transpose(img) # 手机照片的旋转信息
+            thumb = ImageOps.fit(img.convert("RGB"), (size, size), Image.LANCZOS)
+    except OSError as ex:
+        # Pillow 解不开的图片 (比如相册里的 HEIC，UnidentifiedImageError 也是 OSError)
+        # 和以前一样直接复制原图，Flet 自己能显示的格式照常显示
+        print(f"头像无法生成缩略图，改用原图: {ex}")
+        return _copy_original(src_path, dst_dir, stem)
+    path = os.path.join(dst_dir, f"{stem}_{size}.jpg")
+    try:
+        # 先写临时文件再改名，别人永远读不到写了一半的图片
+        thumb.save(path + ".tmp", "JPEG", quality=85, optimize=True)
+        os.replace(path + ".tmp", path)
+    except Exception:
+        _remove_quietly(path + ".tmp", path)
+        raise
+    return path
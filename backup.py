@@ -0,0 +1,255 @@
+# 备份：流式 JSON 导入导出 + 紧凑快照 (.omnis)
+# 只在设置页点导入/导出时才导入这个模块 (struct/zlib/array 不拖慢启动)
+import json
+import datetime
+import struct # 用于紧凑快照的二进制头
+import zlib   # 用于紧凑快照压缩
+import sys
+from array import array # 用于紧凑快照的定长数值列
+from itertools import accumulate # 用于快照解码时算每条记录的事件起点
+from storage import make_timestamp
+
+# ==========================================
+# 流式 JSON 导入
+# 每次只读一小块，逐条解析、校验，不一次性 json.load 整个文件
+# ==========================================
+def iter_json_array(f, chunk_size=1 << 16):
+    """增量解析顶层 JSON 数组，逐个产出元素"""
+    decoder = json.JSONDecoder()
+    buf, pos, eof = "", 0, False
+    state = "start" # start -> first/item -> sep -> item ...
+
+    def read_more():
+        nonlocal buf, pos, eof
+        more = f.read(chunk_size)
+        if not more: eof = True
+        buf, pos = buf[pos:] + more, 0
+
+    while True:
+        while pos < len(buf) and buf[pos] in " \t\r\n": pos += 1
+        if pos >= len(buf):
+            if eof: raise ValueError("备份文件不完整")
+            read_more()
+            continue
+        ch = buf[pos]
+        if state == "start":
+            if ch != "[": raise ValueError("备份文件必须是 JSON 数组")
+            pos += 1
+            state = "first"
+        elif state == "sep":
+            if ch == "]": return
+            if ch != ",": raise ValueError(f"备份文件格式错误 (位置 {pos})")
+            pos += 1
+            state = "item"
+        else:
+            if state == "first" and ch == "]": return
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof: raise
+                read_more() # 元素被块边界截断了，再读一块
+                continue
+            if not eof:
+                # 元素后面还没读到 , 或 ] 就再读一块重新解析：
+                # 数字可能被块边界截断 ("-0.5e-3" 截成 "-0.5e" 时会先解析出 -0.5)
+                rest = end
+                while rest < len(buf) and buf[rest] in " \t\r\n": rest += 1
+                if rest == len(buf) or buf[rest] not in ",]":
+                    read_more()
+                    continue
+            yield obj
+            pos = end
+            state = "sep"
+
+def validate_log_entry(raw):
+    """校验并规范化一条导入的记录，不合法返回 None
+    strptime 也接受 1.2.2025、9:5 这样的写法，保存前统一成 App 自己写的 dd.mm.yyyy / HH:MM"""
+    if not isinstance(raw, dict): return None
+    log_id = raw.get("id")
+    if isinstance(log_id, bool) or not isinstance(log_id, int): return None
+    try:
+        date_str = datetime.datetime.strptime(str(raw.get("date_str")), "%d.%m.%Y").strftime("%d.%m.%Y")
+        time_str = datetime.datetime.strptime(str(raw.get("time_str") or "00:00"), "%H:%M").strftime("%H:%M")
+    except ValueError:
+        return None
+    rating = raw.get("rating", 0)
+    if isinstance(rating, bool) or not isinstance(rating, int) or not 0 <= rating <= 5: return None
+    events = raw.get("events") or []
+    if not isinstance(events, list) or not all(isinstance(ev, str) for ev in events): return None
+    return {
+        "id": log_id,
+        "date_str": date_str,
+        "time_str": time_str,
+        "rating": rating,
+        "events": events,
+        "ts": make_timestamp(date_str, time_str),
+    }
+
+# ==========================================
+# 流式 JSON 导出
+# 一条一条写进文件，不先拼出整段历史的大字符串，低内存手机也不会卡
+# ==========================================
+def export_logs_json(f, chunks, compact=False, on_progress=None):
+    """把按分片产出的记录写成 JSON 数组；compact=True 时不缩进 (每行一条)
+    on_progress(已写条数) 每写完一个分片回调一次；返回写入总条数"""
+    written = 0
+    f.write("[")
+    for entries in chunks:
+        for entry in entries:
+            if compact:
+                text = json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
+            else:
+                # 和 json.dump(..., indent=2) 的排版保持一致：整体再缩进两格
+                text = json.dumps(entry, ensure_ascii=False, indent=2).replace("\n", "\n  ")
+            f.write(("," if written else "") + "\n  " + text)
+            written += 1
+        if on_progress: on_progress(written)
+    f.write("\n]" if written else "]")
+    return written
+
+# ==========================================
+# 紧凑快照 (.omnis)：列式二进制备份格式
+# 头部：b"OMNS" + 版本(u8) + 标志(u8，bit0=zlib 压缩)
+# 正文：记录数 N，然后按列存放 (全部小端)：
+#   id(int64) / ts(int64) / 评分(uint8) / 事件数(uint16) / 事件引用(uint32)
+#   日期、时间引用(uint32，和 ts 一致的标准格式存 NONE，否则引用原字符串)
+#   字符串表：条数 + 每条长度(uint32) + 拼接在一起的 UTF-8
+# 重复的 key 和重复的事件文字都只存一次，文件比 JSON 小很多 (约 1/20)
+# 这只是体积上的格式：解码和 json.loads 差不多快 (2 万条都是 40 多 ms)，恢复并不更快
+# (解码时按天/按分钟缓存日期时间的格式化结果，只是为了不比 json.loads 慢)
+# ==========================================
+SNAPSHOT_MAGIC = b"OMNS"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_ZLIB = 0x01
+SNAPSHOT_NONE = 0xFFFFFFFF # 引用列里表示“没有”
+
+def _le(arr):
+    """数组统一转成小端字节"""
+    if sys.byteorder == "big":
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+def _read_column(body, offset, typecode, count):
+    arr = array(typecode)
+    size = arr.itemsize * count
+    if offset + size > len(body): raise ValueError("快照文件不完整")
+    arr.frombytes(body[offset:offset + size])
+    if sys.byteorder == "big": arr.byteswap()
+    return arr, offset + size
+
+def format_timestamp(ts):
+    """整数 ts -> (dd.mm.yyyy, HH:MM)"""
+    minute, hour = ts % 100, ts // 100 % 100
+    day, month, year = ts // 10**4 % 100, ts // 10**6 % 100, ts // 10**8
+    return f"{day:02d}.{month:02d}.{year}", f"{hour:02d}:{minute:02d}"
+
+def encode_snapshot(entries, compress=True):
+    """把记录编码成紧凑快照 (bytes)；entries 可以是任意可迭代对象，只遍历一次"""
+    strings, string_ids = [], {}
+    def ref(text):
+        if text not in string_ids:
+            string_ids[text] = len(strings)
+            strings.append(text)
+        return string_ids[text]
+
+    ids, stamps = array("q"), array("q")
+    ratings, event_counts, event_refs = array("B"), array("H"), array("I")
+    date_refs, time_refs = array("I"), array("I")
+    for entry in entries:
+        date_str, time_str = str(entry.get("date_str", "")), str(entry.get("time_str", ""))
+        ts = entry.get("ts") or make_timestamp(date_str, time_str)
+        ids.append(entry.get("id"))
+        stamps.append(ts)
+        ratings.append(entry.get("rating") or 0)
+        events = entry.get("events") or []
+        event_counts.append(len(events))
+        event_refs.extend(ref(str(ev)) for ev in events)
+        # 标准格式的日期时间可以从 ts 还原，不用再存一遍
+        if ts and format_timestamp(ts) == (date_str, time_str):
+            date_refs.append(SNAPSHOT_NONE)
+            time_refs.append(SNAPSHOT_NONE)
+        else:
+            date_refs.append(ref(date_str))
+            time_refs.append(ref(time_str))
+
+    encoded = [text.encode("utf-8") for text in strings]
+    lengths = array("I", (len(b) for b in encoded))
+    body = b"".join([
+        struct.pack("<I", len(ids)),
+        _le(ids), _le(stamps), _le(ratings), _le(event_counts),
+        struct.pack("<I", len(event_refs)), _le(event_refs),
+        _le(date_refs), _le(time_refs),
+        struct.pack("<I", len(lengths)), _le(lengths), b"".join(encoded),
+    ])
+    flags = 0
+    if compress:
+        body = zlib.compress(body, 6)
+        flags |= SNAPSHOT_ZLIB
+    return SNAPSHOT_MAGIC + struct.pack("<BB", SNAPSHOT_VERSION, flags) + body
+
+def decode_snapshot(data):
+    """解码紧凑快照，返回记录列表 (和 JSON 备份里的记录同结构)
+    文件截断/损坏 (长度、引用越界、解压失败) 一律报 ValueError("快照文件不完整")"""
+    if data[:4] != SNAPSHOT_MAGIC: raise ValueError("不是 My Omnis 快照文件")
+    try:
+        return _decode_snapshot_body(data)
+    except (struct.error, zlib.error, UnicodeDecodeError) as ex:
+        raise ValueError("快照文件不完整") from ex
+
+def _decode_snapshot_body(data):
+    version, flags = struct.unpack_from("<BB", data, 4)
+    if version != SNAPSHOT_VERSION: raise ValueError(f"不支持的快照版本: {version}")
+    body = data[6:]
+    if flags & SNAPSHOT_ZLIB: body = zlib.decompress(body)
+
+    (count,) = struct.unpack_from("<I", body, 0)
+    offset = 4
+    ids, offset = _read_column(body, offset, "q", count)
+    stamps, offset = _read_column(body, offset, "q", count)
+    ratings, offset = _read_column(body, offset, "B", count)
+    event_counts, offset = _read_column(body, offset, "H", count)
+    (ref_count,) = struct.unpack_from("<I", body, offset)
+    event_refs, offset = _read_column(body, offset + 4, "I", ref_count)
+    date_refs, offset = _read_column(body, offset, "I", count)
+    time_refs, offset = _read_column(body, offset, "I", count)
+    (string_count,) = struct.unpack_from("<I", body, offset)
+    lengths, offset = _read_column(body, offset + 4, "I", string_count)
+    if offset + sum(lengths) > len(body): raise ValueError("快照文件不完整")
+    strings = []
+    for length in lengths:
+        strings.append(body[offset:offset + length].decode("utf-8"))
+        offset += length
+
+    # 引用越界 = 文件坏了 (NONE 只允许出现在日期/时间列)
+    if sum(event_counts) > ref_count: raise ValueError("快照文件不完整")
+    if ref_count and max(event_refs) >= string_count: raise ValueError("快照文件不完整")
+    for refs in (date_refs, time_refs):
+        if any(r >= string_count for r in refs if r != SNAPSHOT_NONE): raise ValueError("快照文件不完整")
+
+    # 日期/时间：按天、按分钟缓存格式化结果，同一天的记录只格式化一次
+    date_cache, time_cache = {}, {}
+    def date_of(ts):
+        day = ts // 10**4
+        text = date_cache.get(day)
+        if text is None:
+            text = date_cache[day] = f"{day % 100:02d}.{day // 100 % 100:02d}.{day // 10**4}"
+        return text
+    def time_of(ts):
+        hm = ts % 10**4
+        text = time_cache.get(hm)
+        if text is None:
+            text = time_cache[hm] = f"{hm // 100:02d}:{hm % 100:02d}"
+        return text
+    dates = [date_of(ts) if r == SNAPSHOT_NONE else strings[r] for ts, r in zip(stamps, date_refs)]
+    times = [time_of(ts) if r == SNAPSHOT_NONE else strings[r] for ts, r in zip(stamps, time_refs)]
+
+    # 事件引用先整体换成字符串，再按每条的事件数切片
+    all_events = [strings[r] for r in event_refs]
+    starts = accumulate(event_counts, initial=0)
+    return [
+        {"id": log_id, "date_str": date_str, "time_str": time_str, "rating": rating,
+         "events": all_events[start:start + n], "ts": ts}
+        for log_id, ts, rating, n, date_str, time_str, start
+        in zip(ids, stamps, ratings, event_counts, dates, times, starts)
+    ]
@@ -0,0 +1 @@
+# 测试从仓库根目录导入 theme、storage 等模块：根目录的 conftest.py 让 pytest 把这里加进 sys.path
@@ -0,0 +1,1015 @@
+import flet as ft
+import datetime # 引入时间处理模块
+import json # 用于存取事件列表
+import os     # 用于处理路径
+import bisect # 用于维护有序索引
+import threading # 用于防抖搜索
+import time
+from collections import OrderedDict # 用于 LRU 缓存
+from pathlib import Path
+from storage import LogRepository, make_timestamp
+
+# ==========================================
+# 防抖器：连续触发时只执行最后一次
+# 停止输入 delay 秒后在后台线程执行 action，被新输入取代的任务直接丢弃
+# action 会收到 is_current()，耗时操作做完后再确认一次自己还是不是最新的
+# ==========================================
+class Debouncer:
+    def __init__(self, delay, action):
+        self.delay = delay
+        self.action = action
+        self._generation = 0
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def trigger(self):
+        with self._lock:
+            self._generation += 1
+            if self._timer: self._timer.cancel()
+            self._timer = threading.Timer(self.delay, self._fire, args=(self._generation,))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def cancel(self):
+        with self._lock:
+            self._generation += 1
+            if self._timer: self._timer.cancel()
+            self._timer = None
+
+    def _fire(self, generation):
+        is_current = lambda: generation == self._generation
+        if is_current():
+            self.action(is_current)
+
+# ==========================================
+# LRU 缓存：超过容量时淘汰最久没用过的
+# ==========================================
+class LRUCache:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._items = OrderedDict()
+
+    def get(self, key):
+        if key not in self._items: return None
+        self._items.move_to_end(key)
+        return self._items[key]
+
+    def put(self, key, value):
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.capacity:
+            self._items.popitem(last=False)
+
+    def values(self):
+        return list(self._items.values())
+
+    def rekey(self, old_key, new_key):
+        """对象已原地修补过，换个 key 继续用"""
+        value = self._items.pop(old_key, None)
+        if value is not None: self.put(new_key, value)
+
+
+# ---------------------------------------------------
+# 页面 1: 吞吞日志 (Storage + Timeline + 动态主题版)
+# ---------------------------------------------------
+def build_log_view(ctx):
+    # 共享状态都从 ctx (AppContext) 取
+    page = ctx.page
+    app_storage = ctx.storage
+    log_repo = ctx.log_repo
+    get_app_colors = ctx.get_app_colors
+    icon_preference = ctx.icon_preference
+    sort_preference = ctx.sort_preference
+    view_hooks = ctx.view_hooks
+
+    colors = get_app_colors() # 获取动态颜色
+
+    # --- 1. 数据库初始化 (已移除，改用 Client Storage) ---
+    # 这一步不需要了，Flet 会自动管理 page.client_storage
+
+    # --- 2. 状态变量 ---
+    # 默认选中今天
+    today = datetime.datetime.now()
+    current_view_month = [today.year, today.month] # 用于筛选视图 [年, 月]
+    
+    # 写入模式的状态
+    write_date_val = [today.strftime("%d.%m.%Y")]
+    write_time_val = [today.strftime("%H:%M")]
+    write_rating = [0] # 0-5 星
+    
+    # --- 3. UI 控件定义 (预创建) ---
+    
+    # 3.1 顶部筛选器 (Filter)
+    filter_label = ft.Text(f"{today.year}年 {today.month}月", size=18, weight="bold", color=colors["text"])
+    
+    # 3.2 列表容器 (Timeline) - 增加滚动监听
+    # 【优化】：改用 ListView + 分页，先渲染一屏，滚到底部附近再追加下一页
+    # 这样搜索出整段历史时，控件数量和推给客户端的数据量也是有上限的
+    TIMELINE_PAGE_SIZE = 12
+    timeline_results = [[]] # 当前筛选结果 (只存数据，不存控件)
+    rendered_count = [0]    # 已经渲染成卡片的条数
+    rendered_window = [0]   # 已加载的页数 x 每页条数：新增卡片也不会让渲染的卡片超过它
+    # 【优化】：按 id 记住已渲染的卡片，新增/删除只插入/移除那一张
+    rendered_cards = {}     # id -> {"card": 卡片, "star": 评分文字, "rating": 分数, "key": 缓存key}
+    timeline_footer = [None] # “已经到底啦”提示，没有则为 None
+    # 【优化】：卡片工厂缓存，key = (id, 内容哈希, 主题, 图标偏好)
+    # 来回翻月、清空搜索框时直接复用已经建好的卡片，不重新分配整棵控件树
+    card_cache = LRUCache(300)
+
+    def on_log_scroll(e: ft.OnScrollEvent):
+        # 【核心修改】：当开始滚动时，把焦点强行给“记一笔”按钮(write_btn)，
+        # 这样搜索框就会失去焦点，键盘收起，光标消失。
+        if e.event_type == "start":
+            write_btn.focus()
+        # 距离底部不到 400 像素就加载下一页
+        if e.max_scroll_extent is not None and e.pixels >= e.max_scroll_extent - 400:
+            append_next_page()
+
+    log_list = ft.ListView(
+        expand=True, 
+        spacing=15,
+        on_scroll=on_log_scroll
+    )
+
+    # 3.3 写入页面的控件
+    # 日期/时间选择器 (复用 Overlay 逻辑)
+    def on_log_date_change(e):
+        if log_date_picker.value:
+            d = log_date_picker.value.strftime("%d.%m.%Y")
+            btn_date_display.text = d
+            write_date_val[0] = d
+            btn_date_display.update()
+    
+    def on_log_time_change(e):
+        if log_time_picker.value:
+            t = log_time_picker.value.strftime("%H:%M")
+            btn_time_display.text = t
+            write_time_val[0] = t
+            btn_time_display.update()
+
+    log_date_picker = ft.DatePicker(on_change=on_log_date_change)
+    log_time_picker = ft.TimePicker(on_change=on_log_time_change)
+    # 注意：Overlay 需要在 build 时确保不重复，这里先存着，等显示时挂载
+
+    # 3.4 搜索框
+    search_input = ft.TextField(
+        hint_text="搜索记录...", 
+        prefix_icon="search",
+        border_radius=30, # 胶囊形状
+        height=36, 
+        content_padding=10, 
+        text_size=14, 
+        bgcolor=colors["card"], 
+        border_color="grey300",
+        # 【优化】：输入变动时走防抖搜索，快速打字只渲染最后一次的结果
+        on_change=lambda e: search_debouncer.trigger()
+    )
+
+    # 用于转移焦点的隐形按钮 (解决光标闪烁问题)
+    dummy_focus_node = ft.IconButton(icon="check", visible=False) 
+    
+    # --- 头像管理逻辑 ---
+    # 1. 定义头像容器 (Ref) 方便更新内容
+    avatar_content = ft.Ref[ft.Container]()
+    avatar_shown_path = [app_storage.get("user_avatar")] # 当前显示的头像路径，没变就不重建 Image
+    avatar_job = [0] # 头像导入任务编号，新选的图片会让旧任务作废
+    avatar_lock = threading.Lock()
+
+    def delete_file(path):
+        if path and os.path.exists(path):
+            try:
+                os.remove(path) # 【核心】：物理删除文件
+                print(f"已删除旧文件: {path}")
+            except Exception as e:
+                print(f"删除旧文件失败: {e}")
+
+    def safe_delete_old_avatar():
+        """安全删除旧头像文件"""
+        delete_file(app_storage.get("user_avatar"))
+
+    def migrate_avatar_files():
+        """【迁移】：之前的版本把每个尺寸的缩略图都记在 user_avatar_files 里
+        现在只存 user_avatar 这一个文件：正在显示的留下，其余删掉，再删掉这个 key (只做一次)"""
+        with avatar_lock:
+            old_files = app_storage.get("user_avatar_files")
+            if old_files is None: return
+            current = app_storage.get("user_avatar")
+            for path in json.loads(old_files):
+                if path != current: delete_file(path)
+            app_storage.remove("user_avatar_files")
+
+    # 和头像显示无关，放到后台，不占首屏
+    threading.Thread(target=migrate_avatar_files, daemon=True).start()
+    
+    def load_avatar():
+        """从存储加载头像"""
+        path = app_storage.get("user_avatar")
+        if path and os.path.exists(path):
+            return ft.Image(
+                src=path, # 不需要加 ?t=... 了，因为文件名变了
+                width=120, 
+                height=120, 
+                border_radius=60, 
+                fit=ft.ImageFit.COVER, # 居中填满，这就是目前的“自动裁剪”
+                error_content=ft.Icon("broken_image", size=40, color="grey400") 
+            )
+        else:
+            return ft.Icon("pets", size=60, color="grey400")
+
+    def update_avatar_view():
+        """刷新头像显示 (路径没变就什么都不做)"""
+        path = app_storage.get("user_avatar")
+        if avatar_content.current and path != avatar_shown_path[0]:
+            avatar_shown_path[0] = path
+            avatar_content.current.content = load_avatar()
+            avatar_content.current.update()
+
+    def import_avatar(src_path, job):
+        """后台线程：生成缩略图，完成后 (且没有被更新的选择取代) 再一次性换上"""
+        from avatar import make_avatar_thumbnail # 用到才导入
+        path = None
+        try:
+            # 1. 准备新路径
+            # 使用时间戳作为文件名的一部分，彻底解决缓存不刷新的问题！
+            # 例如: tuntun_avatar_1721534123_240.jpg
+            stem = f"tuntun_avatar_{int(time.time() * 1000)}"
+            
+            # 2. 【优化】：解码一次原图，只生成写入页显示用的那一张缩略图 (原图不再复制保留)
+            # 【核心修改】：使用 Path.home() 确保安卓路径可写
+            path = make_avatar_thumbnail(src_path, str(Path.home()), stem)
+
+            with avatar_lock:
+                if job != avatar_job[0]:
+                    # 处理期间用户又选了别的图片，这次的结果作废
+                    delete_file(path)
+                    return
+                # 3. 新文件就绪后才清理旧头像，然后一次性切换存储和界面
+                safe_delete_old_avatar()
+                app_storage.set("user_avatar", path) 
+                update_avatar_view()
+            
+        except Exception as ex:
+            delete_file(path)
+            with avatar_lock:
+                if job != avatar_job[0]: return
+                avatar_shown_path[0] = False # 强制恢复显示旧头像
+                update_avatar_view()
+            page.snack_bar = ft.SnackBar(ft.Text(f"头像处理失败: {str(ex)}"), bgcolor="red")
+            page.snack_bar.open = True
+            page.update()
+
+    def on_avatar_picked(e: ft.FilePickerResultEvent):
+        """图片选择回调：立即关闭弹窗并显示加载状态，处理放到后台"""
+        if e.files:
+            with avatar_lock:
+                avatar_job[0] += 1
+                job = avatar_job[0]
+            # 占位：处理期间头像位置显示转圈
+            if avatar_content.current:
+                avatar_content.current.content = ft.ProgressRing(width=40, height=40, stroke_width=3)
+                avatar_shown_path[0] = False # False = 正在显示占位，不是任何头像
+            page.dialog.open = False
+            page.update()
+            threading.Thread(target=import_avatar, args=(e.files[0].path, job), daemon=True).start()
+
+    def remove_avatar(e):
+        """恢复默认 (同时删除文件)"""
+        with avatar_lock:
+            avatar_job[0] += 1 # 正在处理的导入任务也一并作废
+        # 1. 物理删除文件
+        safe_delete_old_avatar()
+        
+        # 2. 移除存储记录
+        app_storage.remove("user_avatar")
+        
+        # 3. 刷新界面
+        update_avatar_view()
+        page.dialog.open = False
+        page.update()
+
+    avatar_picker = ft.FilePicker(on_result=on_avatar_picked)
+    # 【修改】：视图只构建一次，构建时就把 picker 挂到 overlay (视图缓存会记下它们)
+    page.overlay.extend([log_date_picker, log_time_picker, avatar_picker])
+
+    btn_date_display = ft.Text(today.strftime("%d.%m.%Y"), size=16, color=colors["blue"])
+    btn_time_display = ft.Text(today.strftime("%H:%M"), size=16, color=colors["blue"])
+    
+    # 星星打分 (5个 IconButton)
+    stars_row = ft.Row(spacing=5, alignment="center")
+    
+    # 事件输入框列表
+    events_input_col = ft.Column(spacing=10)
+    # 默认先加 3 个输入框
+    for i in range(3):
+        events_input_col.controls.append(
+            ft.TextField(
+                hint_text=f"事件 {i+1}...", border_radius=10, 
+                content_padding=10, height=45, bgcolor=colors["card"], border_color="grey300"
+            )
+        )
+
+    def show_avatar_options(e):
+        """显示头像操作菜单 (按钮版)"""
+        page.dialog = ft.AlertDialog(
+            title=ft.Text("设置头像", size=18, weight="bold"),
+            content=ft.Column([
+                # 按钮 1: 更换头像 (灰色底)
+                ft.Container(
+                    bgcolor="grey200", border_radius=8, padding=12,
+                    on_click=lambda _: avatar_picker.pick_files(allow_multiple=False, file_type="image"),
+                    content=ft.Row([
+                        ft.Icon("image", color="black"),
+                        ft.Text("更换头像", size=16, color="black")
+                    ], alignment="center")
+                ),
+                ft.Container(height=10), # 按钮间距
+                # 按钮 2: 恢复默认 (红色浅底)
+                ft.Container(
+                    bgcolor="red50", border_radius=8, padding=12,
+                    on_click=remove_avatar,
+                    content=ft.Row([
+                        ft.Icon("delete", color="red"),
+                        ft.Text("恢复默认", size=16, color="red")
+                    ], alignment="center")
+                )
+            ], tight=True, spacing=0),
+        )
+        page.dialog.open = True
+        page.update()
+
+    # --- 4. 逻辑函数 ---
+    # 渲染锁：防抖搜索在后台线程渲染，避免和保存/翻月的刷新交错
+    render_lock = threading.Lock()
+
+    def query_timeline():
+        """按当前月份/关键词筛选记录 (纯数据，不碰 UI)"""
+        # 1. 获取状态
+        y, m = current_view_month
+        keyword = (search_input.value or "").strip() # 去除首尾空格
+        
+        # 【优化】：仓库里的记录已按 ts 排好序，倒序只是反向遍历，不再每次重新排序
+        is_desc = sort_preference[0] == "desc"
+
+        # 2. 筛选数据
+        if keyword:
+            # 搜索模式：如果日期或任一事件包含关键词 (【优化】：走倒排索引)
+            return log_repo.search(keyword, reverse=is_desc)
+        # 浏览模式：【优化】走月份索引，只取当前月份的记录
+        return log_repo.month(y, m, reverse=is_desc)
+
+    def refresh_timeline():
+        """读取数据并渲染时间轴"""
+        filtered_logs = query_timeline()
+        with render_lock:
+            render_timeline(filtered_logs)
+
+    def run_search(is_current):
+        """防抖搜索：在后台线程筛选，只有最新的一次查询才渲染"""
+        filtered_logs = query_timeline()
+        with render_lock:
+            if is_current():
+                render_timeline(filtered_logs)
+
+    search_debouncer = Debouncer(0.3, run_search)
+
+    def card_key_of(item):
+        content = (item.get("date_str"), item.get("time_str"), item.get("rating"), tuple(item.get("events") or ()))
+        # 主题不在 key 里：切换主题时缓存的卡片会被原地换色 (见 theme_roots)
+        return (item.get("id"), hash(content), icon_preference[0])
+
+    def build_card(item):
+        """取卡片：缓存命中直接复用，否则新建并放入缓存"""
+        key = card_key_of(item)
+        parts = card_cache.get(key)
+        if parts is None:
+            parts = create_card(item)
+            parts["key"] = key
+            card_cache.put(key, parts)
+        rendered_cards[item.get("id")] = parts
+        return parts["card"]
+
+    def create_card(item):
+        """把一条记录构建成卡片控件"""
+        # 提取数据
+        rid = item.get("id")
+        d_str = item.get("date_str")
+        t_str = item.get("time_str")
+        rating = item.get("rating")
+        ev_list = item.get("events")
+        
+        # 构建卡片 UI
+        star_display = star_text_of(rating)
+        
+        event_items = []
+        for idx, ev_text in enumerate(ev_list):
+            event_items.append(
+                ft.Row([
+                    ft.Container(width=6, height=6, border_radius=3, bgcolor=colors["orange"], margin=ft.margin.only(top=5)),
+                    ft.Text(ev_text, size=14, color=colors["text"], expand=True)
+                ], alignment="start", vertical_alignment="start")
+            )
+        
+        if not event_items:
+            event_items.append(ft.Text("（无特殊事件）", size=12, color=colors["sub_text"]))
+
+        star_text = ft.Text(star_display, size=14, color=colors["text"])
+
+        # 3. 组装单张卡片
+        card = ft.Container(
+            padding=ft.padding.only(left=20, top=15, right=15, bottom=15),
+            bgcolor=colors["card"], border_radius=12,
+            shadow=ft.BoxShadow(blur_radius=5, color=colors["shadow"]),
+            # 绑定长按动作
+            on_long_press=lambda e, lid=rid: show_delete_confirm(lid),
+            content=ft.Column([
+                ft.Row([
+                    ft.Text(f"{d_str}", size=16, weight="bold", color=colors["blue"]),
+                    ft.Text(f"{t_str}", size=14, color=colors["sub_text"]),
+                    ft.Container(expand=True), # 占位
+                    star_text
+                ], alignment="spaceBetween"),
+                ft.Divider(height=1, color="grey100"),
+                ft.Column(event_items, spacing=5)
+            ])
+        )
+        return {"card": card, "star": star_text, "rating": rating}
+
+    def star_text_of(rating):
+        icon_char = "🦴" if icon_preference[0] == "bone" else "⭐"
+        return (icon_char * rating) if rating > 0 else "🈚️"
+
+    def patch_card_icons():
+        """星星/骨头切换：只修补已渲染卡片的评分文字 (以及写入页的打分组件)"""
+        # 持渲染锁：防抖搜索可能正在后台线程清空、重建 rendered_cards
+        with render_lock:
+            for parts in rendered_cards.values():
+                parts["star"].value = star_text_of(parts["rating"])
+                # 已原地修补，缓存 key 换成新的图标偏好
+                new_key = parts["key"][:2] + (icon_preference[0],)
+                card_cache.rekey(parts["key"], new_key)
+                parts["key"] = new_key
+            if log_list.page:
+                log_list.update()
+        update_star_ui(write_rating[0])
+
+    view_hooks["icon_changed"] = patch_card_icons
+    # 切换主题时，缓存里暂时没显示的卡片也一起换色，之后再显示不用重建
+    ctx.theme_roots["log"] = lambda: [parts["card"] for parts in card_cache.values()]
+    # 排序方向变化/导入数据后，缓存的日志页需要重新查询一次
+    view_hooks["data_changed"] = lambda: refresh_timeline()
+
+    def sync_footer():
+        """列表末尾的提示 (始终是最后一个控件)：
+        还有没渲染的记录 -> “加载更多”按钮 (窗口很高、第一页撑不满时列表滚不动，滚动事件不会来)
+        全部渲染完且超过3条 -> “到底”提示；否则不要"""
+        results = timeline_results[0]
+        if rendered_count[0] < len(results): kind = "more"
+        elif len(results) > 3: kind = "end"
+        else: kind = None
+        footer = timeline_footer[0]
+        if footer is not None and footer.data == kind: return
+        if footer is not None:
+            log_list.controls.remove(footer)
+            timeline_footer[0] = None
+        if kind == "more":
+            timeline_footer[0] = ft.Container(
+                content=ft.TextButton(
+                    content=ft.Text("加载更多", size=14, color=colors["blue"]),
+                    on_click=lambda e: append_next_page()
+                ),
+                alignment=ft.alignment.center,
+                padding=5,
+                data=kind
+            )
+        elif kind == "end":
+            timeline_footer[0] = ft.Container(
+                content=ft.Text("- 已经到底啦！-", size=14, color=colors["sub_text"]), 
+                alignment=ft.alignment.center,
+                padding=10,
+                opacity=0.8,
+                data=kind
+            )
+        if timeline_footer[0] is not None:
+            log_list.controls.append(timeline_footer[0])
+
+    def timeline_sort_key():
+        """和当前排序方向一致的 key，用于二分查找插入位置"""
+        if sort_preference[0] == "desc":
+            return lambda item: tuple(-k for k in LogRepository._sort_key(item))
+        return LogRepository._sort_key
+
+    def insert_card(entry):
+        """新增一条：只在正确位置插入这一张卡片"""
+        y, m = current_view_month
+        if (search_input.value or "").strip():
+            refresh_timeline() # 搜索模式下是否命中交给索引判断
+            return
+        if LogRepository.month_of(entry) != (y, m):
+            return # 不在当前月份，列表不用动
+        with render_lock:
+            results = timeline_results[0]
+            if not results:
+                render_timeline([entry]) # 从空状态切换过来，直接渲染
+                return
+            key = timeline_sort_key()
+            pos = bisect.bisect_left(results, key(entry), key=key)
+            results.insert(pos, entry)
+            # 只有落在已渲染范围内(或列表已全部渲染)、又在已加载的页数之内才需要建卡片
+            in_range = pos < rendered_count[0] or rendered_count[0] == len(results) - 1
+            if in_range and pos < rendered_window[0]:
+                log_list.controls.insert(pos, build_card(entry))
+                rendered_count[0] += 1
+                if rendered_count[0] > rendered_window[0]:
+                    # 窗口满了：最后一张卡片退回“未渲染”，需要时由滚动/“加载更多”再追加
+                    last = results[rendered_count[0] - 1]
+                    log_list.controls.remove(rendered_cards.pop(last.get("id"))["card"])
+                    rendered_count[0] -= 1
+            sync_footer()
+            if log_list.page:
+                log_list.update()
+
+    def remove_card(log_id):
+        """删除一条：只移除这一张卡片"""
+        with render_lock:
+            results = timeline_results[0]
+            remaining = [item for item in results if item.get("id") != log_id]
+            if len(remaining) == len(results): return
+            if not remaining:
+                render_timeline([]) # 删光了，显示空状态
+                return
+            timeline_results[0] = remaining
+            parts = rendered_cards.pop(log_id, None)
+            if parts:
+                log_list.controls.remove(parts["card"])
+                rendered_count[0] -= 1
+            sync_footer()
+            if log_list.page:
+                log_list.update()
+
+    def append_cards():
+        """在列表末尾追加下一页卡片，再按情况补上“加载更多”/“到底”提示"""
+        results = timeline_results[0]
+        start = rendered_count[0]
+        end = min(start + TIMELINE_PAGE_SIZE, len(results))
+        # 卡片要加在提示前面
+        pos = len(log_list.controls) - (timeline_footer[0] is not None)
+        log_list.controls[pos:pos] = [build_card(item) for item in results[start:end]]
+        rendered_count[0] = end
+        rendered_window[0] = start + TIMELINE_PAGE_SIZE
+
+        # 【新增】：如果列表中有数据，且数据量超过3条(避免太少也显示)，在最后追加一个透明提示
+        sync_footer()
+
+    def append_next_page():
+        """滚动到底部附近或点“加载更多”时调用：还有没渲染的记录就追加一页"""
+        with render_lock:
+            if rendered_count[0] >= len(timeline_results[0]): return
+            append_cards()
+            if log_list.page:
+                log_list.update()
+
+    def render_timeline(filtered_logs):
+        """把筛选结果渲染成卡片 (只渲染第一页)"""
+        log_list.controls.clear()
+        rendered_cards.clear()
+        timeline_footer[0] = None
+        timeline_results[0] = filtered_logs
+        rendered_count[0] = 0
+        rendered_window[0] = 0
+
+        has_data = len(filtered_logs) > 0
+        if has_data:
+            append_cards()
+
+        if not has_data:
+            log_list.controls.append(
+                ft.Container(
+                    padding=50, alignment=ft.alignment.center,
+                    content=ft.Column([
+                        ft.Icon("inbox", size=50, color="grey300"),
+                        ft.Text("本月没有吞吞的记录哦", color=colors["sub_text"])
+                    ], horizontal_alignment="center")
+                )
+            )
+        
+        if log_list.page:
+            log_list.update()
+
+    def change_month(delta):
+        """切换月份"""
+        y, m = current_view_month
+        m += delta
+        if m > 12:
+            m = 1
+            y += 1
+        elif m < 1:
+            m = 12
+            y -= 1
+        current_view_month[0] = y
+        current_view_month[1] = m
+        filter_label.value = f"{y}年 {m}月"
+        filter_label.update()
+        refresh_timeline()
+
+    def show_write_modal(e):
+        """显示写日记的界面 (覆盖层/切换视图)"""
+        timeline_view.visible = False
+        write_view.visible = True
+
+        update_avatar_view() # 每次打开确保显示最新头像
+        page.update()
+
+    def close_write_modal(e):
+        write_view.visible = False
+        timeline_view.visible = True
+        page.update()
+
+    def update_star_ui(score):
+        """更新评分组件 (支持星星/骨头Emoji)"""
+        write_rating[0] = score
+        mode = icon_preference[0]
+
+        stars_row.controls.clear()
+        for i in range(1, 6):
+            if mode == "bone":
+                # === 骨头模式 (Emoji版) ===
+                is_active = i <= score
+                op = 1.0 if is_active else 0.25
+                stars_row.controls.append(
+                    ft.Container(
+                        content=ft.Text("🦴", size=28), 
+                        opacity=op, 
+                        on_click=lambda e, s=i: update_star_ui(s),
+                        padding=5,
+                        border_radius=50,
+                        ink=True, 
+                        bgcolor=ft.colors.with_opacity(0.01, "white") 
+                    )
+                )
+            else:
+                # === 星星模式 (图标) ===
+                color = "pink300" if i <= score else "grey300"
+                stars_row.controls.append(
+                    ft.IconButton(
+                        icon="star", icon_size=32, icon_color=color,
+                        style=ft.ButtonStyle(padding=0),
+                        on_click=lambda e, s=i: update_star_ui(s)
+                    )
+                )
+        
+        if stars_row.page:
+            stars_row.update()
+
+    # --- 新增：事件行管理逻辑 ---
+    def reset_event_rows():
+        """重置事件输入框：清空内容并恢复为3行"""
+        events_input_col.controls.clear()
+        for i in range(3):
+            events_input_col.controls.append(
+                ft.TextField(hint_text=f"事件 {i+1}...", border_radius=10, content_padding=10, height=45, bgcolor=colors["card"], border_color="grey300")
+            )
+        if events_input_col.page:
+            events_input_col.update()
+
+    def add_event_line(e):
+        """添加一行事件 (限制最大5行)"""
+        current_count = len(events_input_col.controls)
+        if current_count < 5:
+            events_input_col.controls.append(
+                ft.TextField(hint_text=f"事件 {current_count+1}...", border_radius=10, content_padding=10, height=45, bgcolor=colors["card"], border_color="grey300")
+            )
+            events_input_col.update()
+            
+            if current_count + 1 == 5:
+                page.snack_bar = ft.SnackBar(ft.Text("单次事件记录上限为 5 条"), bgcolor="orange")
+                page.snack_bar.open = True
+                page.update()
+        else:
+            page.snack_bar = ft.SnackBar(ft.Text("最多只能记录 5 件事哦"), bgcolor="red")
+            page.snack_bar.open = True
+            page.update()
+
+    def save_log(e):
+        """保存到本地存储"""
+        # 收集事件
+        valid_events = []
+        for txt_field in events_input_col.controls:
+            val = txt_field.value.strip()
+            if val: valid_events.append(val)
+        
+        # 【修改】：保存到 Client Storage
+        try:
+            # 构造新对象
+            new_id = int(datetime.datetime.now().timestamp() * 1000) # 简单生成唯一ID
+            new_entry = {
+                "id": new_id,
+                "date_str": write_date_val[0],
+                "time_str": write_time_val[0],
+                "rating": write_rating[0],
+                "events": valid_events,
+                # 【新增】：保存时算好排序用的整数时间戳
+                "ts": make_timestamp(write_date_val[0], write_time_val[0])
+            }
+            log_repo.add(new_entry)
+            
+            # 清空输入，复原其他
+            for txt_field in events_input_col.controls: txt_field.value = ""
+            reset_event_rows()
+            update_star_ui(0)
+            
+            # 返回列表，只插入新的那一张卡片
+            close_write_modal(None)
+            insert_card(new_entry)
+            
+            # 简单提示
+            page.snack_bar = ft.SnackBar(ft.Text("记录成功！吞吞+1 ❤️"), bgcolor="green")
+            page.snack_bar.open = True
+            page.update()
+            
+        except Exception as ex:
+            print(ex)
+
+    # --- 删除确认逻辑 ---
+    def delete_log_entry(log_id):
+        """执行删除操作 (Storage 版)"""
+        log_repo.delete(log_id)
+        
+        page.dialog.open = False # 关闭弹窗
+        page.update()
+        remove_card(log_id) # 只移除这一张卡片
+        page.snack_bar = ft.SnackBar(ft.Text("已删除一条记录", color="white"), bgcolor="red600")
+        page.snack_bar.open = True
+        page.update()
+
+    def show_delete_confirm(log_id):
+        """显示长按删除确认弹窗 (大字号版)"""
+        page.dialog = ft.AlertDialog(
+            # 【修改】：自定义标题字号
+            title=ft.Text("确认删除?", size=26, weight="bold"),
+            # 【修改】：自定义内容字号
+            content=ft.Text("删除后无法恢复，确定要删除这条记录吗？", size=16),
+            actions=[
+                # 【修改】：按钮改用 TextButton 并放大文字
+                ft.TextButton(content=ft.Text("取消", size=18), on_click=lambda e: setattr(page.dialog, 'open', False) or page.update()),
+                ft.TextButton(content=ft.Text("删除", size=18, color="red"), on_click=lambda e: delete_log_entry(log_id)),
+            ],
+            actions_alignment="end",
+        )
+        page.dialog.open = True
+        page.update()
+
+    # --- 统计面板 ---
+    # 【新增】：直接读仓库随保存/删除维护好的统计汇总 (LogStats)，打开时不扫描历史
+    STATS_MONTHS = 12     # 最近几个月的平均分
+    STATS_TOP_EVENTS = 10 # 最常见的几件事
+    stats_body = ft.Column(scroll="hidden", expand=True, spacing=20)
+
+    def stats_card(title, controls):
+        return ft.Container(
+            padding=20, margin=ft.margin.symmetric(horizontal=20),
+            bgcolor=colors["card"], border_radius=15,
+            content=ft.Column([
+                ft.Text(title, size=18, weight="bold", color=colors["sub_text"]),
+                ft.Container(height=2),
+                *controls
+            ], spacing=10)
+        )
+
+    def stats_bar(label, fraction, note, label_width=90):
+        """一行：标签 + 按比例的横条 + 数字"""
+        return ft.Row([
+            ft.Text(label, size=14, color=colors["text"], width=label_width, no_wrap=True),
+            ft.ProgressBar(value=fraction, bar_height=10, expand=True, color=colors["orange"], bgcolor=colors["divider"]),
+            ft.Text(note, size=14, color=colors["sub_text"], width=90, text_align="right"),
+        ], vertical_alignment="center")
+
+    def stats_number(value, label):
+        return ft.Column([
+            ft.Text(value, size=22, weight="bold", color=colors["orange"]),
+            ft.Text(label, size=13, color=colors["sub_text"]),
+        ], spacing=2, horizontal_alignment="center", expand=True)
+
+    def score_text(avg):
+        return f"{avg:.1f}" if avg is not None else "-"
+
+    def render_stats():
+        stats = log_repo.stats()
+        current, longest = stats.streaks()
+
+        summary = stats_card("总览", [ft.Row([
+            stats_number(str(stats.count()), "条记录"),
+            stats_number(score_text(stats.average()), "平均分"),
+            stats_number(f"{current} 天", "当前连续"),
+            stats_number(f"{longest} 天", "最长连续"),
+        ])])
+
+        distribution = stats.rating_distribution()
+        most = max((n for _, n in distribution), default=0) or 1
+        ratings = stats_card("评分分布", [
+            stats_bar(star_text_of(score), n / most, f"{n} 条", label_width=120)
+            for score, n in reversed(distribution)
+        ])
+
+        month_rows = [
+            stats_bar(f"{y}年{m}月", (avg or 0) / 5, f"{score_text(avg)} 分 · {n} 条")
+            for y, m, n, avg in stats.months(STATS_MONTHS)
+        ]
+        months = stats_card("每月平均分", month_rows or [ft.Text("还没有记录", size=14, color=colors["sub_text"])])
+
+        top = stats.top_events(STATS_TOP_EVENTS)
+        most = top[0][1] if top else 1
+        events = stats_card("吞吞最常做的事", [
+            stats_bar(phrase, n / most, f"{n} 次", label_width=120) for phrase, n in top
+        ] or [ft.Text("还没有记录事件", size=14, color=colors["sub_text"])])
+
+        stats_body.controls = [summary, ratings, months, events, ft.Container(height=50)]
+
+    def show_stats_view(e):
+        """打开统计面板 (每次打开按最新汇总重画，只有几十个控件)"""
+        render_stats()
+        timeline_view.visible = False
+        stats_view.visible = True
+        page.update()
+
+    def close_stats_view(e):
+        stats_view.visible = False
+        timeline_view.visible = True
+        page.update()
+
+    # --- 5. 构建 Write View 的星星组件 (修复间距) ---
+    stars_row.controls.clear()
+    # 初始化时调用一次，确保根据当前偏好显示正确的星星/骨头
+    update_star_ui(0)
+
+    # --- 6. 视图组装 ---
+    write_btn = ft.ElevatedButton(
+        content=ft.Row([
+            ft.Icon("edit", size=18, color="white"),
+            ft.Text("记一笔", size=16, weight="bold", color="white")
+        ], alignment="center", spacing=5),
+        style=ft.ButtonStyle(bgcolor=colors["orange"], color="white", elevation=10),
+        height=45,
+        on_click=show_write_modal
+    )
+    
+    # A. 时间轴视图 (Timeline)
+    timeline_view = ft.Column(
+        expand=True,
+        controls=[
+            # 顶部筛选栏
+            ft.Container(
+                bgcolor=colors["card"],
+                padding=ft.padding.only(top=50, left=15, right=15, bottom=20),
+                margin=ft.margin.only(bottom=10),
+                shadow=ft.BoxShadow(blur_radius=10, color=colors["shadow"]),
+                content=ft.Row([
+                    ft.IconButton("arrow_back_ios", icon_size=16, on_click=lambda e: change_month(-1), icon_color=colors["icon"]),
+                    filter_label,# 中间的日期文字
+                    ft.IconButton("arrow_forward_ios", icon_size=16, on_click=lambda e: change_month(1), icon_color=colors["icon"]),
+                    ft.Container(expand=True),
+                    # 【新增】：统计面板入口
+                    ft.IconButton("insights", icon_size=22, on_click=show_stats_view, icon_color=colors["icon"]),
+                    write_btn
+                ], alignment="center")
+            ),
+
+            # 【新增】：搜索框容器
+            ft.Container(
+                padding=ft.padding.symmetric(horizontal=15),
+                content=search_input
+            ),
+    
+            # 列表区域
+            ft.Container(
+                expand=True, padding=10,
+                content=log_list
+            )
+        ]
+    )
+
+    # B. 写入视图 (Write Form) - 模仿原版 EXE 布局
+    write_view = ft.Column(
+        visible=False, expand=True,
+        controls=[
+            # 顶部
+            ft.Container(
+                padding=ft.padding.only(top=35, left=15, bottom=10),
+                bgcolor=colors["card"],
+                shadow=ft.BoxShadow(blur_radius=10, color=colors["shadow"]),
+                content=ft.Row([
+                    ft.IconButton("close", icon_size=26, on_click=close_write_modal, icon_color=colors["icon"]),
+                    ft.Text("记录吞吞的生活", size=20, weight="bold", color=colors["text"]),
+                    ft.Container(expand=True),
+                    # 【修改点 1】：保存按钮往左移 (增加右边距)
+                    ft.Container(
+                        margin=ft.margin.only(right=15), # 往左挤 15px
+                        content=ft.ElevatedButton(
+                            content=ft.Text("保存", size=16, weight="bold", color="white"),
+                            on_click=save_log,
+                            height=40,
+                            style=ft.ButtonStyle(bgcolor=colors["blue"], color="white", elevation=10)
+                        )
+                    )
+                ])
+            ),
+            # 表单内容
+            ft.Column(
+                scroll="hidden", expand=True, spacing=20,
+                controls=[
+                    # 1. 狗狗图片 (支持长按更换)
+                    ft.Container(
+                        alignment=ft.alignment.center,
+                        margin=ft.margin.only(top=10),
+                        content=ft.Container(
+                            ref=avatar_content, # 绑定 Ref
+                            width=120, height=120, bgcolor="grey200", border_radius=60,
+                            content=load_avatar(), # 初始加载
+                            border=ft.border.all(4, colors["orange"]),
+                            on_long_press=show_avatar_options # 【核心】：绑定长按
+                        )
+                    ),
+                    
+                    # 2. 日期时间选择
+                    ft.Container(
+                        padding=20, margin=ft.margin.symmetric(horizontal=20),
+                        bgcolor=colors["card"], border_radius=15,
+                        content=ft.Column([
+                            ft.Text("时间信息", size=18, weight="bold", color=colors["sub_text"]),
+                            ft.Container(height=2),
+                            ft.Row([
+                                ft.Icon("calendar_month", color=colors["blue"]),
+                                ft.Text("日期:", size=18, color=colors["text"]),
+                                ft.Container(
+                                    content=btn_date_display,
+                                    on_click=lambda _: log_date_picker.pick_date(),
+                                    padding=5
+                                )
+                            ], alignment="start"),
+                            ft.Divider(height=1, color="grey100"),
+                            ft.Row([
+                                ft.Icon("access_time", color=colors["blue"]),
+                                ft.Text("时间:", size=18, color=colors["text"]),
+                                ft.Container(
+                                    content=btn_time_display,
+                                    on_click=lambda _: log_time_picker.pick_time(),
+                                    padding=5
+                                )
+                            ], alignment="start"),
+                        ])
+                    ),
+
+                    # 3. 乖巧度
+                    ft.Container(
+                        padding=10, margin=ft.margin.symmetric(horizontal=20),
+                        bgcolor=colors["card"], border_radius=15,
+                        content=ft.Column([
+                            ft.Text("今天乖不乖?", size=18, weight="bold", color=colors["sub_text"]),
+                            ft.Container(height=2),
+                            stars_row # 放入星星组件
+                        ], horizontal_alignment="center")
+                    ),
+
+                    # 4. 事件列表
+                    ft.Container(
+                        padding=20, margin=ft.margin.symmetric(horizontal=20),
+                        bgcolor=colors["card"], border_radius=15,
+                        content=ft.Column([
+                            ft.Text("吞吞发生了什么?", size=18, weight="bold", color=colors["sub_text"]),
+                            ft.Container(height=2),
+                            events_input_col,
+                            # 【修改点 4】：绑定新的添加函数 (限制5行)
+                            ft.TextButton(
+                                content=ft.Text("+ 再加一行", size=16, color=colors["blue"]),
+                                on_click=add_event_line, # 绑定新函数
+                            )
+                        ])
+                    ),
+                    ft.Container(height=50) # 底部垫高
+                ]
+            )
+        ]
+    )
+
+    # C. 统计面板 (Stats)
+    stats_view = ft.Column(
+        visible=False, expand=True, spacing=20,
+        controls=[
+            ft.Container(
+                padding=ft.padding.only(top=35, left=15, bottom=10),
+                bgcolor=colors["card"],
+                shadow=ft.BoxShadow(blur_radius=10, color=colors["shadow"]),
+                content=ft.Row([
+                    ft.IconButton("close", icon_size=26, on_click=close_stats_view, icon_color=colors["icon"]),
+                    ft.Text("吞吞的统计", size=20, weight="bold", color=colors["text"]),
+                ])
+            ),
+            stats_body
+        ]
+    )
+
+    # 初始化加载一次数据
+    refresh_timeline()
+    reset_event_rows()
+
+    # 返回 Stack 结构，包含三个视图
+    return ft.Stack(expand=True, controls=[timeline_view, write_view, stats_view])
@@ -1,41 +1,96 @@
+import time # 启动计时 (最先引入，尽量早地记下进程起点)
+_MODULE_START = time.perf_counter()
 import flet as ft
-import re
-import datetime # 引入时间处理模块
-# import sqlite3 # 【修改】：注释掉 SQLite，它是安卓14黑屏的元凶
-import json # 用于存取事件列表
-import shutil # 用于复制文件
-import os     # 用于处理路径
+# import sqlite3 # 【修改】：注释掉 SQLite，它是安卓14黑屏的元凶 (现在只在 SqliteLogBackend 首屏之后懒加载)
+import threading # 用于后台预取
 from pathlib import Path # 保持引入，防止报错
+# 【优化】：启动只导入存储层；三个页面、备份、头像模块都推迟到第一次用到时才导入
+from storage import WriteBehindStorage, LogRepository, SqliteLogBackend, LazyLogBackend, BookingStore, move_entries
+from theme import LivePalette, restyle_controls, RESTYLE_SUPPORTED
 
 # 【建议】：在安卓上这行容易报错，我将其注释掉了，Flet 会自动处理路径
 # os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
+# ==========================================
+# 各页面共享的状态和回调
+# 页面拆到了单独的模块里，构建时统一传进去，而不是依赖 main() 里的闭包变量
+# ==========================================
+class AppContext:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+# ==========================================
+# 启动计时：记录每个阶段完成时距离模块加载的耗时，启动结束后打印报告
+# ==========================================
+class StartupTimer:
+    def __init__(self, origin=_MODULE_START):
+        self.origin = origin
+        self.marks = [("main() 开始", time.perf_counter())]
+        self._lock = threading.Lock() # 后台预取线程也会打点
+
+    def mark(self, stage):
+        with self._lock:
+            self.marks.append((stage, time.perf_counter()))
+
+    def report(self):
+        with self._lock:
+            lines = ["[启动计时] 阶段 / 距启动 / 本阶段耗时"]
+            prev = self.origin
+            for stage, t in self.marks:
+                lines.append(f"  {stage:<16} {(t - self.origin) * 1000:8.1f} ms  (+{(t - prev) * 1000:.1f} ms)")
+                prev = t
+        print("\n".join(lines))
+
 # 1. 主程序
 def main(page: ft.Page):
+    startup = StartupTimer()
+
     # --- 0. 全局辅助函数 ---
     # 获取当前主题下的颜色配置
+    # 【优化】：调色板预先算好 (theme.py)，这里始终返回同一个按当前主题取色的只读映射
+    app_colors = LivePalette(page)
+
     def get_app_colors():
-        is_dark = page.theme_mode == "dark"
-        return {
-            "bg": "grey900" if is_dark else "grey100",      # 大背景
-            "card": "grey800" if is_dark else "white",      # 卡片背景
-            "text": "white" if is_dark else "black",        # 主要文字
-            "sub_text": "grey400" if is_dark else "grey",   # 次要文字
-            "icon": "white" if is_dark else "grey700",      # 图标
-            "divider": "grey700" if is_dark else "grey200", # 分割线
-            "input_bg": "grey900" if is_dark else "white",  # 输入框背景
-            "orange": "orange400" if is_dark else "orange600", # 调整橙色亮度
-            "blue": "blue400" if is_dark else "blue600",       # 调整蓝色亮度
-            "shadow": "black" if is_dark else "black12"   # 浅色12 深色全黑
-        }
+        return app_colors
+
+    # 【优化】：所有存储写入都走 write-behind，界面事件不用等存储往返
+    def on_storage_error(key, ex):
+        """多次重试仍写不进存储：告诉用户 (数据还在队列里，下次保存时会再试)"""
+        page.snack_bar = ft.SnackBar(ft.Text(f"⚠️ 保存失败，稍后会再试: {ex}"), bgcolor="red")
+        page.snack_bar.open = True
+        page.update()
+
+    app_storage = WriteBehindStorage(page.client_storage, on_error=on_storage_error)
+
+    def on_lifecycle_change(e):
+        # 切到后台/即将退出时必须立刻把积攒的写入写出去
+        if e.data in ("inactive", "hide", "pause", "detach"):
+            app_storage.flush()
+
+    page.on_app_lifecycle_state_change = on_lifecycle_change
+    # 网页会话结束：先把积攒的写入写出去 (客户端可能已经断开，写不进去的只能丢掉)，
+    # 然后停掉计时器和重试，不再碰这个页面
+    page.on_close = lambda e: app_storage.close(flush=True)
 
+    def on_window_event(e):
+        # 桌面版：拦下关闭，写完再关
+        if e.data == "close":
+            try:
+                app_storage.flush()
+            finally:
+                page.window_destroy() # 写出出错也要能关掉窗口
+
+    page.window_prevent_close = True
+    page.on_window_event = on_window_event
+
+    # 【优化】：偏好设置先用默认值，首屏画出来之后再由 load_preferences() 读取
     # 读取图标偏好 (默认为 star)
     # 选项: "star" 或 "bone"
-    icon_preference = [page.client_storage.get("icon_preference") or "star"] 
+    icon_preference = ["star"]
 
     # 【新增】：读取排序偏好 (默认为 desc: 倒序/最新在前)
     # 选项: "desc" (倒序) 或 "asc" (正序)
-    sort_preference = [page.client_storage.get("sort_preference") or "desc"]
+    sort_preference = ["desc"]
 
     # App 基础设置
     page.title = "My Omnis"
@@ -52,1397 +107,133 @@ def main(page: ft.Page):
     # 数据层封装 (Client Storage 版 - 替代 SQLite)
     # 这是解决安卓黑屏的关键：用 JSON 存代替 SQL
     # ==========================================
-    def get_all_logs():
-        """从本地存储获取所有日志"""
-        data = page.client_storage.get("tuntun_logs")
-        if not data: return []
-        # 如果存的是字符串则解析，如果是对象直接返回
-        return json.loads(data) if isinstance(data, str) else data
-
-    def save_logs_to_storage(logs):
-        """保存日志列表回存储"""
-        page.client_storage.set("tuntun_logs", json.dumps(logs))
-
-    # ---------------------------------------------------
-    # 页面 1: 吞吞日志 (Storage + Timeline + 动态主题版)
-    # ---------------------------------------------------
-    def get_log_view():
-        colors = get_app_colors() # 获取动态颜色
-
-        # --- 1. 数据库初始化 (已移除，改用 Client Storage) ---
-        # 这一步不需要了，Flet 会自动管理 page.client_storage
-
-        # --- 2. 状态变量 ---
-        # 默认选中今天
-        today = datetime.datetime.now()
-        current_view_month = [today.year, today.month] # 用于筛选视图 [年, 月]
-        
-        # 写入模式的状态
-        write_date_val = [today.strftime("%d.%m.%Y")]
-        write_time_val = [today.strftime("%H:%M")]
-        write_rating = [0] # 0-5 星
-        
-        # --- 3. UI 控件定义 (预创建) ---
-        
-        # 3.1 顶部筛选器 (Filter)
-        filter_label = ft.Text(f"{today.year}年 {today.month}月", size=18, weight="bold", color=colors["text"])
-        
-        # 3.2 列表容器 (Timeline) - 增加滚动监听
-        log_list = ft.Column(
-            scroll="hidden", 
-            expand=True, 
-            spacing=15,
-            # 【核心修改】：当发生滚动时，把焦点强行给“记一笔”按钮(write_btn)，
-            # 这样搜索框就会失去焦点，键盘收起，光标消失。
-            on_scroll=lambda e: write_btn.focus() 
-        )
-
-        # 3.3 写入页面的控件
-        # 日期/时间选择器 (复用 Overlay 逻辑)
-        def on_log_date_change(e):
-            if log_date_picker.value:
-                d = log_date_picker.value.strftime("%d.%m.%Y")
-                btn_date_display.text = d
-                write_date_val[0] = d
-                btn_date_display.update()
-        
-        def on_log_time_change(e):
-            if log_time_picker.value:
-                t = log_time_picker.value.strftime("%H:%M")
-                btn_time_display.text = t
-                write_time_val[0] = t
-                btn_time_display.update()
-
-        log_date_picker = ft.DatePicker(on_change=on_log_date_change)
-        log_time_picker = ft.TimePicker(on_change=on_log_time_change)
-        # 注意：Overlay 需要在 build 时确保不重复，这里先存着，等显示时挂载
-
-        # 3.4 搜索框
-        search_input = ft.TextField(
-            hint_text="搜索记录...", 
-            prefix_icon="search",
-            border_radius=30, # 胶囊形状
-            height=36, 
-            content_padding=10, 
-            text_size=14, 
-            bgcolor=colors["card"], 
-            border_color="grey300",
-            # 输入变动时直接刷新列表
-            on_change=lambda e: refresh_timeline() 
-        )
-
-        # 用于转移焦点的隐形按钮 (解决光标闪烁问题)
-        dummy_focus_node = ft.IconButton(icon="check", visible=False) 
-        
-        # --- 头像管理逻辑 ---
-        # 1. 定义头像容器 (Ref) 方便更新内容
-        avatar_content = ft.Ref[ft.Container]()
-
-        def safe_delete_old_avatar():
-            """安全删除旧头像文件"""
-            old_path = page.client_storage.get("user_avatar")
-            if old_path and os.path.exists(old_path):
-                try:
-                    os.remove(old_path) # 【核心】：物理删除文件
-                    print(f"已删除旧文件: {old_path}")
-                except Exception as e:
-                    print(f"删除旧文件失败: {e}")
-        
-        def load_avatar():
-            """从存储加载头像"""
-            path = page.client_storage.get("user_avatar")
-            if path and os.path.exists(path):
-                return ft.Image(
-                    src=path, # 不需要加 ?t=... 了，因为文件名变了
-                    width=120, 
-                    height=120, 
-                    border_radius=60, 
-                    fit=ft.ImageFit.COVER, # 居中填满，这就是目前的“自动裁剪”
-                    error_content=ft.Icon("broken_image", size=40, color="grey400") 
-                )
-            else:
-                return ft.Icon("pets", size=60, color="grey400")
-
-        def update_avatar_view():
-            """刷新头像显示"""
-            if avatar_content.current:
-                avatar_content.current.content = load_avatar()
-                avatar_content.current.update()
-
-        def on_avatar_picked(e: ft.FilePickerResultEvent):
-            """图片选择回调 (自动清理 + 复制)"""
-            if e.files:
-                src_path = e.files[0].path
-                
-                try:
-                    # 1. 先清理掉旧头像 (如果有的话)
-                    # 必须在保存新文件之前删，防止万一新旧文件名一样导致冲突（虽然概率小）
-                    safe_delete_old_avatar()
-
-                    # 2. 准备新路径
-                    # 使用时间戳作为文件名的一部分，彻底解决缓存不刷新的问题！
-                    import time
-                    _, ext = os.path.splitext(src_path)
-                    # 例如: tuntun_avatar_1721534.jpg
-                    new_filename = f"tuntun_avatar_{int(time.time())}{ext}"
-                    # 【核心修改】：使用 Path.home() 确保安卓路径可写
-                    dst_path = str(Path.home().joinpath(new_filename))
-                    
-                    # 3. 复制新文件
-                    shutil.copy(src_path, dst_path)
-                    
-                    # 4. 更新存储和界面
-                    page.client_storage.set("user_avatar", dst_path) 
-                    update_avatar_view()
-                    
-                except Exception as ex:
-                    page.snack_bar = ft.SnackBar(ft.Text(f"头像处理失败: {str(ex)}"), bgcolor="red")
-                    page.snack_bar.open = True
-                    page.update()
-                
-                page.dialog.open = False
-                page.update()
-
-        def remove_avatar(e):
-            """恢复默认 (同时删除文件)"""
-            # 1. 物理删除文件
-            safe_delete_old_avatar()
-            
-            # 2. 移除存储记录
-            page.client_storage.remove("user_avatar")
-            
-            # 3. 刷新界面
-            update_avatar_view()
-            page.dialog.open = False
-            page.update()
-
-        avatar_picker = ft.FilePicker(on_result=on_avatar_picked)
-        # 【重要】稍后要把 avatar_picker 加入 overlay
-
-        btn_date_display = ft.Text(today.strftime("%d.%m.%Y"), size=16, color=colors["blue"])
-        btn_time_display = ft.Text(today.strftime("%H:%M"), size=16, color=colors["blue"])
-        
-        # 星星打分 (5个 IconButton)
-        stars_row = ft.Row(spacing=5, alignment="center")
-        
-        # 事件输入框列表
-        events_input_col = ft.Column(spacing=10)
-        # 默认先加 3 个输入框
-        for i in range(3):
-            events_input_col.controls.append(
-                ft.TextField(
-                    hint_text=f"事件 {i+1}...", border_radius=10, 
-                    content_padding=10, height=45, bgcolor=colors["card"], border_color="grey300"
-                )
-            )
-
-        def show_avatar_options(e):
-            """显示头像操作菜单 (按钮版)"""
-            page.dialog = ft.AlertDialog(
-                title=ft.Text("设置头像", size=18, weight="bold"),
-                content=ft.Column([
-                    # 按钮 1: 更换头像 (灰色底)
-                    ft.Container(
-                        bgcolor="grey200", border_radius=8, padding=12,
-                        on_click=lambda _: avatar_picker.pick_files(allow_multiple=False, file_type="image"),
-                        content=ft.Row([
-                            ft.Icon("image", color="black"),
-                            ft.Text("更换头像", size=16, color="black")
-                        ], alignment="center")
-                    ),
-                    ft.Container(height=10), # 按钮间距
-                    # 按钮 2: 恢复默认 (红色浅底)
-                    ft.Container(
-                        bgcolor="red50", border_radius=8, padding=12,
-                        on_click=remove_avatar,
-                        content=ft.Row([
-                            ft.Icon("delete", color="red"),
-                            ft.Text("恢复默认", size=16, color="red")
-                        ], alignment="center")
-                    )
-                ], tight=True, spacing=0),
-            )
-            page.dialog.open = True
-            page.update()
-
-        # --- 4. 逻辑函数 ---
-        def refresh_timeline():
-            """从存储读取数据并渲染时间轴 (Python List 版)"""
-            log_list.controls.clear()
-            
-            # 1. 获取状态
-            y, m = current_view_month
-            keyword = search_input.value.strip() # 去除首尾空格
-            
-            # 【修改】：从 Client Storage 获取数据
-            all_logs = get_all_logs()
-
-            # 【新增】：排序逻辑 (Python Sort)
-            # sort_key 格式建议为 YYYYMMDDHHMM 字符串，方便比较
-            def get_sort_key(item):
-                # 假设 date_str 是 dd.mm.yyyy, time_str 是 HH:MM
-                d = item.get("date_str", "")
-                t = item.get("time_str", "")
-                try:
-                    # 转换成 yyyymmddhhmm
-                    parts = d.split(".")
-                    return f"{parts[2]}{parts[1]}{parts[0]}{t.replace(':', '')}"
-                except:
-                    return ""
-
-            is_desc = sort_preference[0] == "desc"
-            all_logs.sort(key=get_sort_key, reverse=is_desc)
-
-            # 2. 筛选数据
-            month_pattern = f".{m:02d}.{y}" # 匹配 .mm.yyyy 结尾
-            filtered_logs = []
-
-            for log in all_logs:
-                d_str = log.get("date_str", "")
-                events = log.get("events", [])
-                
-                # 搜索模式
-                if keyword:
-                    # 如果日期或任一事件包含关键词
-                    if keyword in d_str or any(keyword in str(e) for e in events):
-                        filtered_logs.append(log)
-                # 浏览模式
-                elif d_str.endswith(month_pattern):
-                    filtered_logs.append(log)
-
-            has_data = len(filtered_logs) > 0
-            display_count = 0 
-
-            for item in filtered_logs:
-                # 提取数据
-                rid = item.get("id")
-                d_str = item.get("date_str")
-                t_str = item.get("time_str")
-                rating = item.get("rating")
-                ev_list = item.get("events")
-                
-                display_count += 1
-                
-                # 构建卡片 UI
-                icon_char = "🦴" if icon_preference[0] == "bone" else "⭐"
-                star_display = (icon_char * rating) if rating > 0 else "🈚️"
-                
-                event_items = []
-                for idx, ev_text in enumerate(ev_list):
-                    event_items.append(
-                        ft.Row([
-                            ft.Container(width=6, height=6, border_radius=3, bgcolor=colors["orange"], margin=ft.margin.only(top=5)),
-                            ft.Text(ev_text, size=14, color=colors["text"], expand=True)
-                        ], alignment="start", vertical_alignment="start")
-                    )
-                
-                if not event_items:
-                    event_items.append(ft.Text("（无特殊事件）", size=12, color=colors["sub_text"]))
-
-                # 3. 组装单张卡片
-                card = ft.Container(
-                    padding=ft.padding.only(left=20, top=15, right=15, bottom=15),
-                    bgcolor=colors["card"], border_radius=12,
-                    shadow=ft.BoxShadow(blur_radius=5, color=colors["shadow"]),
-                    # 绑定长按动作
-                    on_long_press=lambda e, lid=rid: show_delete_confirm(lid),
-                    content=ft.Column([
-                        ft.Row([
-                            ft.Text(f"{d_str}", size=16, weight="bold", color=colors["blue"]),
-                            ft.Text(f"{t_str}", size=14, color=colors["sub_text"]),
-                            ft.Container(expand=True), # 占位
-                            ft.Text(star_display, size=14, color=colors["text"])
-                        ], alignment="spaceBetween"),
-                        ft.Divider(height=1, color="grey100"),
-                        ft.Column(event_items, spacing=5)
-                    ])
-                )
-                log_list.controls.append(card)
-
-            # 【新增】：如果列表中有数据，且数据量超过3条(避免太少也显示)，在最后追加一个透明提示
-            if has_data and display_count > 3:
-                log_list.controls.append(
-                    ft.Container(
-                        content=ft.Text("- 已经到底啦！-", size=14, color=colors["sub_text"]), 
-                        alignment=ft.alignment.center,
-                        padding=10,
-                        opacity=0.8
-                    )
-                )
-
-            if not has_data:
-                log_list.controls.append(
-                    ft.Container(
-                        padding=50, alignment=ft.alignment.center,
-                        content=ft.Column([
-                            ft.Icon("inbox", size=50, color="grey300"),
-                            ft.Text("本月没有吞吞的记录哦", color=colors["sub_text"])
-                        ], horizontal_alignment="center")
-                    )
-                )
-            
-            if log_list.page:
-                log_list.update()
-
-        def change_month(delta):
-            """切换月份"""
-            y, m = current_view_month
-            m += delta
-            if m > 12:
-                m = 1
-                y += 1
-            elif m < 1:
-                m = 12
-                y -= 1
-            current_view_month[0] = y
-            current_view_month[1] = m
-            filter_label.value = f"{y}年 {m}月"
-            filter_label.update()
-            refresh_timeline()
-
-        def show_write_modal(e):
-            """显示写日记的界面 (覆盖层/切换视图)"""
-            timeline_view.visible = False
-            write_view.visible = True
-
-            # 挂载 picker
-            if log_date_picker not in page.overlay: page.overlay.append(log_date_picker)
-            if log_time_picker not in page.overlay: page.overlay.append(log_time_picker)
-            # 【新增】：挂载文件选择器
-            if avatar_picker not in page.overlay: page.overlay.append(avatar_picker)
-
-            update_avatar_view() # 每次打开确保显示最新头像
-            page.update()
-
-        def close_write_modal(e):
-            write_view.visible = False
-            timeline_view.visible = True
-            page.update()
-
-        def update_star_ui(score):
-            """更新评分组件 (支持星星/骨头Emoji)"""
-            write_rating[0] = score
-            mode = icon_preference[0]
-
-            stars_row.controls.clear()
-            for i in range(1, 6):
-                if mode == "bone":
-                    # === 骨头模式 (Emoji版) ===
-                    is_active = i <= score
-                    op = 1.0 if is_active else 0.25
-                    stars_row.controls.append(
-                        ft.Container(
-                            content=ft.Text("🦴", size=28), 
-                            opacity=op, 
-                            on_click=lambda e, s=i: update_star_ui(s),
-                            padding=5,
-                            border_radius=50,
-                            ink=True, 
-                            bgcolor=ft.colors.with_opacity(0.01, "white") 
-                        )
-                    )
-                else:
-                    # === 星星模式 (图标) ===
-                    color = "pink300" if i <= score else "grey300"
-                    stars_row.controls.append(
-                        ft.IconButton(
-                            icon="star", icon_size=32, icon_color=color,
-                            style=ft.ButtonStyle(padding=0),
-                            on_click=lambda e, s=i: update_star_ui(s)
-                        )
-                    )
-            
-            if stars_row.page:
-                stars_row.update()
-
-        # --- 新增：事件行管理逻辑 ---
-        def reset_event_rows():
-            """重置事件输入框：清空内容并恢复为3行"""
-            events_input_col.controls.clear()
-            for i in range(3):
-                events_input_col.controls.append(
-                    ft.TextField(hint_text=f"事件 {i+1}...", border_radius=10, content_padding=10, height=45, bgcolor=colors["card"], border_color="grey300")
-                )
-            if events_input_col.page:
-                events_input_col.update()
-
-        def add_event_line(e):
-            """添加一行事件 (限制最大5行)"""
-            current_count = len(events_input_col.controls)
-            if current_count < 5:
-                events_input_col.controls.append(
-                    ft.TextField(hint_text=f"事件 {current_count+1}...", border_radius=10, content_padding=10, height=45, bgcolor=colors["card"], border_color="grey300")
-                )
-                events_input_col.update()
-                
-                if current_count + 1 == 5:
-                    page.snack_bar = ft.SnackBar(ft.Text("单次事件记录上限为 5 条"), bgcolor="orange")
-                    page.snack_bar.open = True
-                    page.update()
-            else:
-                page.snack_bar = ft.SnackBar(ft.Text("最多只能记录 5 件事哦"), bgcolor="red")
-                page.snack_bar.open = True
-                page.update()
-
-        def save_log(e):
-            """保存到本地存储"""
-            # 收集事件
-            valid_events = []
-            for txt_field in events_input_col.controls:
-                val = txt_field.value.strip()
-                if val: valid_events.append(val)
-            
-            # 【修改】：保存到 Client Storage
+    # 【优化】：整个会话共用一个仓库，搜索/翻月不再重复读取和解析整段 JSON
+    # 存储引擎偏好：json (默认) 或 sqlite (实验)，后端在首屏之后才真正打开
+    SQLITE_DB_PATH = str(Path.home().joinpath("tuntun_logs.db"))
+
+    def open_log_backend(kind):
+        if kind == "sqlite":
+            return SqliteLogBackend(SQLITE_DB_PATH).open()
+        return LogRepository(app_storage)
+
+    storage_backend = ["json"] # 同样由 load_preferences() 读取
+
+    def open_primary_backend():
+        """按偏好打开日志后端
+        SQLite 上次会话打不开时，那次的新记录临时写进了 JSON；这次打开成功就先把它们并回来"""
+        backend = open_log_backend(storage_backend[0])
+        if storage_backend[0] != "json":
             try:
-                logs = get_all_logs()
-                # 构造新对象
-                new_id = int(datetime.datetime.now().timestamp() * 1000) # 简单生成唯一ID
-                new_entry = {
-                    "id": new_id,
-                    "date_str": write_date_val[0],
-                    "time_str": write_time_val[0],
-                    "rating": write_rating[0],
-                    "events": valid_events
-                }
-                logs.append(new_entry)
-                save_logs_to_storage(logs)
-                
-                # 清空输入，复原其他
-                for txt_field in events_input_col.controls: txt_field.value = ""
-                reset_event_rows()
-                update_star_ui(0)
-                
-                # 返回列表并刷新
-                close_write_modal(None)
-                refresh_timeline()
-                
-                # 简单提示
-                page.snack_bar = ft.SnackBar(ft.Text("记录成功！吞吞+1 ❤️"), bgcolor="green")
-                page.snack_bar.open = True
-                page.update()
-                
-            except Exception as ex:
-                print(ex)
-
-        # --- 删除确认逻辑 ---
-        def delete_log_entry(log_id):
-            """执行删除操作 (Storage 版)"""
-            logs = get_all_logs()
-            # 过滤掉要删除的 ID
-            new_logs = [log for log in logs if log.get("id") != log_id]
-            save_logs_to_storage(new_logs)
-            
-            page.dialog.open = False # 关闭弹窗
-            page.update()
-            refresh_timeline() # 刷新列表
-            page.snack_bar = ft.SnackBar(ft.Text("已删除一条记录", color="white"), bgcolor="red600")
-            page.snack_bar.open = True
-            page.update()
-
-        def show_delete_confirm(log_id):
-            """显示长按删除确认弹窗 (大字号版)"""
-            page.dialog = ft.AlertDialog(
-                # 【修改】：自定义标题字号
-                title=ft.Text("确认删除?", size=26, weight="bold"),
-                # 【修改】：自定义内容字号
-                content=ft.Text("删除后无法恢复，确定要删除这条记录吗？", size=16),
-                actions=[
-                    # 【修改】：按钮改用 TextButton 并放大文字
-                    ft.TextButton(content=ft.Text("取消", size=18), on_click=lambda e: setattr(page.dialog, 'open', False) or page.update()),
-                    ft.TextButton(content=ft.Text("删除", size=18, color="red"), on_click=lambda e: delete_log_entry(log_id)),
-                ],
-                actions_alignment="end",
-            )
-            page.dialog.open = True
-            page.update()
-
-        # --- 5. 构建 Write View 的星星组件 (修复间距) ---
-        stars_row.controls.clear()
-        # 初始化时调用一次，确保根据当前偏好显示正确的星星/骨头
-        update_star_ui(0)
-
-        # --- 6. 视图组装 ---
-        write_btn = ft.ElevatedButton(
-            content=ft.Row([
-                ft.Icon("edit", size=18, color="white"),
-                ft.Text("记一笔", size=16, weight="bold", color="white")
-            ], alignment="center", spacing=5),
-            style=ft.ButtonStyle(bgcolor=colors["orange"], color="white", elevation=10),
-            height=45,
-            on_click=show_write_modal
-        )
-        
-        # A. 时间轴视图 (Timeline)
-        timeline_view = ft.Column(
-            expand=True,
-            controls=[
-                # 顶部筛选栏
-                ft.Container(
-                    bgcolor=colors["card"],
-                    padding=ft.padding.only(top=50, left=15, right=15, bottom=20),
-                    margin=ft.margin.only(bottom=10),
-                    shadow=ft.BoxShadow(blur_radius=10, color=colors["shadow"]),
-                    content=ft.Row([
-                        ft.IconButton("arrow_back_ios", icon_size=16, on_click=lambda e: change_month(-1), icon_color=colors["icon"]),
-                        filter_label,# 中间的日期文字
-                        ft.IconButton("arrow_forward_ios", icon_size=16, on_click=lambda e: change_month(1), icon_color=colors["icon"]),
-                        ft.Container(expand=True),
-                        write_btn
-                    ], alignment="center")
-                ),
-
-                # 【新增】：搜索框容器
-                ft.Container(
-                    padding=ft.padding.symmetric(horizontal=15),
-                    content=search_input
-                ),
-        
-                # 列表区域
-                ft.Container(
-                    expand=True, padding=10,
-                    content=log_list
-                )
-            ]
-        )
-
-        # B. 写入视图 (Write Form) - 模仿原版 EXE 布局
-        write_view = ft.Column(
-            visible=False, expand=True,
-            controls=[
-                # 顶部
-                ft.Container(
-                    padding=ft.padding.only(top=35, left=15, bottom=10),
-                    bgcolor=colors["card"],
-                    shadow=ft.BoxShadow(blur_radius=10, color=colors["shadow"]),
-                    content=ft.Row([
-                        ft.IconButton("close", icon_size=26, on_click=close_write_modal, icon_color=colors["icon"]),
-                        ft.Text("记录吞吞的生活", size=20, weight="bold", color=colors["text"]),
-                        ft.Container(expand=True),
-                        # 【修改点 1】：保存按钮往左移 (增加右边距)
-                        ft.Container(
-                            margin=ft.margin.only(right=15), # 往左挤 15px
-                            content=ft.ElevatedButton(
-                                content=ft.Text("保存", size=16, weight="bold", color="white"),
-                                on_click=save_log,
-                                height=40,
-                                style=ft.ButtonStyle(bgcolor=colors["blue"], color="white", elevation=10)
-                            )
-                        )
-                    ])
-                ),
-                # 表单内容
-                ft.Column(
-                    scroll="hidden", expand=True, spacing=20,
-                    controls=[
-                        # 1. 狗狗图片 (支持长按更换)
-                        ft.Container(
-                            alignment=ft.alignment.center,
-                            margin=ft.margin.only(top=10),
-                            content=ft.Container(
-                                ref=avatar_content, # 绑定 Ref
-                                width=120, height=120, bgcolor="grey200", border_radius=60,
-                                content=load_avatar(), # 初始加载
-                                border=ft.border.all(4, colors["orange"]),
-                                on_long_press=show_avatar_options # 【核心】：绑定长按
-                            )
-                        ),
-                        
-                        # 2. 日期时间选择
-                        ft.Container(
-                            padding=20, margin=ft.margin.symmetric(horizontal=20),
-                            bgcolor=colors["card"], border_radius=15,
-                            content=ft.Column([
-                                ft.Text("时间信息", size=18, weight="bold", color=colors["sub_text"]),
-                                ft.Container(height=2),
-                                ft.Row([
-                                    ft.Icon("calendar_month", color=colors["blue"]),
-                                    ft.Text("日期:", size=18, color=colors["text"]),
-                                    ft.Container(
-                                        content=btn_date_display,
-                                        on_click=lambda _: log_date_picker.pick_date(),
-                                        padding=5
-                                    )
-                                ], alignment="start"),
-                                ft.Divider(height=1, color="grey100"),
-                                ft.Row([
-                                    ft.Icon("access_time", color=colors["blue"]),
-                                    ft.Text("时间:", size=18, color=colors["text"]),
-                                    ft.Container(
-                                        content=btn_time_display,
-                                        on_click=lambda _: log_time_picker.pick_time(),
-                                        padding=5
-                                    )
-                                ], alignment="start"),
-                            ])
-                        ),
+                leftover = LogRepository(app_storage)
+                if leftover.count():
+                    move_entries(leftover, backend)
+            except Exception:
+                backend.close()
+                raise
+        return backend
+
+    def on_backend_fallback(ex):
+        """SQLite 打不开、这次会话退回 JSON：设置里的开关跟着显示 JSON 并提示用户
+        保存的偏好不改：下次启动还会先试 SQLite，打开成功时由 open_primary_backend 把这次的记录并回去"""
+        storage_backend[0] = "json"
+        if "backend_changed" in view_hooks:
+            view_hooks["backend_changed"]()
+        page.snack_bar = ft.SnackBar(ft.Text(f"⚠️ SQLite 打不开，本次改用 JSON 存储: {ex}"), bgcolor="orange")
+        page.snack_bar.open = True
+        page.update()
 
-                        # 3. 乖巧度
-                        ft.Container(
-                            padding=10, margin=ft.margin.symmetric(horizontal=20),
-                            bgcolor=colors["card"], border_radius=15,
-                            content=ft.Column([
-                                ft.Text("今天乖不乖?", size=18, weight="bold", color=colors["sub_text"]),
-                                ft.Container(height=2),
-                                stars_row # 放入星星组件
-                            ], horizontal_alignment="center")
-                        ),
+    log_repo = LazyLogBackend(
+        open_primary_backend,
+        lambda: open_log_backend("json"),
+        on_backend_fallback
+    )
 
-                        # 4. 事件列表
-                        ft.Container(
-                            padding=20, margin=ft.margin.symmetric(horizontal=20),
-                            bgcolor=colors["card"], border_radius=15,
-                            content=ft.Column([
-                                ft.Text("吞吞发生了什么?", size=18, weight="bold", color=colors["sub_text"]),
-                                ft.Container(height=2),
-                                events_input_col,
-                                # 【修改点 4】：绑定新的添加函数 (限制5行)
-                                ft.TextButton(
-                                    content=ft.Text("+ 再加一行", size=16, color=colors["blue"]),
-                                    on_click=add_event_line, # 绑定新函数
-                                )
-                            ])
-                        ),
-                        ft.Container(height=50) # 底部垫高
-                    ]
-                )
-            ]
-        )
+    # 【新增】：搬家预约记录，独立分片、第一次用到才读取
+    booking_store = BookingStore(app_storage)
 
-        # 初始化加载一次数据
-        refresh_timeline()
-        reset_event_rows()
+    # 视图之间的通知钩子：日志页构建时注册自己的“局部修补”函数
+    # 例如设置页切换星星/骨头时，只改已渲染卡片上的那个文字，不重建列表
+    view_hooks = {}
 
-        # 返回 Stack 结构，包含两个视图
-        return ft.Stack(expand=True, controls=[timeline_view, write_view])
+    # 切换主题时，除了页面上的控件，各视图还可以登记“暂时不在页面上但以后会再显示”的控件
+    # (比如工具箱里当前没打开的那个工具、日志页缓存着的卡片)：名字 -> 返回这些控件的函数
+    theme_roots = {}
 
     # ---------------------------------------------------
-    # 页面 2: 工具箱 (修复版：严格顺序 + 补全缺失函数 + 动态主题)
+    # 三个页面：各自在单独的模块里，第一次打开时才导入
     # ---------------------------------------------------
-    def get_tools_view():
-        colors = get_app_colors() # 获取动态颜色
-
-        # --- 1. 初始化主容器 ---
-        tools_layout = ft.Column(expand=True, spacing=0)
-
-        # 定义一个状态列表，记录当前在哪里
-        # "menu" = 菜单页, "tool" = 工具页
-        current_view_status = ["menu"]
-
-        # --- 2. 侧边手势返回逻辑 ---
-        def on_keyboard(e: ft.KeyboardEvent):
-            if e.key == "Back":
-                # 如果当前是在工具页，则拦截返回键，执行回到菜单
-                if current_view_status[0] == "tool":
-                    show_menu()
-                else:
-                    # 如果在菜单页，什么都不做，让系统执行默认的退出操作
-                    pass
-        
-        # 【关键】：必须把这个函数绑定给 page
-        page.on_keyboard_event = on_keyboard
-
-        # --- 3. 状态与 Overlay 初始化 (必须最先执行) ---
-        page.overlay.clear() # 清除旧的防止叠加
-        
-        # 搬家助手：日历/时间回调
-        def on_date_change(e):
-            if date_picker.value:
-                date_input.value = date_picker.value.strftime("%d.%m.%Y")
-                update_move_preview(None)
-                page.update()
-        
-        def on_time_change(e):
-            if time_picker.value:
-                time_input.value = time_picker.value.strftime("%H:%M")
-                update_move_preview(None)
-                page.update()
-
-        date_picker = ft.DatePicker(on_change=on_date_change)
-        time_picker = ft.TimePicker(on_change=on_time_change)
-        page.overlay.extend([date_picker, time_picker])
-
-        # 搬家助手：帮手状态
-        helper_value = ["m.T."]
-
-        # --- 3. 定义所有 UI 控件 (必须在逻辑函数之前) ---
-        
-        # === A. 百度网盘清洗控件 ===
-        DEFAULT_PREFIX = "复制并打开"
-        DEFAULT_SUFFIX = (
-            "责任说明：因官方持续随机出新题，题库无法做到100%覆盖。"
-            "个人考试行为和能力无法控制，题库是帮助您降低学习压力，提高通过可能性的工具，而不是通过的绝对保证。"
-            "“最新”定义为买家个人整理资料的编辑时间为最新。"
-        )
-        prefix_field = ft.TextField(label="前缀文字", value=DEFAULT_PREFIX, height=40, text_size=14, content_padding=10, border_color="grey300", bgcolor=colors["input_bg"])
-        suffix_field = ft.TextField(label="免责声明后缀", value=DEFAULT_SUFFIX, multiline=True, min_lines=3, text_size=12, content_padding=10, border_color="grey300", bgcolor=colors["input_bg"])
-        
-        # 【重要】cleaner_input 必须在这里定义
-        cleaner_input = ft.TextField(multiline=True, min_lines=3, max_lines=5, hint_text="直接粘贴整段百度网盘分享口令...", bgcolor=colors["input_bg"], border_color="transparent", text_size=14, content_padding=10)
-        cleaner_output = ft.TextField(multiline=True, read_only=True, value="", min_lines=6, text_style=ft.TextStyle(color=colors["text"], size=14), bgcolor=colors["input_bg"], border_color="transparent", content_padding=10)
-        cleaner_feedback = ft.Text(value="", color="green600", size=14, weight="bold", text_align="center")
-        
-        # === B. 搬家助手控件 (V7.3 修复版) ===
-        
-        # 1. 日期控件组 (输入框 + 按钮)
-        date_input = ft.TextField(
-            label="日期", hint_text="dd.mm.yyyy",
-            expand=True, height=40, content_padding=10, text_size=14, 
-            border_color="grey300", 
-            text_align="center",
-            border_radius=8, # 【新增】：圆角
-            bgcolor=colors["input_bg"]
-        )
-        # 独立的日期选择按钮 (绝对能点)
-        date_button = ft.IconButton(
-            icon="calendar_month", 
-            icon_color=colors["orange"], 
-            on_click=lambda _: date_picker.pick_date()
-        )
-
-        # 2. 时间控件组 (输入框 + 按钮)
-        time_input = ft.TextField(
-            label="时间", hint_text="HH:MM", 
-            expand=True, height=40, content_padding=10, text_size=14, 
-            border_color="grey300", 
-            text_align="center",
-            border_radius=8, # 【新增】：圆角
-            bgcolor=colors["input_bg"]
-        )
-        time_button = ft.IconButton(
-            icon="access_time", 
-            icon_color=colors["orange"], 
-            on_click=lambda _: time_picker.pick_time()
-        )
-
-        # 3. 地址输入 (保持不变)
-        start_addr_input = ft.TextField(
-            hint_text="起点地址...", expand=True, height=50, text_size=14, 
-            content_padding=10, border_color="grey300",
-            border_radius=8, # 【新增】
-            bgcolor=colors["input_bg"]
-        )
-
-        end_addr_input = ft.TextField(
-            hint_text="终点地址...", expand=True, height=50, text_size=14, 
-            content_padding=10, border_color="grey300",
-            border_radius=8, # 【新增】
-            bgcolor=colors["input_bg"]
-        )
-
-        # 4. 价格与趟数 (大字号版)
-        price_input = ft.TextField(
-            label="价格", suffix_text="€", 
-            value="90", #显示预设值
-            expand=1, 
-            height=50, # 【修改点】：高度增加
-            content_padding=10, 
-            text_size=20, # 【修改点】：字号加大
-            border_color="grey300", keyboard_type="number", 
-            text_align="center",
-            border_radius=8,
-            bgcolor=colors["input_bg"]
-        )
-        trips_input = ft.TextField(
-            label="趟数", suffix_text="x", 
-            expand=1, 
-            height=50, # 【修改点】：高度增加
-            content_padding=10, 
-            text_size=20, # 【修改点】：字号加大
-            border_color="grey300", keyboard_type="number", value="1",
-            text_align="center",
-            border_radius=8,
-            bgcolor=colors["input_bg"]
-        )
-
-        # 5. 选项 (保持不变)
-        is_temp_booking = ft.Checkbox(label="临时预定 (不接受取消/更改)", value=False)
-        has_big_furniture = ft.Checkbox(label="大件家具 (显示提示)", value=False)
-
-        # 预览/反馈
-        move_preview_text = ft.Text(value="", font_family="monospace", size=13, color=colors["text"], selectable=True)
-        move_feedback_text = ft.Text(value="", color="green600", size=14, weight="bold", text_align="center")
-
-        # --- 4. 定义逻辑函数 (必须在控件之后，视图之前) ---
-
-        # === A. 清洗逻辑 ===
-        def clean_link(e):
-            raw_text = cleaner_input.value
-            if not raw_text:
-                cleaner_output.value = ""
-                page.update()
-                return
-            match = re.search(r"https://pan\.baidu\.com[^\s]*", raw_text)
-            if match:
-                url = match.group(0)
-                cleaner_output.value = f"{prefix_field.value}\n链接:{url}\n\n\n{suffix_field.value}"
-            else:
-                cleaner_output.value = "❌ 未检测到有效的百度网盘链接..."
-            page.update()
-
-        def paste_and_clean(e):
-            try:
-                clip_text = page.get_clipboard()
-                if clip_text:
-                    cleaner_input.value = clip_text
-                    clean_link(None)
-                page.update()
-            except: pass
-
-        def restore_defaults(e):
-            prefix_field.value = DEFAULT_PREFIX
-            suffix_field.value = DEFAULT_SUFFIX
-            clean_link(None)
-            page.update()
-
-        # 【修复点】：你之前漏掉了这个函数，导致 NameError
-        def copy_cleaner_result(e):
-            if cleaner_output.value and "❌" not in cleaner_output.value:
-                page.set_clipboard(cleaner_output.value)
-                cleaner_feedback.value = "✅ 已成功复制到剪贴板"
-            else:
-                cleaner_feedback.value = "⚠️ 没有内容可复制"
-            page.update()
-        
-        # 绑定清洗事件
-        cleaner_input.on_change = clean_link
-        prefix_field.on_change = clean_link
-        suffix_field.on_change = clean_link
-
-        # === B. 搬家逻辑 ===
-        def update_move_preview(e):
-            d_str = date_input.value or "dd.mm.yyyy"
-            t_str = time_input.value or "xx:xx"
-            h_str = helper_value[0]
-            
-            s_addr = start_addr_input.value or ""
-            e_addr = end_addr_input.value or ""
-            s_addr = re.sub(r'Aachen\s*$', 'AC', s_addr, flags=re.IGNORECASE)
-            e_addr = re.sub(r'Aachen\s*$', 'AC', e_addr, flags=re.IGNORECASE)
-
-            # 价格逻辑修改
-            # 如果输入框是空的 (用户没填)，就取 "90"；如果填了，就用填的值
-            price = price_input.value if price_input.value else "90"
-            trips = trips_input.value or "1"
-
-            if is_temp_booking.value:
-                cancellation_text = "临时预定不接受取消/更改，"
-            else:
-                try:
-                    dt = datetime.datetime.strptime(d_str, "%d.%m.%Y")
-                    notify_dt = dt - datetime.timedelta(days=2)
-                    cancellation_text = f"如有时间更改需要请于{notify_dt.day}号结束前通知，过后取消/更改需收取20%原标价。"
-                except:
-                    cancellation_text = "如有时间更改需要请于(dd-2)号结束前通知，过后取消/更改需收取20%原标价。"
-
-            furniture_text = "如有大件请保证提前拆卸和通道畅通。" if has_big_furniture.value else ""
-
-            move_preview_text.value = (
-                f"🗓️ {d_str}   🕗 {t_str}   {h_str}\n\n"
-                f"{s_addr}\n"
-                f"➡ \n"
-                f"{e_addr}\n\n\n"
-                f"{price}€  {trips}x\n\n"
-                f"_________________________________ \n"
-                f"车型已确定，{cancellation_text}{furniture_text}如遇时间轻微变动以司机信息为准，敬请谅解。现场支持现金/PayPal付款。"
-            )
-            page.update()
-
-        def copy_move_result(e):
-            if move_preview_text.value:
-                page.set_clipboard(move_preview_text.value)
-                move_feedback_text.value = "✅ 已复制搬家信息"
-            else:
-                move_feedback_text.value = "⚠️ 信息为空"
-            page.update()
-        
-        # 帮手切换逻辑 (需要在此处定义toggle_helper，因为它用到 update_move_preview)
-        def toggle_helper(e):
-            val = e.control.data
-            helper_value[0] = val
-            btn_mt.bgcolor = colors["orange"] if val == "m.T." else "grey200"
-            btn_mt_content.color = "white" if val == "m.T." else "black"
-            btn_ot.bgcolor = colors["orange"] if val == "o.T." else "grey200"
-            btn_ot_content.color = "white" if val == "o.T." else "black"
-            update_move_preview(None)
-            page.update()
-
-        # 定义帮手按钮 (逻辑之后)
-        btn_mt_content = ft.Text("m.T. (有帮手)", color="white", weight="bold", size=16)
-        btn_ot_content = ft.Text("o.T. (无帮手)", color="black", weight="bold", size=16)
-        btn_mt = ft.Container(content=btn_mt_content, data="m.T.", expand=True, height=40, bgcolor=colors["orange"], border_radius=ft.border_radius.only(top_left=8, bottom_left=8), alignment=ft.alignment.center, on_click=toggle_helper)
-        btn_ot = ft.Container(content=btn_ot_content, data="o.T.", expand=True, height=40, bgcolor="grey200", border_radius=ft.border_radius.only(top_right=8, bottom_right=8), alignment=ft.alignment.center, on_click=toggle_helper)
-        helper_switch_row = ft.Row([btn_mt, btn_ot], spacing=1)
-
-        # 绑定搬家事件
-        for ctrl in [start_addr_input, end_addr_input, price_input, trips_input, is_temp_booking, has_big_furniture, date_input, time_input]:
-            ctrl.on_change = update_move_preview
-
-        # --- 5. 视图组装 (卡片工厂 & 路由函数) ---
-        def make_card(content_ctrl, border_color="transparent", padding_val=15):
-            border_arg = None
-            if border_color != "transparent":
-                border_arg = ft.border.all(2, border_color)
-            return ft.Container(
-                content=content_ctrl, bgcolor=colors["card"], padding=padding_val, border_radius=12, border=border_arg,
-                shadow=ft.BoxShadow(spread_radius=1, blur_radius=5, color=colors["shadow"])
-            )
-        
-        # --- 增加数据重置逻辑 ---
-        # 【修改点2】：定义重置函数
-        def reset_all_data():
-            # 重置清洗工具
-            cleaner_input.value = ""
-            cleaner_output.value = ""
-            cleaner_feedback.value = ""
-            # 重置搬家助手
-            date_input.value = ""
-            time_input.value = ""
-            start_addr_input.value = ""
-            end_addr_input.value = ""
-            price_input.value = ""
-            trips_input.value = "1"
-            is_temp_booking.value = False
-            has_big_furniture.value = False
-            move_feedback_text.value = "" # 清空搬家助手的反馈
-            helper_value[0] = "m.T." # 重置帮手状态
-            # 重置按钮样式
-            btn_mt.bgcolor = colors["orange"]
-            btn_mt_content.color = "white"
-            btn_ot.bgcolor = "grey200"
-            btn_ot_content.color = "black"
-            
-        # 1. 菜单页
-        def show_menu(e=None):
-            current_view_status[0] = "menu" # 标记为菜单页
-            reset_all_data() # 【修改点2】：每次回到菜单时，清空数据
-            tools_layout.controls = [
-                ft.Container(height=50), # 避开刘海
-                # 菜单卡片1
-                ft.Container(
-                    padding=20, margin=ft.margin.symmetric(horizontal=20),
-                    bgcolor=colors["card"], border_radius=15, height=150,
-                    shadow=ft.BoxShadow(blur_radius=10, color=colors["shadow"]),
-                    content=ft.Row([
-                        ft.Container(width=3), # 缩进
-                        ft.Icon("cleaning_services", size=50, color=colors["blue"]),
-                        ft.Container(width=1), # 缩进
-                        ft.Column([
-                            ft.Text("百度网盘链接清洗", size=22, weight="bold", color=colors["text"]),
-                            ft.Text("自动格式化分享链接", size=16, color=colors["sub_text"])
-                        ], spacing=2, alignment="center")
-                    ], alignment="start"),
-                    on_click=show_cleaner
-                ),
-                ft.Container(height=20),
-                # 菜单卡片2
-                ft.Container(
-                    padding=20, margin=ft.margin.symmetric(horizontal=20),
-                    bgcolor=colors["card"], border_radius=15, height=150,
-                    shadow=ft.BoxShadow(blur_radius=10, color=colors["shadow"]),
-                    content=ft.Row([
-                        ft.Container(width=3), # 缩进
-                        ft.Icon("local_shipping", size=50, color=colors["orange"]),
-                        ft.Container(width=1), # 缩进
-                        ft.Column([
-                            ft.Text("搬家助手", size=22, weight="bold", color=colors["text"]),
-                            ft.Text("生成搬家信息小结", size=16, color=colors["sub_text"])
-                        ], spacing=2, alignment="center")
-                    ], alignment="start"),
-                    on_click=show_mover
-                )
-            ]
-            page.update()
-
-        # 2. 清洗工具页
-        def show_cleaner(e):
-            current_view_status[0] = "tool" # 标记为工具页
-            tools_layout.controls = [
-                # 顶部返回栏 (Top Margin 45)
-                ft.Container(
-                    bgcolor=colors["blue"], padding=10, margin=ft.margin.only(top=25, bottom=20),
-                    content=ft.Row([
-                        # 【核心修改】：用 Container 包裹 Icon 代替 IconButton
-                        ft.Container(
-                            content=ft.Icon("arrow_back", color="white"),
-                            padding=12, # 增加内边距，扩大点击范围
-                            on_click=show_menu, # 点击事件绑在容器上
-                            border_radius=70, # 圆形点击反馈
-                            ink=True # (可选) 增加点击水波纹效果
-                        ),
-                        ft.Text("百度网盘链接清洗", size=24, color="white", weight="bold")
-                    ])
-                ),
-                # 滚动内容
-                ft.Column(expand=True, scroll="hidden", controls=[
-                    ft.Container(padding=ft.padding.symmetric(horizontal=20), content=make_card(
-                        ft.ExpansionTile(
-                            title=ft.Text("⚙️ 修改固定话术", size=13, weight="bold", color=colors["sub_text"]),
-                            initially_expanded=False,
-                            tile_padding=ft.padding.only(left=10, right=10, top=0, bottom=0),
-                            controls_padding=ft.padding.only(top=10, bottom=10),
-                            controls=[prefix_field, ft.Container(height=10), suffix_field, ft.Container(height=10), ft.TextButton("恢复默认话术", icon="restore", on_click=restore_defaults)]
-                        ), padding_val=5
-                    )),
-                    ft.Container(height=5),
-                    ft.Container(padding=ft.padding.symmetric(horizontal=20), content=make_card(ft.Column([
-                        ft.Row([ft.Text("  步骤1: 粘贴原始分享文案", size=15, weight="bold", color=colors["text"]),
-                                ft.ElevatedButton("粘贴并处理", icon="paste", on_click=paste_and_clean, height=36, width=140, style=ft.ButtonStyle(padding=0, bgcolor="blue50", color=colors["blue"], elevation=0))
-                        ], alignment="spaceBetween"),
-                        ft.Container(height=5), cleaner_input # 这里引用不会报错了，因为上面已经定义了
-                    ]))),
-                    ft.Container(height=5),
-                    ft.Container(padding=ft.padding.symmetric(horizontal=20), content=make_card(ft.Column([
-                        ft.Row([ft.Text("  步骤2: 复制发送", size=15, weight="bold", color=colors["text"]),
-                                ft.Container(content=ft.Text("最终效果 (已加空行)", size=14, color="white", weight="bold", text_align="center"), bgcolor=colors["blue"], height=30, width=140, alignment=ft.alignment.center, padding=ft.padding.symmetric(horizontal=0, vertical=5), border_radius=20)
-                        ], alignment="spaceBetween"),
-                        ft.Container(height=5), cleaner_output
-                    ]), border_color=colors["blue"])),
-                    ft.Container(height=20)
-                ]),
-                # 底部按钮
-                ft.Container(
-                    bgcolor=colors["card"], padding=ft.padding.only(left=20, right=20, top=10, bottom=10),
-                    shadow=ft.BoxShadow(blur_radius=10, color="black12", offset=ft.Offset(0, -5)),
-                    content=ft.Column([
-                        ft.Container(content=cleaner_feedback, alignment=ft.alignment.center, padding=ft.padding.only(bottom=2)),
-                        ft.ElevatedButton(
-                            content=ft.Row([ft.Icon("rocket_launch", color="white"), ft.Text("一键复制", size=20, weight="bold", color="white")], alignment="center", spacing=5),
-                            on_click=copy_cleaner_result, # 这里引用不会报错了
-                            height=60, width=float("inf"),
-                            style=ft.ButtonStyle(shape=ft.RoundedRectangleBorder(radius=12), bgcolor=colors["blue"], color="white")
-                        )
-                    ], spacing=0)
-                )
-            ]
-            page.update()
+    def get_log_view():
+        from log_view import build_log_view
+        return build_log_view(ctx)
 
-        # 3. 搬家工具页
-        def show_mover(e):
-            current_view_status[0] = "tool" # 标记为工具页
-            update_move_preview(None)
-            tools_layout.controls = [
-                # 顶部返回栏 (Top Margin 45)
-                ft.Container(
-                    bgcolor=colors["orange"], padding=10, margin=ft.margin.only(top=25, bottom=20),
-                    content=ft.Row([
-                        # 【核心修改】：用 Container 包裹 Icon 代替 IconButton
-                        ft.Container(
-                            content=ft.Icon("arrow_back", color="white"),
-                            padding=12, # 增加内边距，扩大点击范围
-                            on_click=show_menu, # 点击事件绑在容器上
-                            border_radius=70, # 圆形点击反馈
-                            ink=True # (可选) 增加点击水波纹效果
-                        ),
-                        ft.Text("搬家助手", size=24, color="white", weight="bold")
-                    ])
-                ),
-                ft.Column(expand=True, scroll="hidden", controls=[
-                    # 预览卡片 (修复底部空白)
-                    ft.Container(padding=ft.padding.symmetric(horizontal=20), content=make_card(ft.Column([
-                        
-                        # 顶部标题栏
-                        ft.Row([
-                            ft.Text("信息预览", size=15, weight="bold", color=colors["text"]), 
-                            ft.ElevatedButton("复制文本", icon="copy", on_click=copy_move_result, height=36, style=ft.ButtonStyle(bgcolor=colors["orange"], color="white"))], alignment="spaceBetween"),
-                        
-                        ft.Container(height=10), # 标题和内容的间距
-                        
-                        # 内容区域
-                        ft.Container(
-                            content=move_preview_text, 
-                            border=ft.border.only(left=ft.border.BorderSide(4, colors["orange"])), 
-                            padding=ft.padding.only(left=15)
-                        ),
-                        
-                        # 【核心修改】：移除之前这里的 Container(height=5)
-                        # 【核心修改】：直接放反馈文字，它会自动紧贴
-                        ft.Container(
-                            content=move_feedback_text, 
-                            alignment=ft.alignment.center,
-                            # 如果有文字显示时，稍微给点上边距；没有文字时高度几乎为0
-                            padding=ft.padding.only(top=5) 
-                        )
-                    ], spacing=0))), # 【关键】：显式设置 spacing=0，消除默认的大间距
-                    
-                    ft.Container(height=1),
-                    # 表单
-                    # 填写表单
-                    ft.Container(padding=ft.padding.symmetric(horizontal=20), content=make_card(ft.Column([
-                        # 【核心修改】：显式添加 spacing=0，消除默认间距
-                        ft.Text("基础信息", size=15, weight="bold", color=colors["sub_text"]),
-                        ft.Container(height=5), 
-                        
-                        # 日期行
-                        ft.Row([date_input, date_button], spacing=5),
-                        ft.Container(height=5), # 现在这里的 5 就是真实的 5px
-                        
-                        # 时间行
-                        ft.Row([time_input, time_button], spacing=5),
-                        ft.Container(height=10), 
-                        
-                        # 帮手切换
-                        helper_switch_row, 
-                        ft.Container(height=15), # 分区大间距
-                        
-                        # 地址栏
-                        ft.Text("地址:  自动 AC", size=15, weight="bold", color=colors["sub_text"]),
-                        ft.Container(height=10),
-                        ft.Row([ft.Icon("location_on", color="green"), start_addr_input]),
-                        ft.Container(height=10),
-                        ft.Row([ft.Icon("location_on", color="red"), end_addr_input]),
-                        ft.Container(height=15),
-                        
-                        # 价格与趟数
-                        ft.Row([price_input, trips_input], spacing=10),
-                        ft.Container(height=10),
-                        
-                        # 选项
-                        ft.Container(content=is_temp_booking, bgcolor=colors["input_bg"], padding=2, border_radius=8),
-                        ft.Container(height=5),
-                        ft.Container(content=has_big_furniture, bgcolor=colors["input_bg"], padding=2, border_radius=8),
-                    ], spacing=2))), # 【注意】：这里加上 spacing=0
-                    ft.Container(height=50)
-                ])
-            ]
-            page.update()
+    def get_tools_view():
+        from tools_view import build_tools_view
+        return build_tools_view(ctx)
 
-        # 启动显示
-        show_menu()
-        return tools_layout
-        
-    # ---------------------------------------------------
-    # 页面 3: 设置 (V12: 动态主题 + 骨头开关 + 修复导出)
-    # ---------------------------------------------------
     def get_settings_view():
-        colors = get_app_colors() # 获取当前颜色
-        is_dark = page.theme_mode == "dark"
-        is_bone = icon_preference[0] == "bone"
-
-        # --- 1. 文件处理 (修改为 JSON 导入导出) ---
-        def on_export_result(e: ft.FilePickerResultEvent):
-            if e.path:
-                try:
-                    # 【核心修改】将数据导出为 JSON 文件
-                    logs = get_all_logs()
-                    with open(e.path, 'w', encoding='utf-8') as f:
-                        json.dump(logs, f, ensure_ascii=False, indent=2)
-                    
-                    page.snack_bar = ft.SnackBar(ft.Text("✅ 备份成功！(JSON)"), bgcolor="green")
-                    page.snack_bar.open = True
-                    page.update()
-                except Exception as ex:
-                    page.snack_bar = ft.SnackBar(ft.Text(f"❌ 失败: {ex}"), bgcolor="red")
-                    page.snack_bar.open = True
-                    page.update()
-
-        def on_import_result(e: ft.FilePickerResultEvent):
-            if e.files:
-                try:
-                    # 【核心修改】从 JSON 文件恢复数据
-                    with open(e.files[0].path, 'r', encoding='utf-8') as f:
-                        logs = json.load(f)
-                    # 存入 Storage
-                    save_logs_to_storage(logs)
-                    
-                    page.snack_bar = ft.SnackBar(ft.Text("✅ 恢复成功！请刷新页面"), bgcolor="green")
-                    page.snack_bar.open = True
-                    page.update()
-                except Exception as ex:
-                    page.snack_bar = ft.SnackBar(ft.Text(f"❌ 失败: {ex}"), bgcolor="red")
-                    page.snack_bar.open = True
-                    page.update()
-
-        export_picker = ft.FilePicker(on_result=on_export_result)
-        import_picker = ft.FilePicker(on_result=on_import_result)
-        # 【关键修复】：每次进入设置页都重新挂载，防止被其他页面清除
-        page.overlay.extend([export_picker, import_picker])
-
-        # --- 2. 切换逻辑 ---
-        def toggle_theme(e):
-            page.theme_mode = "dark" if e.control.value else "light"
-            page.bgcolor = get_app_colors()["bg"] # 立即更新大背景
-            page.update()
-            # 强制重载当前页面以应用新颜色
-            class DummyEvent:
-                class Control: selected_index = 2
-                control = Control()
-            on_nav_change(DummyEvent())
-
-        def toggle_sort_order(e):
-            """切换排序方式"""
-            val = "asc" if e.control.value else "desc"
-            sort_preference[0] = val
-            page.client_storage.set("sort_preference", val)
-            page.update()
-            # 不需要强制刷新页面，因为这只影响 Log 页，下次去 Log 页会自动刷新
-
-        def toggle_icon_style(e):
-            val = e.control.data
-            icon_preference[0] = val
-            page.client_storage.set("icon_preference", val)
-            
-            # 更新按钮视觉状态
-            btn_star.bgcolor = colors["orange"] if val == "star" else colors["input_bg"]
-            btn_star_content.color = "white" if val == "star" else colors["text"]
-            btn_bone.bgcolor = colors["orange"] if val == "bone" else colors["input_bg"]
-            btn_bone_content.color = "white" if val == "bone" else colors["text"]
-            page.update()
-
-        # --- 3. 骨头/星星 切换按钮组 ---
-        btn_star_content = ft.Text("⭐ 星星", color="white" if not is_bone else colors["text"], weight="bold")
-        btn_bone_content = ft.Text("🦴 骨头", color="white" if is_bone else colors["text"], weight="bold")
-        
-        btn_star = ft.Container(
-            content=btn_star_content, data="star", expand=True, height=35,
-            bgcolor=colors["orange"] if not is_bone else colors["input_bg"],
-            border_radius=ft.border_radius.only(top_left=8, bottom_left=8),
-            alignment=ft.alignment.center, on_click=toggle_icon_style,
-            border=ft.border.all(1, colors["orange"])
-        )
-        btn_bone = ft.Container(
-            content=btn_bone_content, data="bone", expand=True, height=35,
-            bgcolor=colors["orange"] if is_bone else colors["input_bg"],
-            border_radius=ft.border_radius.only(top_right=8, bottom_right=8),
-            alignment=ft.alignment.center, on_click=toggle_icon_style,
-            border=ft.border.all(1, colors["orange"])
-        )
-        icon_switch_row = ft.Row([btn_star, btn_bone], spacing=0)
-
-        # --- 关于弹窗 ---
-        def show_about(e):
-            page.dialog = ft.AlertDialog(
-                title=ft.Text("关于 My Omnis"),
-                content=ft.Column([
-                    # 【核心修改】：删除了不存在的 Image，改用 Icon 防止报错，或者确保你有 icons/logo.png
-                    ft.Image(src="/logo.png", width=60, height=60, error_content=ft.Icon("pets", size=60, color=colors["orange"])),
-                    
-                    ft.Text("\n版本: v1.0.0 (Alpha)"),
-                    ft.Text("开发: Python 3.14 + Flet"),
-                    ft.Text("\n专门为吞吞开发的记录工具\n记录每一个可爱瞬间！\n(顺带便捷她爹的工作流)"),
-                ], tight=True, horizontal_alignment="center", spacing=5),
-                actions=[ft.TextButton("关闭", on_click=lambda _: setattr(page.dialog, 'open', False) or page.update())],
-                actions_alignment="center"
-            )
-            page.dialog.open = True
-            page.update()
+        from settings_view import build_settings_view
+        return build_settings_view(ctx)
 
-        # --- 4. 辅助函数：设置卡片 (修复间距问题) ---
-        def setting_card(title, controls):
-            return ft.Container(
-                bgcolor=colors["card"],
-                margin=ft.margin.symmetric(horizontal=20),
-                padding=ft.padding.symmetric(horizontal=25, vertical=15),
-                border_radius=15,
-                content=ft.Column([
-                    ft.Text(title, weight="bold", size=16, color=colors["sub_text"]),
-                    # 【核心修改】：在这里增加一点微小的间距(5px)，而不是像之前那样留太多
-                    ft.Container(height=10), 
-                    # 【核心修改】：controls 容器本身不留间距，由控件自己控制
-                    ft.Column(controls, spacing=0) 
-                ], spacing=0) # 【核心修改】：父容器 spacing=0，防止标题离得太远
-            )
-
-        return ft.Column(
-            controls=[
-                ft.Container(height=40),
-                # 胶囊标题
-                ft.Container(
-                    content=ft.Text("⚙️ 设置", size=24, weight="bold", color="white"),
-                    bgcolor=colors["blue"],
-                    padding=ft.padding.symmetric(horizontal=120, vertical=10),
-                    border_radius=20, margin=ft.margin.only(bottom=2),
-                    shadow=ft.BoxShadow(blur_radius=10, color=ft.colors.with_opacity(0.4, colors["blue"]))
-                ),
-                ft.Container(height=3),
-                
-                # 外观设置
-                setting_card("外观", [
-                    # 1. 暗黑模式
-                    ft.ListTile(
-                        leading=ft.Icon("dark_mode", color=colors["icon"]),
-                        title=ft.Text("暗黑模式", size=16, color=colors["text"]),
-                        trailing=ft.Switch(value=is_dark, on_change=toggle_theme, active_color=colors["orange"]),
-                        content_padding=0, # 贴边
-                        dense=True, # 【核心修改】：紧凑模式，减少垂直高度
-                    ),
-                    # 间距
-                    ft.Container(height=10), 
-
-                    # 2. 排序开关
-                    ft.ListTile(
-                        leading=ft.Icon("sort", color=colors["icon"]),
-                        title=ft.Text("时间正序排列 (旧->新)", size=16, color=colors["text"]),
-                        # 开关打开 = asc (正序)，关闭 = desc (倒序/默认)
-                        trailing=ft.Switch(value=(sort_preference[0] == "asc"), on_change=toggle_sort_order, active_color=colors["orange"]),
-                        content_padding=0,
-                        dense=True
-                    ),
-
-                    ft.Container(height=20),
+    # ==========================================
+    # 视图缓存：每个标签页只构建一次，切换时只改 visible
+    # 切换标签的开销和日志数量无关；换主题只换色 (apply_theme)，数据变化由 view_hooks 局部刷新
+    # ==========================================
+    view_builders = {0: get_log_view, 1: get_tools_view, 2: get_settings_view}
+    view_cache = {}    # idx -> 视图根控件
+    view_overlays = {} # idx -> 该视图构建时挂到 page.overlay 的控件
+
+    def show_view(idx):
+        """显示某个标签页：第一次访问才构建"""
+        if idx not in view_cache:
+            overlay_before = list(page.overlay)
+            view = view_builders[idx]()
+            view_overlays[idx] = [c for c in page.overlay if c not in overlay_before]
+            view_cache[idx] = view
+            page.controls.append(view)
+        for i, view in view_cache.items():
+            view.visible = (i == idx)
+        page.update()
 
-                    ft.Row([
-                        ft.Text("乖巧度图标:", size=16, color=colors["text"]),
-                        ft.Container(width=20),
-                        ft.Container(content=icon_switch_row, width=160)
-                    ], alignment="spaceBetween")
-                ]),
+    def apply_theme(mode):
+        """切换深色/浅色：按调色板给已有控件换色，不丢弃视图、不重新读取日志"""
+        page.theme_mode = mode
+        page.bgcolor = app_colors["bg"]
+        if not RESTYLE_SUPPORTED:
+            rebuild_views()
+            return
+        controls = [page.navigation_bar, *view_cache.values()]
+        for ctrls in view_overlays.values(): controls.extend(ctrls)
+        for get_extra in theme_roots.values(): controls.extend(get_extra())
+        restyle_controls(controls, mode)
+        page.update()
 
-                # 数据管理
-                setting_card("数据管理", [ # 这里的标题字号会自动应用上面的 size=16
-                    ft.ListTile(
-                        leading=ft.Icon("upload_file", color=colors["blue"]),
-                        title=ft.Text("导出数据备份", color=colors["text"]),
-                        subtitle=ft.Text("保存 .json 文件", size=12, color=colors["sub_text"]),
-                        on_click=lambda _: export_picker.save_file(file_name="tuntun_backup.json"),
-                        content_padding=0,
-                        dense=True # 【修改】：紧凑
-                    ),
-                    # 分割线上下稍微留白一点点，或者直接设为0
-                    ft.Divider(height=1, color=colors["divider"]), 
-                    ft.ListTile(
-                        leading=ft.Icon("download", color=colors["orange"]),
-                        title=ft.Text("导入数据恢复", color=colors["text"]),
-                        subtitle=ft.Text("选择 .json 备份", size=12, color="red"),
-                        on_click=lambda _: import_picker.pick_files(allow_multiple=False, allowed_extensions=["json"]),
-                        content_padding=0,
-                        dense=True # 【修改】：紧凑
-                    )
-                ]),
+    def rebuild_views():
+        """Flet 版本/内部属性对不上、不能原地换色时的退路：丢掉缓存的视图，按新主题重建当前标签页
+        视图登记的换色控件和通知钩子也一起清掉，重建的视图会重新登记 (不留指向旧控件的钩子)"""
+        page.navigation_bar.bgcolor = app_colors["card"]
+        for idx, view in view_cache.items():
+            page.controls.remove(view)
+            for ctrl in view_overlays.pop(idx, []):
+                if ctrl in page.overlay: page.overlay.remove(ctrl)
+        view_cache.clear()
+        theme_roots.clear()
+        view_hooks.clear()
+        show_view(page.navigation_bar.selected_index)
+
+    ctx = AppContext(
+        page=page, storage=app_storage, log_repo=log_repo, booking_store=booking_store, get_app_colors=get_app_colors,
+        icon_preference=icon_preference, sort_preference=sort_preference, storage_backend=storage_backend,
+        view_hooks=view_hooks, open_log_backend=open_log_backend,
+        apply_theme=apply_theme, theme_roots=theme_roots
+    )
 
-                # 关于
-                setting_card("关于", [
-                    ft.ListTile(
-                        leading=ft.Icon("info", color=colors["icon"]),
-                        title=ft.Text("关于 Omnis", size=16, color=colors["text"]),
-                        trailing=ft.Icon("chevron_right", color=colors["icon"]),
-                        on_click=show_about,
-                        content_padding=0,
-                        dense=True # 【修改】：紧凑
-                    )
-                ]),
-                
-                ft.Container(content=ft.Text("My Omnis v1.0.0 Beta", color=colors["sub_text"], size=12), alignment=ft.alignment.center, padding=20)
-            ],
-            scroll="hidden", expand=True, alignment="center", horizontal_alignment="center", spacing=15
-        )
-    
     # 导航逻辑
+    startup_done = threading.Event() # 后台启动阶段画出第一个页面后置位
+
     def on_nav_change(e):
-        # 1. 重新获取当前颜色的配置 (因为可能刚切换了暗黑模式)
-        current_colors = get_app_colors()
-        
-        # 2. 【核心修复】：强制更新导航栏颜色
-        page.navigation_bar.bgcolor = current_colors["card"]
-        # page.navigation_bar.update() # page.update() 会涵盖它，所以这里不用单独写
-        
-        idx = e.control.selected_index
-        page.clean()
-        
-        if idx == 0: page.add(get_log_view())
-        elif idx == 1: page.add(get_tools_view())
-        elif idx == 2: page.add(get_settings_view())
-        
-        page.update()
+        # 启动后极短的一段时间里偏好可能还没读完：等第一个页面画好再切，页面要按偏好构建
+        startup_done.wait()
+        show_view(e.control.selected_index)
 
     # 0.22.1 导航栏写法
     # 获取初始颜色
@@ -1461,7 +252,45 @@ def main(page: ft.Page):
         ]
     )
 
-    page.add(get_tools_view())
+    # ==========================================
+    # 分阶段启动
+    # 1. 关键路径上只画导航栏 + 一个轻量外壳 (转圈)，main() 随即返回，尽快出第一帧
+    # 2. 后台线程：读偏好设置 (几次存储往返)、构建当前标签页 (默认工具页，日志页/设置页等用户点到才构建)
+    # 3. 同一个线程接着预取日志数据，第一次点开日志页时不用再等
+    # ==========================================
+    startup_shell = ft.Container(
+        expand=True, alignment=ft.alignment.center,
+        content=ft.ProgressRing(width=32, height=32, stroke_width=3, color=init_colors["orange"])
+    )
+    page.add(startup_shell)
+    startup.mark("首帧 (外壳)")
+
+    def load_preferences():
+        icon_preference[0] = app_storage.get("icon_preference") or "star"
+        sort_preference[0] = app_storage.get("sort_preference") or "desc"
+        storage_backend[0] = app_storage.get("storage_backend") or "json"
+
+    def finish_startup():
+        """后台：读偏好 -> 换下外壳、显示当前标签页 -> 预取日志 (SQLite 初始化也在这里，不会拖慢启动)"""
+        try:
+            load_preferences()
+        except Exception as ex:
+            print(f"读取偏好失败，使用默认值: {ex}")
+        startup.mark("读取偏好")
+        try:
+            page.controls.remove(startup_shell)
+            show_view(page.navigation_bar.selected_index)
+            startup.mark("首个页面可用")
+        finally:
+            startup_done.set() # 出错也不能让导航一直等着
+        try:
+            log_repo.count()
+            startup.mark("日志预取完成")
+        except Exception as ex:
+            print(f"日志预取失败: {ex}")
+        startup.report()
+
+    threading.Thread(target=finish_startup, daemon=True).start()
 
 if __name__ == "__main__":
     # 【核心】：使用 "." 作为 assets_dir，这是 GitHub 打包的最佳实践
@@ -0,0 +1,358 @@
+import flet as ft
+import threading
+from theme import with_opacity
+
+# ---------------------------------------------------
+# 页面 3: 设置 (V12: 动态主题 + 骨头开关 + 修复导出)
+# ---------------------------------------------------
+def build_settings_view(ctx):
+    # 共享状态都从 ctx (AppContext) 取
+    page = ctx.page
+    app_storage = ctx.storage
+    log_repo = ctx.log_repo
+    get_app_colors = ctx.get_app_colors
+    icon_preference = ctx.icon_preference
+    sort_preference = ctx.sort_preference
+    storage_backend = ctx.storage_backend
+    view_hooks = ctx.view_hooks
+    open_log_backend = ctx.open_log_backend
+    apply_theme = ctx.apply_theme
+
+    colors = get_app_colors() # 获取当前颜色
+    is_dark = page.theme_mode == "dark"
+    is_bone = icon_preference[0] == "bone"
+
+    # --- 1. 文件处理 (修改为 JSON 导入导出) ---
+    # 导出进度条 (导出时才显示)
+    export_progress = ft.ProgressBar(value=0, visible=False, color=colors["blue"], bgcolor=colors["divider"])
+    # 紧凑格式开关：不缩进，文件更小、写得更快
+    export_compact = ft.Switch(value=False, active_color=colors["orange"])
+
+    def run_export(path, compact):
+        """在后台线程流式写文件，UI 线程只负责更新进度条"""
+        from backup import export_logs_json # 用到才导入
+        total = log_repo.count()
+
+        def on_progress(written):
+            export_progress.value = (written / total) if total else 1
+            export_progress.update()
+
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                export_logs_json(f, log_repo.iter_chunks(), compact=compact, on_progress=on_progress)
+            page.snack_bar = ft.SnackBar(ft.Text("✅ 备份成功！(JSON)"), bgcolor="green")
+        except Exception as ex:
+            page.snack_bar = ft.SnackBar(ft.Text(f"❌ 失败: {ex}"), bgcolor="red")
+        export_progress.visible = False
+        page.snack_bar.open = True
+        page.update()
+
+    def on_export_result(e: ft.FilePickerResultEvent):
+        if e.path:
+            # 【优化】：流式导出放到后台线程，大日记也不会卡住界面
+            export_progress.value = 0
+            export_progress.visible = True
+            page.update()
+            threading.Thread(target=run_export, args=(e.path, export_compact.value), daemon=True).start()
+
+    def run_snapshot_export(path):
+        """后台线程：导出紧凑快照 (.omnis)"""
+        from backup import encode_snapshot
+        from itertools import chain
+        try:
+            # 按月份分片逐批喂给编码器，不先拼出一份完整的排序副本
+            entries = chain.from_iterable(log_repo.iter_chunks())
+            with open(path, 'wb') as f:
+                f.write(encode_snapshot(entries))
+            page.snack_bar = ft.SnackBar(ft.Text("✅ 备份成功！(紧凑快照)"), bgcolor="green")
+        except Exception as ex:
+            page.snack_bar = ft.SnackBar(ft.Text(f"❌ 失败: {ex}"), bgcolor="red")
+        export_progress.visible = False
+        page.snack_bar.open = True
+        page.update()
+
+    def on_snapshot_export_result(e: ft.FilePickerResultEvent):
+        if e.path:
+            export_progress.value = None
+            export_progress.visible = True
+            page.update()
+            threading.Thread(target=run_snapshot_export, args=(e.path,), daemon=True).start()
+
+    def read_json_backup(path):
+        from backup import iter_json_array
+        # utf-8-sig：兼容带 BOM 的备份文件
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            yield from iter_json_array(f)
+
+    def read_snapshot_backup(path):
+        from backup import decode_snapshot
+        with open(path, 'rb') as f:
+            return decode_snapshot(f.read())
+
+    def run_import(path, read_records):
+        """后台线程：逐条解析 + 校验，最后按 id 一次性合并 (JSON 和快照共用)"""
+        from backup import validate_log_entry
+        try:
+            valid, skipped = [], 0
+            for raw in read_records(path):
+                entry = validate_log_entry(raw)
+                if entry is None: skipped += 1
+                else: valid.append(entry)
+            # 【优化】：合并而不是覆盖，索引只在最后重建一次
+            added, updated = log_repo.merge(valid)
+            # 缓存着的日志页直接重新查询，不用手动刷新
+            if "data_changed" in view_hooks:
+                view_hooks["data_changed"]()
+            msg = f"✅ 恢复成功！新增 {added} 条，更新 {updated} 条"
+            if skipped: msg += f"，跳过 {skipped} 条无效记录"
+            page.snack_bar = ft.SnackBar(ft.Text(msg), bgcolor="green")
+        except Exception as ex:
+            page.snack_bar = ft.SnackBar(ft.Text(f"❌ 失败: {ex}"), bgcolor="red")
+        export_progress.visible = False
+        page.snack_bar.open = True
+        page.update()
+
+    def on_import_result(e: ft.FilePickerResultEvent):
+        if e.files:
+            # 导入期间复用进度条，显示为“不确定进度”的滚动条
+            export_progress.value = None
+            export_progress.visible = True
+            page.update()
+            # 按扩展名选择解析器：.omnis 是紧凑快照，其余按 JSON 处理
+            path = e.files[0].path
+            reader = read_snapshot_backup if path.lower().endswith(".omnis") else read_json_backup
+            threading.Thread(target=run_import, args=(path, reader), daemon=True).start()
+
+    export_picker = ft.FilePicker(on_result=on_export_result)
+    import_picker = ft.FilePicker(on_result=on_import_result)
+    snapshot_export_picker = ft.FilePicker(on_result=on_snapshot_export_result)
+    # 设置页只构建一次，挂载后不会再被其他页面清除
+    page.overlay.extend([export_picker, import_picker, snapshot_export_picker])
+
+    # --- 2. 切换逻辑 ---
+    def toggle_storage_backend(e):
+        """切换日志存储引擎 (JSON <-> SQLite)，在后台线程把数据整体迁移过去"""
+        target = "sqlite" if e.control.value else "json"
+        # 迁移完成前不能再切：两个迁移同时往一个后端 clear/merge 会互相覆盖
+        storage_switch.disabled = True
+        storage_switch.update()
+
+        def run():
+            try:
+                count = log_repo.migrate(open_log_backend(target))
+                storage_backend[0] = target
+                app_storage.set("storage_backend", target)
+                if "data_changed" in view_hooks:
+                    view_hooks["data_changed"]()
+                name = "SQLite" if target == "sqlite" else "JSON"
+                page.snack_bar = ft.SnackBar(ft.Text(f"✅ 已切换到 {name} 存储 ({count} 条)"), bgcolor="green")
+            except Exception as ex:
+                storage_switch.value = storage_backend[0] == "sqlite"
+                page.snack_bar = ft.SnackBar(ft.Text(f"❌ 切换失败: {ex}"), bgcolor="red")
+            storage_switch.disabled = False
+            page.snack_bar.open = True
+            page.update()
+
+        threading.Thread(target=run, daemon=True).start()
+
+    storage_switch = ft.Switch(value=(storage_backend[0] == "sqlite"), on_change=toggle_storage_backend, active_color=colors["orange"])
+
+    def sync_storage_switch():
+        """后端在别处被改了 (SQLite 打开失败退回 JSON)：开关跟着变"""
+        storage_switch.value = storage_backend[0] == "sqlite"
+        if storage_switch.page:
+            storage_switch.update()
+
+    view_hooks["backend_changed"] = sync_storage_switch
+
+    def toggle_theme(e):
+        # 【优化】：不再丢弃重建所有视图，只给现有控件换色 (大背景、导航栏也在里面)
+        apply_theme("dark" if e.control.value else "light")
+
+    def toggle_sort_order(e):
+        """切换排序方式"""
+        val = "asc" if e.control.value else "desc"
+        sort_preference[0] = val
+        app_storage.set("sort_preference", val)
+        page.update()
+        # 日志页被缓存着，需要通知它按新顺序重新查询
+        if "data_changed" in view_hooks:
+            view_hooks["data_changed"]()
+
+    def toggle_icon_style(e):
+        val = e.control.data
+        icon_preference[0] = val
+        app_storage.set("icon_preference", val)
+        
+        # 更新按钮视觉状态
+        btn_star.bgcolor = colors["orange"] if val == "star" else colors["input_bg"]
+        btn_star_content.color = "white" if val == "star" else colors["text"]
+        btn_bone.bgcolor = colors["orange"] if val == "bone" else colors["input_bg"]
+        btn_bone_content.color = "white" if val == "bone" else colors["text"]
+        page.update()
+        # 日志页的卡片只修补评分文字，不重建
+        if "icon_changed" in view_hooks:
+            view_hooks["icon_changed"]()
+
+    # --- 3. 骨头/星星 切换按钮组 ---
+    btn_star_content = ft.Text("⭐ 星星", color="white" if not is_bone else colors["text"], weight="bold")
+    btn_bone_content = ft.Text("🦴 骨头", color="white" if is_bone else colors["text"], weight="bold")
+    
+    btn_star = ft.Container(
+        content=btn_star_content, data="star", expand=True, height=35,
+        bgcolor=colors["orange"] if not is_bone else colors["input_bg"],
+        border_radius=ft.border_radius.only(top_left=8, bottom_left=8),
+        alignment=ft.alignment.center, on_click=toggle_icon_style,
+        border=ft.border.all(1, colors["orange"])
+    )
+    btn_bone = ft.Container(
+        content=btn_bone_content, data="bone", expand=True, height=35,
+        bgcolor=colors["orange"] if is_bone else colors["input_bg"],
+        border_radius=ft.border_radius.only(top_right=8, bottom_right=8),
+        alignment=ft.alignment.center, on_click=toggle_icon_style,
+        border=ft.border.all(1, colors["orange"])
+    )
+    icon_switch_row = ft.Row([btn_star, btn_bone], spacing=0)
+
+    # --- 关于弹窗 ---
+    def show_about(e):
+        page.dialog = ft.AlertDialog(
+            title=ft.Text("关于 My Omnis"),
+            content=ft.Column([
+                # 【核心修改】：删除了不存在的 Image，改用 Icon 防止报错，或者确保你有 icons/logo.png
+                ft.Image(src="/logo.png", width=60, height=60, error_content=ft.Icon("pets", size=60, color=colors["orange"])),
+                
+                ft.Text("\n版本: v1.0.0 (Alpha)"),
+                ft.Text("开发: Python 3.14 + Flet"),
+                ft.Text("\n专门为吞吞开发的记录工具\n记录每一个可爱瞬间！\n(顺带便捷她爹的工作流)"),
+            ], tight=True, horizontal_alignment="center", spacing=5),
+            actions=[ft.TextButton("关闭", on_click=lambda _: setattr(page.dialog, 'open', False) or page.update())],
+            actions_alignment="center"
+        )
+        page.dialog.open = True
+        page.update()
+
+    # --- 4. 辅助函数：设置卡片 (修复间距问题) ---
+    def setting_card(title, controls):
+        return ft.Container(
+            bgcolor=colors["card"],
+            margin=ft.margin.symmetric(horizontal=20),
+            padding=ft.padding.symmetric(horizontal=25, vertical=15),
+            border_radius=15,
+            content=ft.Column([
+                ft.Text(title, weight="bold", size=16, color=colors["sub_text"]),
+                # 【核心修改】：在这里增加一点微小的间距(5px)，而不是像之前那样留太多
+                ft.Container(height=10), 
+                # 【核心修改】：controls 容器本身不留间距，由控件自己控制
+                ft.Column(controls, spacing=0) 
+            ], spacing=0) # 【核心修改】：父容器 spacing=0，防止标题离得太远
+        )
+
+    return ft.Column(
+        controls=[
+            ft.Container(height=40),
+            # 胶囊标题
+            ft.Container(
+                content=ft.Text("⚙️ 设置", size=24, weight="bold", color="white"),
+                bgcolor=colors["blue"],
+                padding=ft.padding.symmetric(horizontal=120, vertical=10),
+                border_radius=20, margin=ft.margin.only(bottom=2),
+                shadow=ft.BoxShadow(blur_radius=10, color=with_opacity(0.4, colors["blue"]))
+            ),
+            ft.Container(height=3),
+            
+            # 外观设置
+            setting_card("外观", [
+                # 1. 暗黑模式
+                ft.ListTile(
+                    leading=ft.Icon("dark_mode", color=colors["icon"]),
+                    title=ft.Text("暗黑模式", size=16, color=colors["text"]),
+                    trailing=ft.Switch(value=is_dark, on_change=toggle_theme, active_color=colors["orange"]),
+                    content_padding=0, # 贴边
+                    dense=True, # 【核心修改】：紧凑模式，减少垂直高度
+                ),
+                # 间距
+                ft.Container(height=10), 
+
+                # 2. 排序开关
+                ft.ListTile(
+                    leading=ft.Icon("sort", color=colors["icon"]),
+                    title=ft.Text("时间正序排列 (旧->新)", size=16, color=colors["text"]),
+                    # 开关打开 = asc (正序)，关闭 = desc (倒序/默认)
+                    trailing=ft.Switch(value=(sort_preference[0] == "asc"), on_change=toggle_sort_order, active_color=colors["orange"]),
+                    content_padding=0,
+                    dense=True
+                ),
+
+                ft.Container(height=20),
+
+                ft.Row([
+                    ft.Text("乖巧度图标:", size=16, color=colors["text"]),
+                    ft.Container(width=20),
+                    ft.Container(content=icon_switch_row, width=160)
+                ], alignment="spaceBetween")
+            ]),
+
+            # 数据管理
+            setting_card("数据管理", [ # 这里的标题字号会自动应用上面的 size=16
+                ft.ListTile(
+                    leading=ft.Icon("upload_file", color=colors["blue"]),
+                    title=ft.Text("导出数据备份", color=colors["text"]),
+                    subtitle=ft.Text("保存 .json 文件", size=12, color=colors["sub_text"]),
+                    on_click=lambda _: export_picker.save_file(file_name="tuntun_backup.json"),
+                    content_padding=0,
+                    dense=True # 【修改】：紧凑
+                ),
+                export_progress,
+                ft.ListTile(
+                    leading=ft.Icon("compress", color=colors["icon"]),
+                    title=ft.Text("紧凑格式导出 (不缩进)", size=14, color=colors["text"]),
+                    trailing=export_compact,
+                    content_padding=0,
+                    dense=True
+                ),
+                ft.ListTile(
+                    leading=ft.Icon("archive", color=colors["blue"]),
+                    title=ft.Text("导出紧凑快照", color=colors["text"]),
+                    subtitle=ft.Text("保存 .omnis 文件 (体积约为 JSON 的 1/20)", size=12, color=colors["sub_text"]),
+                    on_click=lambda _: snapshot_export_picker.save_file(file_name="tuntun_backup.omnis"),
+                    content_padding=0,
+                    dense=True
+                ),
+                # 分割线上下稍微留白一点点，或者直接设为0
+                ft.Divider(height=1, color=colors["divider"]), 
+                ft.ListTile(
+                    leading=ft.Icon("download", color=colors["orange"]),
+                    title=ft.Text("导入数据恢复", color=colors["text"]),
+                    subtitle=ft.Text("选择 .json 或 .omnis 备份", size=12, color="red"),
+                    on_click=lambda _: import_picker.pick_files(allow_multiple=False, allowed_extensions=["json", "omnis"]),
+                    content_padding=0,
+                    dense=True # 【修改】：紧凑
+                ),
+                ft.Divider(height=1, color=colors["divider"]),
+                ft.ListTile(
+                    leading=ft.Icon("storage", color=colors["icon"]),
+                    title=ft.Text("SQLite 存储引擎 (实验)", color=colors["text"]),
+                    subtitle=ft.Text("启动后才初始化，失败自动退回 JSON", size=12, color=colors["sub_text"]),
+                    trailing=storage_switch,
+                    content_padding=0,
+                    dense=True
+                )
+            ]),
+
+            # 关于
+            setting_card("关于", [
+                ft.ListTile(
+                    leading=ft.Icon("info", color=colors["icon"]),
+                    title=ft.Text("关于 Omnis", size=16, color=colors["text"]),
+                    trailing=ft.Icon("chevron_right", color=colors["icon"]),
+                    on_click=show_about,
+                    content_padding=0,
+                    dense=True # 【修改】：紧凑
+                )
+            ]),
+            
+            ft.Container(content=ft.Text("My Omnis v1.0.0 Beta", color=colors["sub_text"], size=12), alignment=ft.alignment.center, padding=20)
+        ],
+        scroll="hidden", expand=True, alignment="center", horizontal_alignment="center", spacing=15
+    )
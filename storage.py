@@ -0,0 +1,1158 @@
+# 存储层：时间戳、搜索索引、统计汇总、延迟写入、日志的 JSON / SQLite 后端、搬家预约记录
+# 只依赖标准库 (json/bisect/heapq/threading)，启动时随 main 一起导入；sqlite3 在打开数据库时才导入
+import json # 用于存取事件列表
+import bisect # 用于维护有序索引
+import heapq # 用于取最常见的事件
+import datetime # 用于把日期换算成天数 (算连续记录)
+import threading # 用于后台写入
+from abc import ABC, abstractmethod # 日志后端接口
+import time # 用于生成预约 id
+
+_CO_GENERATOR = 0x20 # 同 inspect.CO_GENERATOR：识别按需产出的读取方法 (iter_chunks)，不为它导入 inspect
+
+def make_timestamp(date_str, time_str):
+    """dd.mm.yyyy + HH:MM -> 整数 yyyymmddhhmm，只在保存/导入/迁移时算一次
+    日期无法解析返回 0 (排在最前)；时间无法解析按 00:00 处理"""
+    try:
+        day, month, year = (int(p) for p in str(date_str).split("."))
+    except ValueError:
+        return 0
+    try:
+        hour, minute = (int(p) for p in str(time_str).split(":"))
+    except ValueError:
+        hour, minute = 0, 0
+    return (((year * 100 + month) * 100 + day) * 100 + hour) * 100 + minute
+
+# ==========================================
+# 搜索倒排索引 (字符 bigram 版)
+# 日记以中文为主，没有空格分词，所以按单字 + 相邻两字建索引
+# 关键词的每个 bigram 都必须出现在同一字段里，先取倒排表求交集得到候选，
+# 再对少量候选做一次子串确认，搜索耗时只和命中数量有关
+# ==========================================
+class SearchIndex:
+    def __init__(self):
+        self._postings = {} # token -> {id, ...}
+        self._tokens = {}   # id -> 该记录的 token 集合，删除时用
+
+    @staticmethod
+    def tokenize(text):
+        """单字 + 相邻两字 (CJK 和英文数字一视同仁)"""
+        tokens = set(text)
+        tokens.update(text[i:i + 2] for i in range(len(text) - 1))
+        return tokens
+
+    @staticmethod
+    def fields_of(entry):
+        """参与搜索的字段：日期 + 每条事件 (分开建，避免跨事件误匹配)"""
+        return [str(entry.get("date_str", ""))] + [str(e) for e in entry.get("events", [])]
+
+    def add(self, entry):
+        log_id = entry.get("id")
+        tokens = set()
+        for field in self.fields_of(entry):
+            tokens |= self.tokenize(field)
+        self._tokens[log_id] = tokens
+        for token in tokens:
+            self._postings.setdefault(token, set()).add(log_id)
+
+    def remove(self, log_id):
+        for token in self._tokens.pop(log_id, ()):
+            ids = self._postings.get(token)
+            if ids:
+                ids.discard(log_id)
+                if not ids: del self._postings[token]
+
+    def candidates(self, keyword):
+        """返回可能命中的 id 集合 (还需子串确认)"""
+        if not keyword: return set()
+        if len(keyword) == 1:
+            return set(self._postings.get(keyword, ()))
+        grams = {keyword[i:i + 2] for i in range(len(keyword) - 1)}
+        # 从最短的倒排表开始求交集
+        lists = sorted((self._postings.get(g, set()) for g in grams), key=len)
+        result = set(lists[0])
+        for ids in lists[1:]:
+            if not result: break
+            result &= ids
+        return result
+
+# ==========================================
+# 日志统计汇总 (增量维护)
+# 和 SearchIndex 一样随保存/删除逐条更新，统计面板直接读汇总，不再扫描全部历史：
+#   每月：条数、打分条数、分数和 -> 月平均分
+#   评分分布：分数 -> 条数 (0 = 没打分)
+#   事件：规范化后的短语 -> 出现次数
+#   连续记录：有记录的日子合并成一段段连续区间，新增一天只需和左右两段拼接
+# ==========================================
+class LogStats:
+    def __init__(self):
+        self._count = 0
+        self._rated = 0         # 打过分的条数 (平均分只算这些)
+        self._rating_sum = 0
+        self._ratings = {}      # 分数 -> 条数
+        self._months = {}       # (年, 月) -> [条数, 打分条数, 分数和]
+        self._events = {}       # 事件短语 -> 次数
+        self._days = {}         # 日期序号 -> 当天记录条数
+        self._run_end = {}      # 连续区间：起始日 -> 结束日
+        self._run_start = {}    # 连续区间：结束日 -> 起始日
+        self._run_lengths = {}  # 区间长度 -> 区间个数 (最长连续 = 最大的 key)
+
+    @staticmethod
+    def rating_of(entry):
+        try:
+            return min(max(int(entry.get("rating") or 0), 0), 5)
+        except (TypeError, ValueError):
+            return 0
+
+    @staticmethod
+    def phrases_of(entry):
+        """事件短语：去掉首尾空白、合并中间空白，空的不算"""
+        phrases = (" ".join(str(e).split()) for e in entry.get("events") or [])
+        return [p for p in phrases if p]
+
+    @staticmethod
+    def day_of(entry):
+        """记录所在日期的序号 (date.toordinal)，日期无法解析返回 None"""
+        ts = entry.get("ts") or make_timestamp(entry.get("date_str"), entry.get("time_str"))
+        ymd = ts // 10000
+        try:
+            return datetime.date(ymd // 10000, ymd // 100 % 100, ymd % 100).toordinal()
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _bump(counter, key, delta):
+        value = counter.get(key, 0) + delta
+        if value: counter[key] = value
+        else: counter.pop(key, None)
+        return value
+
+    def _add_run(self, start, end):
+        self._run_end[start] = end
+        self._run_start[end] = start
+        self._bump(self._run_lengths, end - start + 1, 1)
+
+    def _drop_run(self, start):
+        end = self._run_end.pop(start)
+        del self._run_start[end]
+        self._bump(self._run_lengths, end - start + 1, -1)
+        return end
+
+    def _join_day(self, day):
+        """新出现的一天：和前后相邻的区间拼成一段"""
+        start = end = day
+        if day - 1 in self._run_start:
+            start = self._run_start[day - 1]
+            self._drop_run(start)
+        if day + 1 in self._run_end:
+            end = self._drop_run(day + 1)
+        self._add_run(start, end)
+
+    def _split_day(self, day):
+        """某天的记录删光了：所在区间从这天断开
+        (向前找区间起点，耗时和这段连续天数成正比，和历史总量无关)"""
+        start = day
+        while start - 1 in self._days: start -= 1
+        end = self._drop_run(start)
+        if start < day: self._add_run(start, day - 1)
+        if day < end: self._add_run(day + 1, end)
+
+    def _apply(self, entry, delta):
+        rating = self.rating_of(entry)
+        self._count += delta
+        self._bump(self._ratings, rating, delta)
+        ym = LogRepository.month_of(entry)
+        if ym:
+            month = self._months.setdefault(ym, [0, 0, 0])
+            month[0] += delta
+            if rating:
+                month[1] += delta
+                month[2] += rating * delta
+            if not month[0]: del self._months[ym]
+        if rating:
+            self._rated += delta
+            self._rating_sum += rating * delta
+        for phrase in self.phrases_of(entry):
+            self._bump(self._events, phrase, delta)
+        day = self.day_of(entry)
+        if day is not None:
+            left = self._bump(self._days, day, delta)
+            if delta > 0 and left == 1: self._join_day(day)
+            elif delta < 0 and left == 0: self._split_day(day)
+
+    def add(self, entry):
+        self._apply(entry, 1)
+
+    def remove(self, entry):
+        self._apply(entry, -1)
+
+    def copy(self):
+        """快照：之后的增删不影响它 (后端交出去的统计都是快照，读的时候不用持锁)"""
+        other = LogStats()
+        other._count, other._rated, other._rating_sum = self._count, self._rated, self._rating_sum
+        for name in ("_ratings", "_events", "_days", "_run_end", "_run_start", "_run_lengths"):
+            setattr(other, name, dict(getattr(self, name)))
+        other._months = {ym: list(totals) for ym, totals in self._months.items()}
+        return other
+
+    def count(self):
+        return self._count
+
+    def average(self):
+        """全部打过分的记录的平均分，没有则为 None"""
+        return self._rating_sum / self._rated if self._rated else None
+
+    def month(self, year, month):
+        """某月的 (条数, 平均分)"""
+        count, rated, total = self._months.get((year, month), (0, 0, 0))
+        return count, (total / rated if rated else None)
+
+    def months(self, limit=None):
+        """按月份倒序：[(年, 月, 条数, 平均分), ...]"""
+        keys = sorted(self._months, reverse=True)[:limit]
+        return [(y, m) + self.month(y, m) for y, m in keys]
+
+    def rating_distribution(self):
+        """[(分数, 条数), ...]，0-5 分都有 (没有记录的为 0)"""
+        return [(score, self._ratings.get(score, 0)) for score in range(6)]
+
+    def top_events(self, limit=10):
+        """出现最多的事件：[(短语, 次数), ...]，次数相同按短语排"""
+        return heapq.nsmallest(limit, self._events.items(), key=lambda kv: (-kv[1], kv[0]))
+
+    def streaks(self, today=None):
+        """(当前连续天数, 最长连续天数)
+        当前连续：包含今天 (今天还没记就看昨天) 的那一段，只数到今天为止，写在以后日期的记录不算
+        (从今天往前数，耗时和这段连续天数成正比)"""
+        if today is None: today = datetime.date.today().toordinal()
+        longest = max(self._run_lengths, default=0)
+        end = today if today in self._days else today - 1
+        if end not in self._days: return 0, longest
+        start = end
+        while start - 1 in self._days: start -= 1
+        return end - start + 1, longest
+
+# ==========================================
+# 延迟批量写入 (write-behind)
+# 包一层 client_storage：set/remove 先记在内存里立即返回，界面事件不用等存储往返
+# 短时间内的多次写入 (比如连续删几条) 合并成一次，在后台线程统一写出
+# 同一个 key 只写最后一次的值；读的时候优先读还没写出的值
+# App 切到后台/退出/断开前必须调用 flush()，保证数据落盘
+# 按首次写入的顺序写出；某个 key 写失败就停下，它和后面的 key 按原顺序留在队列里按退避间隔重试；
+# 连续失败 MAX_RETRIES 次后不再自动重试，
+# 通过 on_error 告诉用户，之后的下一次写入/flush 会再试一次
+# ==========================================
+class WriteBehindStorage:
+    _REMOVE = object() # 待删除标记
+    MAX_RETRIES = 5
+
+    def __init__(self, storage, delay=0.4, on_error=None):
+        self.storage = storage
+        self.delay = delay
+        self.on_error = on_error # on_error(key, ex)：自动重试放弃时调用 (在写出线程里)
+        self._failures = {} # key -> 连续失败次数
+        self._pending = {} # key -> 值 或 _REMOVE (保持首次写入的顺序)
+        self._writing = {} # 正在写出的 key：写完之前读到的仍是这里的值
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock() # 保证同一时间只有一个线程在写出
+        self._timer = None
+        self._closed = False
+
+    def get(self, key):
+        with self._lock:
+            for layer in (self._pending, self._writing): # 新写入的优先
+                if key in layer:
+                    value = layer[key]
+                    return None if value is self._REMOVE else value
+        return self.storage.get(key)
+
+    def set(self, key, value):
+        self._queue(key, value)
+
+    def remove(self, key):
+        self._queue(key, self._REMOVE)
+
+    def _queue(self, key, value):
+        with self._lock:
+            self._pending[key] = value
+            self._schedule()
+
+    def _schedule(self, delay=None):
+        # 窗口从第一次写入开始计时，不因后续写入无限推迟 (调用方持有 _lock)
+        if self._timer is None and not self._closed:
+            self._timer = threading.Timer(delay or self.delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """把积攒的写入按首次写入的顺序写出 (可在任意线程调用)；全部写成功返回 True
+        每个 key 写完才从 _writing 里去掉；某个 key 写失败就停下，它和后面没写的按原顺序放回待写队列
+        (调用方靠这个顺序保证一致性，比如先写分片、再写清单、最后删旧 key)，不会丢"""
+        given_up = []
+        written = True
+        with self._flush_lock:
+            with self._lock:
+                if self._closed: return False
+                self._writing, self._pending = self._pending, {}
+                if self._timer: self._timer.cancel()
+                self._timer = None
+            for key, value in list(self._writing.items()):
+                error = None
+                try:
+                    if value is self._REMOVE: self.storage.remove(key)
+                    else: self.storage.set(key, value)
+                except Exception as ex:
+                    error = ex
+                with self._lock:
+                    if error is None:
+                        del self._writing[key]
+                        self._failures.pop(key, None)
+                        continue
+                    written = False
+                    if self._closed: # 写出途中会话结束了：不再重试、不再回调
+                        self._writing = {}
+                        break
+                    # 没写出的排在前面，顺序不变；期间又写了新值的以新值为准
+                    requeue, self._writing = self._writing, {}
+                    requeue.update(self._pending)
+                    self._pending = requeue
+                    failures = self._failures[key] = self._failures.get(key, 0) + 1
+                    if failures < self.MAX_RETRIES:
+                        self._schedule(self.delay * 2 ** failures) # 0.8s、1.6s、3.2s ...
+                    elif failures == self.MAX_RETRIES:
+                        given_up.append((key, error))
+                    break
+        for key, error in given_up:
+            if self.on_error: self.on_error(key, error)
+            else: print(f"写入存储失败 {key}: {error}")
+        return written
+
+    def close(self, flush=False):
+        """会话结束：不再定时写出或重试，还没写出的值丢掉
+        flush=True 时先把积攒的写入写出去一次；存储已经连不上时写失败的就丢掉，不抛异常"""
+        if flush:
+            try:
+                self.flush()
+            except Exception as ex:
+                print(f"关闭前写出失败: {ex}")
+        with self._lock:
+            self._closed = True
+            self._pending.clear()
+            if self._timer: self._timer.cancel()
+            self._timer = None
+
+# ==========================================
+# 日志存储后端接口
+# 界面只依赖这些方法，具体存在 client_storage (JSON) 还是 SQLite 由后端决定
+# ==========================================
+class LogBackend(ABC):
+    @abstractmethod
+    def all(self): ...                                               # 全部记录 (无序)
+    @abstractmethod
+    def count(self): ...
+    @abstractmethod
+    def ordered(self, reverse=False): ...                            # 按时间排序的全部记录
+    @abstractmethod
+    def month(self, year, month, reverse=False): ...
+    @abstractmethod
+    def search(self, keyword, reverse=False): ...
+    @abstractmethod
+    def iter_chunks(self): ...                                       # 按月份逐批产出 (导出用)
+    @abstractmethod
+    def add(self, entry): ...
+    @abstractmethod
+    def delete(self, log_id): ...
+    @abstractmethod
+    def merge(self, entries): ...                                    # 按 id 合并，返回 (新增, 更新)
+    @abstractmethod
+    def clear(self): ...                                             # 清空 (切换后端迁移用)
+    @abstractmethod
+    def stats(self): ...                                             # 统计汇总 (LogStats 快照)
+    def sync(self): pass                                             # 确保写入已落盘，失败抛异常 (迁移用)
+    def close(self): pass                                            # 释放资源 (被切换掉之后调用)
+
+# ==========================================
+# 日志仓库 (JSON 后端：内存缓存 + 写穿存储)
+# 每个会话只读取并解析一次存储，之后所有读取都走内存
+# 存储布局：按月分片 tuntun_logs:yyyy-mm + 一个小清单 tuntun_logs:manifest
+# 新增/删除一条只重写所在月份的分片，写入成本不随日记总量增长
+# 月份索引：(年, 月) -> 记录 id，翻月时只取这个月的记录
+# 每条记录带整数时间戳 ts，索引始终按 (ts, id) 有序，正序/倒序只是反向遍历
+# 搜索走 SearchIndex 倒排索引，统计走 LogStats 汇总，都随保存/删除/导入增量更新
+# ==========================================
+class LogRepository(LogBackend):
+    LEGACY_KEY = "tuntun_logs"            # 旧版：整段 JSON 存在一个 key 里
+    MANIFEST_KEY = "tuntun_logs:manifest" # 新版：记录有哪些月份分片
+    CHUNK_PREFIX = "tuntun_logs:"
+    UNKNOWN_CHUNK = "unknown"             # 日期解析失败的记录放这里
+    LAYOUT_VERSION = 2
+
+    def __init__(self, storage):
+        self.storage = storage # 一般是 page.client_storage
+        self._chunks = None    # 懒加载：{"2026-10": [entry, ...]}
+        self._by_id = {}       # id -> entry
+        self._ordered = []     # 全部记录 [(ts, id), ...]，始终有序
+        self._month_index = {} # (年, 月) -> [(ts, id), ...]，始终有序
+        self._search = SearchIndex()
+        self._stats = LogStats()
+        # 启动时后台预取线程在读取，界面事件 (保存/删除/导入) 可能同时进来
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def month_of(entry):
+        """解析记录所属月份：dd.mm.yyyy -> (yyyy, mm)，解析失败返回 None"""
+        parts = str(entry.get("date_str", "")).split(".")
+        if len(parts) == 3 and parts[1].isdigit() and parts[2].isdigit():
+            return (int(parts[2]), int(parts[1]))
+        return None
+
+    @classmethod
+    def chunk_of(cls, entry):
+        """计算记录所属分片：dd.mm.yyyy -> yyyy-mm"""
+        ym = cls.month_of(entry)
+        return f"{ym[0]:04d}-{ym[1]:02d}" if ym else cls.UNKNOWN_CHUNK
+
+    @staticmethod
+    def _decode(data):
+        # 如果存的是字符串则解析，如果是对象直接使用
+        if not data: return None
+        return json.loads(data) if isinstance(data, str) else data
+
+    def _load(self):
+        """第一次访问时读取清单和各月分片，之后直接返回缓存
+        加锁，并且先在局部变量里读完所有分片、建好索引，最后才一起发布：
+        后台预取读到一半时，界面不会看到空的月份，保存也不会把还没读到的分片当成新分片覆盖掉"""
+        with self._lock:
+            if self._chunks is None:
+                manifest = self._decode(self.storage.get(self.MANIFEST_KEY))
+                if manifest is None:
+                    self._migrate_legacy()
+                else:
+                    chunks = {}
+                    for name in manifest.get("chunks", []):
+                        entries = self._decode(self.storage.get(self.CHUNK_PREFIX + name)) or []
+                        chunks[name] = list(entries)
+                    backfilled = self._backfill_timestamps(chunks)
+                    self._publish(chunks)
+                    for name in backfilled:
+                        self._write_chunk(name)
+            return self._chunks
+
+    def _backfill_timestamps(self, chunks):
+        """【迁移】：给旧记录补上 ts 字段，返回确实缺字段 (需要重写) 的分片"""
+        backfilled = []
+        for name, entries in chunks.items():
+            missing = [entry for entry in entries if "ts" not in entry]
+            for entry in missing:
+                entry["ts"] = make_timestamp(entry.get("date_str"), entry.get("time_str"))
+            if missing:
+                backfilled.append(name)
+        return backfilled
+
+    def _migrate_legacy(self):
+        """【迁移】：旧版单 key 数据 -> 按月分片 (启动时自动执行一次)"""
+        legacy = self._decode(self.storage.get(self.LEGACY_KEY)) or []
+        chunks = {}
+        for entry in legacy:
+            entry.setdefault("ts", make_timestamp(entry.get("date_str"), entry.get("time_str")))
+            chunks.setdefault(self.chunk_of(entry), []).append(entry)
+        self._publish(chunks)
+        # 顺序很重要：先写分片，再写清单，最后删旧 key
+        # 中途被杀掉也没关系，下次启动没有清单会重新迁移
+        for name in self._chunks:
+            self._write_chunk(name)
+        self._write_manifest()
+        if legacy:
+            self.storage.remove(self.LEGACY_KEY)
+
+    @staticmethod
+    def _sort_key(entry):
+        return (entry.get("ts", 0), entry.get("id") or 0)
+
+    def _build_indexes(self, chunks):
+        """全量建索引 (建在局部变量里，不动正在用的索引)：先追加再统一排序，比逐条插入快"""
+        by_id, ordered, month_index = {}, [], {}
+        search, stats = SearchIndex(), LogStats()
+        for entries in chunks.values():
+            for entry in entries:
+                key = self._sort_key(entry)
+                by_id[entry.get("id")] = entry
+                search.add(entry)
+                stats.add(entry)
+                ordered.append(key)
+                ym = self.month_of(entry)
+                if ym: month_index.setdefault(ym, []).append(key)
+        ordered.sort()
+        for keys in month_index.values():
+            keys.sort()
+        return by_id, ordered, month_index, search, stats
+
+    def _publish(self, chunks):
+        """建好索引后，分片和索引一起换上 (调用方持有锁)"""
+        indexes = self._build_indexes(chunks)
+        self._by_id, self._ordered, self._month_index, self._search, self._stats = indexes
+        self._chunks = chunks
+
+    def _rebuild_indexes(self):
+        self._publish(self._chunks)
+
+    def _index(self, entry):
+        """增量插入：二分查找保持有序"""
+        key = self._sort_key(entry)
+        self._by_id[entry.get("id")] = entry
+        self._search.add(entry)
+        self._stats.add(entry)
+        bisect.insort(self._ordered, key)
+        ym = self.month_of(entry)
+        if ym: bisect.insort(self._month_index.setdefault(ym, []), key)
+
+    @staticmethod
+    def _remove_key(keys, key):
+        i = bisect.bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key: del keys[i]
+
+    def _unindex(self, entry):
+        key = self._sort_key(entry)
+        self._by_id.pop(entry.get("id"), None)
+        self._search.remove(entry.get("id"))
+        self._stats.remove(entry)
+        self._remove_key(self._ordered, key)
+        ym = self.month_of(entry)
+        keys = self._month_index.get(ym)
+        if keys:
+            self._remove_key(keys, key)
+            if not keys: del self._month_index[ym]
+
+    def _materialize(self, keys, reverse):
+        if reverse: keys = reversed(keys)
+        return [self._by_id[log_id] for _, log_id in keys]
+
+    def _write_chunk(self, name):
+        """只重写一个月份的分片；分片空了就删掉"""
+        entries = self._chunks.get(name)
+        if entries:
+            self.storage.set(self.CHUNK_PREFIX + name, json.dumps(entries))
+        else:
+            self._chunks.pop(name, None)
+            self.storage.remove(self.CHUNK_PREFIX + name)
+
+    def _write_manifest(self):
+        self.storage.set(self.MANIFEST_KEY, json.dumps({
+            "version": self.LAYOUT_VERSION,
+            "chunks": sorted(self._chunks),
+        }))
+
+    # 读取也要持锁：防抖搜索/写入计时器在后台线程读，导入在后台线程整体替换索引
+    def all(self):
+        """返回所有日志 (新列表，调用方排序/过滤不会影响缓存)"""
+        with self._lock:
+            return [entry for entries in self._load().values() for entry in entries]
+
+    def count(self):
+        with self._lock:
+            self._load()
+            return len(self._by_id)
+
+    def iter_chunks(self):
+        """按月份分片逐个产出记录列表 (导出用，不拼出整个大列表)"""
+        with self._lock: # 只在锁里记下各分片当前的列表，产出时不持锁
+            chunks = self._load()
+            snapshot = [chunks[name] for name in sorted(chunks)]
+        yield from snapshot
+
+    def ordered(self, reverse=False):
+        """按时间排好序的全部记录 (reverse=True 为倒序，无需重新排序)"""
+        with self._lock:
+            self._load()
+            return self._materialize(self._ordered, reverse)
+
+    def month(self, year, month, reverse=False):
+        """只取某个月的记录 (走月份索引，不扫描全部历史)，已按时间排好序"""
+        with self._lock:
+            self._load()
+            return self._materialize(self._month_index.get((year, month), []), reverse)
+
+    def search(self, keyword, reverse=False):
+        """日期或任一事件包含关键词的记录，已按时间排好序"""
+        with self._lock:
+            self._load()
+            hits = []
+            for log_id in self._search.candidates(keyword):
+                entry = self._by_id[log_id]
+                if any(keyword in field for field in SearchIndex.fields_of(entry)):
+                    hits.append(self._sort_key(entry))
+            hits.sort()
+            return self._materialize(hits, reverse)
+
+    def stats(self):
+        """统计汇总 (已随增删更新好，返回快照)"""
+        with self._lock:
+            self._load()
+            return self._stats.copy()
+
+    def sync(self):
+        """存储是 WriteBehindStorage 时立即写出，没全部写成功就报错"""
+        flush = getattr(self.storage, "flush", None)
+        if flush is not None and not flush():
+            raise OSError("日志没有全部写入存储")
+
+    def add(self, entry):
+        with self._lock:
+            chunks = self._load()
+            entry.setdefault("ts", make_timestamp(entry.get("date_str"), entry.get("time_str")))
+            name = self.chunk_of(entry)
+            is_new_chunk = name not in chunks
+            chunks.setdefault(name, []).append(entry)
+            self._index(entry)
+            self._write_chunk(name)
+            if is_new_chunk: self._write_manifest()
+
+    def delete(self, log_id):
+        with self._lock:
+            chunks = self._load()
+            entry = self._by_id.get(log_id)
+            if entry is None: return
+            self._unindex(entry)
+            name = self.chunk_of(entry)
+            chunks[name] = [log for log in chunks[name] if log.get("id") != log_id]
+            self._write_chunk(name)
+            if name not in chunks: self._write_manifest()
+
+    def merge(self, entries):
+        """批量合并 (导入备份用)：按 id 去重，已存在的覆盖，不存在的新增
+        只重写受影响的分片，索引最后在旁边重建好再整体换上；返回 (新增数, 更新数)"""
+        with self._lock:
+            chunks = self._load()
+            names_before = set(chunks)
+            dirty = set()
+            added = updated = 0
+            merged = {} # 这一批里已经合并过的 id (不改正在用的索引)
+            for entry in entries:
+                entry.setdefault("ts", make_timestamp(entry.get("date_str"), entry.get("time_str")))
+                log_id = entry.get("id")
+                old = merged[log_id] if log_id in merged else self._by_id.get(log_id)
+                if old == entry: continue # 完全相同，不用动
+                if old is not None:
+                    old_name = self.chunk_of(old)
+                    chunks[old_name] = [log for log in chunks[old_name] if log.get("id") != log_id]
+                    dirty.add(old_name)
+                # 按 id 计数：同一批里重复的 id 只算一次 (和 SQLite 后端一致)
+                if log_id not in merged:
+                    if old is None: added += 1
+                    else: updated += 1
+                name = self.chunk_of(entry)
+                chunks.setdefault(name, []).append(entry)
+                dirty.add(name)
+                merged[log_id] = entry # 同一批里重复的 id 也能去重
+            if not dirty: return added, updated
+            self._rebuild_indexes()
+            for name in dirty:
+                self._write_chunk(name)
+            if set(self._chunks) != names_before: self._write_manifest()
+            return added, updated
+
+    def clear(self):
+        with self._lock:
+            for name in list(self._load()):
+                self._chunks[name] = []
+                self._write_chunk(name)
+            self._rebuild_indexes()
+            self._write_manifest()
+
+# ==========================================
+# SQLite 后端 (实验)
+# 安卓14 上 import sqlite3 曾导致启动黑屏，所以：
+#   1. 只在真正打开数据库时才 import sqlite3
+#   2. 由 LazyLogBackend 在首屏渲染之后再初始化，绝不阻塞启动
+#   3. 打开失败自动退回 JSON 后端
+# 翻月/搜索直接在数据库里查询 (WAL 模式，按 年/月/ts 建索引)，不在 Python 里扫全量
+# 统计汇总第一次打开统计面板时扫一遍建好，之后随增删更新
+# ==========================================
+class SqliteLogBackend(LogBackend):
+    COLUMNS = "id, date_str, time_str, rating, events, ts"
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._conn = None
+        self._lock = threading.Lock() # 一个连接，多个事件线程共用
+        self._stats = None            # LogStats，第一次用到才建
+        self._search = None           # SearchIndex，第一次搜索才建
+
+    def open(self):
+        import sqlite3 # 懒加载，见上方说明
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS logs (
+                id INTEGER PRIMARY KEY,
+                date_str TEXT, time_str TEXT,
+                rating INTEGER, events TEXT,
+                ts INTEGER, year INTEGER, month INTEGER
+            )""")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_logs_month ON logs (year, month, ts)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_logs_ts ON logs (ts)")
+        conn.commit()
+        self._conn = conn
+        return self
+
+    @staticmethod
+    def _row(entry):
+        ym = LogRepository.month_of(entry) or (None, None)
+        ts = entry.get("ts") or make_timestamp(entry.get("date_str"), entry.get("time_str"))
+        entry["ts"] = ts
+        return (entry.get("id"), entry.get("date_str"), entry.get("time_str"), entry.get("rating") or 0,
+                json.dumps(entry.get("events") or [], ensure_ascii=False), ts, ym[0], ym[1])
+
+    @staticmethod
+    def _entry(row):
+        log_id, date_str, time_str, rating, events, ts = row
+        return {"id": log_id, "date_str": date_str, "time_str": time_str,
+                "rating": rating, "events": json.loads(events), "ts": ts}
+
+    def _query(self, where="", params=(), reverse=False):
+        order = "DESC" if reverse else "ASC"
+        sql = f"SELECT {self.COLUMNS} FROM logs {where} ORDER BY ts {order}, id {order}"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [self._entry(row) for row in rows]
+
+    def all(self):
+        return self._query()
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM logs").fetchone()[0]
+
+    def ordered(self, reverse=False):
+        return self._query(reverse=reverse)
+
+    def month(self, year, month, reverse=False):
+        return self._query("WHERE year = ? AND month = ?", (year, month), reverse)
+
+    def _rows_by_id(self, ids):
+        """按 id 取记录 (调用方持有 _lock)"""
+        ids = list(ids)
+        for i in range(0, len(ids), 500): # SQLite 参数个数有上限，分批查
+            batch = ids[i:i + 500]
+            marks = ",".join("?" * len(batch))
+            yield from self._conn.execute(f"SELECT {self.COLUMNS} FROM logs WHERE id IN ({marks})", batch)
+
+    def search(self, keyword, reverse=False):
+        # 和 JSON 后端一样走 bigram 倒排索引 (LIKE '%关键词%' 每次都要扫全表)：
+        # 第一次搜索扫一遍建好，之后随增删更新；候选按 id 取出，再做子串确认
+        with self._lock:
+            if self._search is None:
+                index = SearchIndex()
+                for row in self._conn.execute(f"SELECT {self.COLUMNS} FROM logs"):
+                    index.add(self._entry(row))
+                self._search = index
+            rows = list(self._rows_by_id(self._search.candidates(keyword)))
+        hits = [entry for entry in map(self._entry, rows)
+                if any(keyword in field for field in SearchIndex.fields_of(entry))]
+        hits.sort(key=lambda entry: (entry["ts"], entry["id"]), reverse=reverse)
+        return hits
+
+    def iter_chunks(self):
+        """按月份逐批产出，内存里最多只有一个月的记录"""
+        with self._lock:
+            months = self._conn.execute(
+                "SELECT DISTINCT year, month FROM logs ORDER BY year, month"
+            ).fetchall()
+        for year, month in months:
+            if year is None:
+                yield self._query("WHERE year IS NULL")
+            else:
+                yield self.month(year, month)
+
+    def stats(self):
+        with self._lock:
+            if self._stats is None:
+                stats = LogStats()
+                for row in self._conn.execute(f"SELECT {self.COLUMNS} FROM logs"):
+                    stats.add(self._entry(row))
+                self._stats = stats
+            return self._stats.copy()
+
+    def add(self, entry):
+        self.merge([entry])
+
+    def delete(self, log_id):
+        with self._lock, self._conn:
+            if self._stats is not None:
+                row = self._conn.execute(f"SELECT {self.COLUMNS} FROM logs WHERE id = ?", (log_id,)).fetchone()
+                if row: self._stats.remove(self._entry(row))
+            if self._search is not None: self._search.remove(log_id)
+            self._conn.execute("DELETE FROM logs WHERE id = ?", (log_id,))
+
+    def merge(self, entries):
+        rows = {}
+        for entry in entries:
+            rows[entry.get("id")] = self._row(entry) # 同一批里重复的 id 以最后一条为准
+        added = updated = 0
+        changed = []
+        with self._lock, self._conn:
+            ids = list(rows)
+            existing = {}
+            for i in range(0, len(ids), 500): # SQLite 参数个数有上限，分批查
+                batch = ids[i:i + 500]
+                marks = ",".join("?" * len(batch))
+                for row in self._conn.execute(
+                    f"SELECT id, date_str, time_str, rating, events, ts, year, month FROM logs WHERE id IN ({marks})", batch
+                ):
+                    existing[row[0]] = row
+            for log_id, row in rows.items():
+                old = existing.get(log_id)
+                if old == row: continue
+                if old is None: added += 1
+                else: updated += 1
+                changed.append(row)
+                if self._stats is not None:
+                    if old is not None: self._stats.remove(self._entry(old[:6]))
+                    self._stats.add(self._entry(row[:6]))
+                if self._search is not None:
+                    self._search.remove(log_id)
+                    self._search.add(self._entry(row[:6]))
+            self._conn.executemany("INSERT OR REPLACE INTO logs VALUES (?, ?, ?, ?, ?, ?, ?, ?)", changed)
+        return added, updated
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM logs")
+            self._stats = None
+            self._search = None
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+# ==========================================
+# 懒加载后端代理
+# 第一次真正用到日志数据时才打开后端 (或者首屏之后由后台线程预热)
+# 主后端打开失败就退回备用后端，并通过 on_fallback 通知 (调用方负责改偏好、提示用户)
+# 运行中切换后端也通过它 (migrate)，界面持有的引用不变
+# 迁移期间写入 (add/delete/merge/clear) 会等迁移完成，再写进新后端，不会落在旧后端里丢掉
+# 读取记着正在用哪个后端：换下来的旧后端等正在进行的读取 (比如导出) 结束才清空、关闭
+# ==========================================
+def move_entries(source, target):
+    """把 source 的全部记录按 id 合并进 target，再清空 source；返回移动的条数
+    target 里已有的记录不会被删掉，同 id 的以 source 为准"""
+    entries = source.ordered()
+    target.merge(entries)
+    source.clear()
+    return len(entries)
+
+class LazyLogBackend:
+    def __init__(self, open_primary, open_fallback=None, on_fallback=None):
+        self._open_primary = open_primary
+        self._open_fallback = open_fallback
+        self._on_fallback = on_fallback
+        self._backend = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.RLock() # 写入和迁移互斥
+        self._readers = {} # 后端 -> 正在进行的读取数
+        self._idle = threading.Condition(self._lock) # 某个后端的读取全部结束时通知
+
+    def resolve(self):
+        fell_back = None
+        with self._lock:
+            if self._backend is None:
+                try:
+                    self._backend = self._open_primary()
+                except Exception as ex:
+                    if self._open_fallback is None: raise
+                    print(f"日志后端打开失败，退回 JSON: {ex}")
+                    self._backend = self._open_fallback()
+                    fell_back = ex
+            backend = self._backend
+        # 回调里可能更新界面、再读日志，放在锁外面
+        if fell_back is not None and self._on_fallback is not None:
+            self._on_fallback(fell_back)
+        return backend
+
+    def swap(self, backend):
+        with self._lock:
+            self._backend = backend
+
+    def migrate(self, backend):
+        """把当前后端的全部记录并进 backend 并换上，旧后端清空后关闭；返回迁移的条数
+        目标里已有的记录 (比如 SQLite 打不开的那次会话之前写的) 按 id 合并，不会被清掉；
+        旧后端清空，不留一份过期的副本 (以后退回它时不会把旧数据当成最新的)
+        从复制到换上全程持有写锁，这期间的保存/删除会等着，之后直接写进新后端
+        目标没能全部落盘就放弃迁移 (旧后端原样保留，继续用它)；
+        换上之后，已经在读旧后端的读取照常读完，然后才清空、关闭旧后端 (调用方别同时发起两次迁移)"""
+        with self._write_lock:
+            old = self.resolve()
+            try:
+                entries = old.ordered()
+                backend.merge(entries)
+                backend.sync() # 目标真正写进存储之后才换上、清空旧后端
+            except Exception:
+                backend.close()
+                raise
+            self.swap(backend)
+        with self._lock:
+            self._idle.wait_for(lambda: not self._readers.get(old))
+        try:
+            old.clear()
+        except Exception as ex:
+            print(f"清空旧日志后端失败: {ex}")
+        old.close()
+        return len(entries)
+
+    def _acquire(self):
+        self.resolve()
+        with self._lock:
+            backend = self._backend
+            self._readers[backend] = self._readers.get(backend, 0) + 1
+        return backend
+
+    def _release(self, backend):
+        with self._lock:
+            self._readers[backend] -= 1
+            if not self._readers[backend]:
+                del self._readers[backend]
+                self._idle.notify_all()
+
+    def add(self, entry):
+        with self._write_lock:
+            return self.resolve().add(entry)
+
+    def delete(self, log_id):
+        with self._write_lock:
+            return self.resolve().delete(log_id)
+
+    def merge(self, entries):
+        with self._write_lock:
+            return self.resolve().merge(entries)
+
+    def clear(self):
+        with self._write_lock:
+            return self.resolve().clear()
+
+    def __getattr__(self, name):
+        """读取方法：调用时才取当前后端，并在读完之前记着在用它"""
+        attr = getattr(self.resolve(), name)
+        if not callable(attr): return attr
+        code = getattr(attr, "__code__", None) # 绑定方法会转给底层函数
+        if code is not None and code.co_flags & _CO_GENERATOR:
+            def iterate(*args, **kwargs):
+                backend = self._acquire() # 第一次取值时才开始占用
+                try:
+                    yield from getattr(backend, name)(*args, **kwargs)
+                finally:
+                    self._release(backend)
+            return iterate
+        def call(*args, **kwargs):
+            backend = self._acquire()
+            try:
+                return getattr(backend, name)(*args, **kwargs)
+            finally:
+                self._release(backend)
+        return call
+
+# ==========================================
+# 搬家预约记录
+# 和日志一样按月分片：tuntun_bookings:yyyy-mm + 清单 tuntun_bookings:manifest
+# 和日志用不同的 key、不同的对象，第一次用到 (打开搬家助手的提示/记录) 才读取，不影响日记
+# 索引：
+#   按天：yyyymmdd -> [(ts, id), ...] 有序，日视图/周视图直接取
+#   按地址前缀：规范化后的地址排成有序列表，二分查找前缀，输入时即时提示
+# 同一天同一时间、同样起终点的预约视为同一单，再保存只会更新；带 id 保存则更新那一单
+# 界面事件和 CSV 批量保存可能在不同线程，读写都持锁
+# ==========================================
+class BookingStore:
+    MANIFEST_KEY = "tuntun_bookings:manifest"
+    CHUNK_PREFIX = "tuntun_bookings:"
+    UNKNOWN_CHUNK = "unknown"
+    LAYOUT_VERSION = 1
+
+    def __init__(self, storage):
+        self.storage = storage
+        self._chunks = None   # 懒加载：{"2026-10": [booking, ...]}
+        self._by_id = {}      # id -> booking
+        self._by_key = {}     # (日期, 时间, 起点, 终点) -> id，用来去重
+        self._by_day = {}     # yyyymmdd -> [(ts, id), ...]，始终有序
+        self._addresses = []  # 规范化地址，始终有序 (前缀查找用)
+        self._address_uses = {} # 规范化地址 -> {预约 id: (ts, 原样地址)}，删预约时一起删
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def normalize_address(address):
+        """大小写、多余空格都不影响匹配"""
+        return " ".join(str(address or "").split()).casefold()
+
+    @staticmethod
+    def _booking_key(booking):
+        return (booking.get("date_str"), booking.get("time_str"), booking.get("start"), booking.get("end"))
+
+    @classmethod
+    def chunk_of(cls, booking):
+        day = booking.get("ts", 0) // 10000
+        return f"{day // 10000:04d}-{day // 100 % 100:02d}" if day else cls.UNKNOWN_CHUNK
+
+    def _load(self):
+        """和 LogRepository 一样：持锁读完全部分片、建好索引后才发布"""
+        with self._lock:
+            if self._chunks is None:
+                chunks = {}
+                manifest = LogRepository._decode(self.storage.get(self.MANIFEST_KEY)) or {}
+                for name in manifest.get("chunks", []):
+                    entries = LogRepository._decode(self.storage.get(self.CHUNK_PREFIX + name)) or []
+                    chunks[name] = list(entries)
+                for entries in chunks.values():
+                    for booking in entries:
+                        self._index(booking, sort=False)
+                for keys in self._by_day.values():
+                    keys.sort()
+                self._addresses.sort()
+                self._chunks = chunks
+            return self._chunks
+
+    def _index(self, booking, sort=True):
+        ts = booking.get("ts", 0)
+        key = (ts, booking["id"])
+        self._by_id[booking["id"]] = booking
+        self._by_key[self._booking_key(booking)] = booking["id"]
+        keys = self._by_day.setdefault(ts // 10000, [])
+        if sort: bisect.insort(keys, key)
+        else: keys.append(key)
+        for address in (booking.get("start"), booking.get("end")):
+            norm = self.normalize_address(address)
+            if not norm: continue
+            uses = self._address_uses.get(norm)
+            if uses is None:
+                uses = self._address_uses[norm] = {}
+                if sort: bisect.insort(self._addresses, norm)
+                else: self._addresses.append(norm)
+            uses[booking["id"]] = (ts, address)
+
+    def _unindex(self, booking):
+        ts = booking.get("ts", 0)
+        self._by_id.pop(booking["id"], None)
+        self._by_key.pop(self._booking_key(booking), None)
+        keys = self._by_day.get(ts // 10000)
+        if keys:
+            LogRepository._remove_key(keys, (ts, booking["id"]))
+            if not keys: del self._by_day[ts // 10000]
+        for address in (booking.get("start"), booking.get("end")):
+            norm = self.normalize_address(address)
+            uses = self._address_uses.get(norm)
+            if uses is None: continue
+            uses.pop(booking["id"], None)
+            if not uses: # 最后一单也删了，地址不再提示
+                del self._address_uses[norm]
+                LogRepository._remove_key(self._addresses, norm)
+
+    def _write_chunk(self, name):
+        entries = self._chunks.get(name)
+        if entries:
+            self.storage.set(self.CHUNK_PREFIX + name, json.dumps(entries))
+        else:
+            self._chunks.pop(name, None)
+            self.storage.remove(self.CHUNK_PREFIX + name)
+
+    def _write_manifest(self):
+        self.storage.set(self.MANIFEST_KEY, json.dumps({
+            "version": self.LAYOUT_VERSION,
+            "chunks": sorted(self._chunks),
+        }))
+
+    def count(self):
+        with self._lock:
+            self._load()
+            return len(self._by_id)
+
+    def save(self, booking):
+        """保存一单 (同一单已存在就更新)，返回保存后的记录；没有有效日期返回 None"""
+        return self.save_many([booking])[0]
+
+    @staticmethod
+    def has_date(ts):
+        """ts 里的日期是不是一个真实存在的日子 (日/周视图才能找到它)"""
+        day = ts // 10000
+        try:
+            datetime.date(day // 10000, day // 100 % 100, day % 100)
+            return True
+        except ValueError:
+            return False
+
+    def save_many(self, bookings):
+        """批量保存：每个分片只写一次，按传入顺序返回保存后的记录 (没保存的位置是 None)
+        带 id 且这单还在：更新那一单 (改了日期/地址也不会多出一单)
+        和另一单的 (日期, 时间, 起点, 终点) 一样：合并成一单
+        日期为空/解析不了的不保存 (任何日视图/周视图都显示不了，也就删不掉)"""
+        with self._lock:
+            chunks = self._load()
+            before = set(chunks)
+            touched, saved = set(), []
+            for booking in bookings:
+                booking = dict(booking)
+                booking["ts"] = make_timestamp(booking.get("date_str"), booking.get("time_str"))
+                if not self.has_date(booking["ts"]):
+                    saved.append(None)
+                    continue
+                same_id = booking.get("id") if booking.get("id") in self._by_id else None
+                same_key = self._by_key.get(self._booking_key(booking))
+                for old_id in {same_id, same_key} - {None}: # 先撤掉旧的
+                    old = self._by_id[old_id]
+                    old_name = self.chunk_of(old)
+                    chunks[old_name] = [b for b in chunks[old_name] if b["id"] != old_id]
+                    self._unindex(old)
+                    touched.add(old_name)
+                booking["id"] = same_id or same_key or self._next_id()
+                name = self.chunk_of(booking)
+                chunks.setdefault(name, []).append(booking)
+                self._index(booking)
+                touched.add(name)
+                saved.append(booking)
+            for name in touched:
+                self._write_chunk(name)
+            if set(chunks) != before: self._write_manifest()
+            return saved
+
+    def delete(self, booking_id):
+        with self._lock:
+            chunks = self._load()
+            booking = self._by_id.get(booking_id)
+            if booking is None: return False
+            name = self.chunk_of(booking)
+            chunks[name] = [b for b in chunks.get(name, []) if b["id"] != booking_id]
+            self._unindex(booking)
+            self._write_chunk(name)
+            if name not in chunks: self._write_manifest()
+            return True
+
+    def _next_id(self):
+        new_id = int(time.time() * 1000)
+        while new_id in self._by_id: new_id += 1
+        return new_id
+
+    def day(self, year, month, day):
+        """某一天的全部预约，按时间排好"""
+        with self._lock:
+            self._load()
+            keys = self._by_day.get((year * 100 + month) * 100 + day, [])
+            return [self._by_id[booking_id] for _, booking_id in keys]
+
+    def days(self, dates):
+        """多天 (比如一周) 的预约：[(date, [booking, ...]), ...]"""
+        return [(d, self.day(d.year, d.month, d.day)) for d in dates]
+
+    def suggest_addresses(self, prefix, limit=5):
+        """地址前缀提示：常用的、最近用过的排在前面 (显示最近一次的写法)"""
+        norm = self.normalize_address(prefix)
+        if not norm: return []
+        with self._lock:
+            self._load()
+            i = bisect.bisect_left(self._addresses, norm)
+            matches = []
+            while i < len(self._addresses) and self._addresses[i].startswith(norm):
+                uses = self._address_uses[self._addresses[i]]
+                ts, address = max(uses.values())
+                matches.append((len(uses), ts, address))
+                i += 1
+        matches.sort(key=lambda m: (-m[0], -m[1]))
+        return [address for _, _, address in matches[:limit]]
@@ -0,0 +1,59 @@
+import os
+
+import pytest
+from PIL import Image
+
+from avatar import AVATAR_DISPLAY_SIZE, make_avatar_thumbnail
+
+
+def test_makes_one_square_thumbnail(tmp_path):
+    src = tmp_path / "photo.png"
+    Image.new("RGB", (1200, 800), "orange").save(src)
+
+    path = make_avatar_thumbnail(str(src), str(tmp_path), "avatar")
+
+    with Image.open(path) as thumb:
+        assert thumb.size == (AVATAR_DISPLAY_SIZE, AVATAR_DISPLAY_SIZE)
+        assert thumb.format == "JPEG"
+    assert sorted(os.listdir(tmp_path)) == ["avatar_240.jpg", "photo.png"]
+
+
+def test_copies_images_pillow_cannot_decode(tmp_path):
+    src = tmp_path / "photo.heic"
+    src.write_bytes(b"not an image")
+
+    path = make_avatar_thumbnail(str(src), str(tmp_path), "avatar")
+
+    assert path == str(tmp_path / "avatar.heic")
+    assert (tmp_path / "avatar.heic").read_bytes() == b"not an image"
+
+
+def test_failed_save_leaves_no_files(tmp_path, monkeypatch):
+    src = tmp_path / "photo.png"
+    Image.new("RGB", (600, 600), "orange").save(src)
+    real_save = Image.Image.save
+
+    def save_half_then_fail(self, fp, *args, **kwargs):
+        real_save(self, fp, *args, **kwargs)
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(Image.Image, "save", save_half_then_fail)
+
+    with pytest.raises(OSError):
+        make_avatar_thumbnail(str(src), str(tmp_path), "avatar")
+    assert os.listdir(tmp_path) == ["photo.png"]
+
+
+def test_failed_copy_leaves_no_files(tmp_path, monkeypatch):
+    src = tmp_path / "photo.heic"
+    src.write_bytes(b"not an image")
+
+    def copy_half_then_fail(src_path, dst_path):
+        with open(dst_path, "wb") as f: f.write(b"not")
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr("avatar.shutil.copy", copy_half_then_fail)
+
+    with pytest.raises(OSError):
+        make_avatar_thumbnail(str(src), str(tmp_path), "avatar")
+    assert os.listdir(tmp_path) == ["photo.heic"]
@@ -0,0 +1,165 @@
+import io
+import json
+import struct
+import zlib
+
+import pytest
+
+from backup import decode_snapshot, encode_snapshot, iter_json_array, validate_log_entry
+from storage import make_timestamp
+
+
+def entry(log_id, date_str, time_str, rating=3, events=()):
+    return {"id": log_id, "date_str": date_str, "time_str": time_str, "rating": rating,
+            "events": list(events), "ts": make_timestamp(date_str, time_str)}
+
+
+SAMPLE = [
+    entry(1, "01.02.2025", "08:30", 5, ["吃饭", "散步"]),
+    entry(2, "01.02.2025", "21:05", 0, ["散步"]),
+    entry(3, "1.2.2025", "9:5", 2, ["洗澡"]),   # 非标准格式：原样保留
+    entry(-7, "31.12.2024", "23:59", 4),
+]
+
+
+# ---------- 流式 JSON 导入 ----------
+
+ELEMENTS = [
+    {"id": 1, "date_str": "01.02.2025", "events": ["吃饭", "a,b]c"]},
+    12345678901234567890,
+    -0.5e-3,
+    "字符串 \\ \"引号\"",
+    [],
+    {},
+    None,
+    True,
+]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 1 << 16])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_iter_json_array_across_chunk_boundaries(chunk_size, indent):
+    text = json.dumps(ELEMENTS, ensure_ascii=False, indent=indent)
+
+    assert list(iter_json_array(io.StringIO(text), chunk_size)) == ELEMENTS
+
+
+@pytest.mark.parametrize("chunk_size", [1, 4])
+def test_iter_json_array_does_not_split_numbers(chunk_size):
+    # 数字正好停在块边界上时，要读完下一块才知道它有没有结束
+    text = "[1234, 5678,90]"
+
+    assert list(iter_json_array(io.StringIO(text), chunk_size)) == [1234, 5678, 90]
+
+
+@pytest.mark.parametrize("text", ["[]", "  [ ]  ", "\n[\r\n]"])
+def test_iter_json_array_empty(text):
+    assert list(iter_json_array(io.StringIO(text), 1)) == []
+
+
+@pytest.mark.parametrize("text", [
+    "",                # 空文件
+    "{\"id\": 1}",     # 不是数组
+    "[1, 2",           # 截断
+    "[1 2]",           # 缺逗号
+    "[{\"id\": 1]",    # 元素不完整
+    "[1,]",            # 多余逗号
+])
+@pytest.mark.parametrize("chunk_size", [1, 1 << 16])
+def test_iter_json_array_malformed(text, chunk_size):
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO(text), chunk_size))
+
+
+def test_validate_log_entry_normalizes_date_and_time():
+    entry = validate_log_entry({"id": 3, "date_str": "1.2.2025", "time_str": "9:5", "rating": 4, "events": ["散步"]})
+
+    assert entry == {"id": 3, "date_str": "01.02.2025", "time_str": "09:05", "rating": 4,
+                     "events": ["散步"], "ts": 202502010905}
+    assert validate_log_entry({"id": 4, "date_str": "01.02.2025"})["time_str"] == "00:00"
+
+
+@pytest.mark.parametrize("raw", [
+    [],
+    {"id": "1", "date_str": "01.02.2025"},
+    {"id": True, "date_str": "01.02.2025"},
+    {"id": 1, "date_str": "2025-02-01"},
+    {"id": 1, "date_str": "31.02.2025"},
+    {"id": 1, "date_str": "01.02.2025", "time_str": "25:00"},
+    {"id": 1, "date_str": "01.02.2025", "rating": 6},
+    {"id": 1, "date_str": "01.02.2025", "events": "散步"},
+    {"id": 1, "date_str": "01.02.2025", "events": [1]},
+])
+def test_validate_log_entry_rejects_invalid(raw):
+    assert validate_log_entry(raw) is None
+
+
+# ---------- 紧凑快照 (.omnis) ----------
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_snapshot_round_trip(compress):
+    data = encode_snapshot(iter(SAMPLE), compress=compress)
+
+    assert decode_snapshot(data) == SAMPLE
+    assert data[5] == (1 if compress else 0)
+
+
+def test_snapshot_keeps_non_standard_date_and_time():
+    (decoded,) = decode_snapshot(encode_snapshot([entry(9, "1.2.2025", "9:5")]))
+
+    assert (decoded["date_str"], decoded["time_str"]) == ("1.2.2025", "9:5")
+    assert decoded["ts"] == make_timestamp("1.2.2025", "9:5")
+
+
+def test_snapshot_of_nothing():
+    assert decode_snapshot(encode_snapshot([])) == []
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_truncated_snapshot_raises_value_error(compress):
+    data = encode_snapshot(SAMPLE, compress=compress)
+
+    for cut in range(4, len(data)):
+        with pytest.raises(ValueError):
+            decode_snapshot(data[:cut])
+
+
+def test_corrupted_snapshot_raises_value_error():
+    data = encode_snapshot(SAMPLE, compress=False)
+    body = bytearray(data[6:])
+
+    # 记录数改大：列长度不够
+    bad_count = bytearray(body)
+    bad_count[0:4] = struct.pack("<I", 1000)
+    # 最后一个字符串长度改大：越过文件末尾
+    text_size = sum(len(t.encode()) for t in ["吃饭", "散步", "洗澡", "1.2.2025", "9:5"])
+    bad_length = bytearray(body)
+    bad_length[-text_size - 4:-text_size] = struct.pack("<I", 1000)
+    # 字符串内容不是合法 UTF-8
+    bad_text = bytearray(body)
+    bad_text[-1] = 0xFF
+
+    for bad in (bad_count, bad_length, bad_text):
+        with pytest.raises(ValueError):
+            decode_snapshot(data[:6] + bytes(bad))
+    with pytest.raises(ValueError):
+        decode_snapshot(data[:5] + b"\x01" + b"not zlib")
+    with pytest.raises(ValueError):
+        decode_snapshot(b"JSON" + data[4:])
+    with pytest.raises(ValueError):
+        decode_snapshot(data[:4] + b"\x02" + data[5:])
+
+
+def test_out_of_range_string_reference_raises_value_error():
+    # 手工拼一个事件引用指向不存在的字符串的快照
+    body = b"".join([
+        struct.pack("<I", 1), struct.pack("<q", 1), struct.pack("<q", 202502010830),
+        struct.pack("<B", 3), struct.pack("<H", 1),
+        struct.pack("<I", 1), struct.pack("<I", 5),
+        struct.pack("<I", 0xFFFFFFFF), struct.pack("<I", 0xFFFFFFFF),
+        struct.pack("<I", 0),
+    ])
+    data = b"OMNS" + struct.pack("<BB", 1, 1) + zlib.compress(body)
+
+    with pytest.raises(ValueError):
+        decode_snapshot(data)
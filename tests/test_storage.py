@@ -0,0 +1,594 @@
+import datetime
+import json
+import random
+import threading
+import time
+
+import pytest
+
+from storage import (BookingStore, LazyLogBackend, LogRepository, LogStats, SqliteLogBackend, WriteBehindStorage, make_timestamp,
+                     move_entries)
+
+
+class DictStorage:
+    """代替 page.client_storage：存在内存字典里"""
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value):
+        self.data[key] = value
+
+    def remove(self, key):
+        self.data.pop(key, None)
+
+
+class FlakyStorage(DictStorage):
+    """前 failures 次写入失败；block 设置后写入会停在 started 之后，等 release"""
+    def __init__(self, failures=0, block=False):
+        super().__init__()
+        self.failures = failures
+        self.writes = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+        if not block: self.release.set()
+
+    def set(self, key, value):
+        self.started.set()
+        self.release.wait(5)
+        self.writes.append((key, value, time.monotonic()))
+        if self.failures:
+            self.failures -= 1
+            raise OSError("磁盘满了")
+        super().set(key, value)
+
+
+def wait_until(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "超时"
+        time.sleep(0.005)
+
+
+def entry(log_id, date_str, time_str="12:00", rating=3, events=()):
+    return {"id": log_id, "date_str": date_str, "time_str": time_str, "rating": rating,
+            "events": list(events), "ts": make_timestamp(date_str, time_str)}
+
+
+def stored_ids(storage, month):
+    return sorted(e["id"] for e in json.loads(storage.data.get(LogRepository.CHUNK_PREFIX + month, "[]")))
+
+
+# ---------- LogStats ----------
+
+def on_day(log_id, day, rating=3, events=()):
+    """day 是 date.toordinal() 的序号"""
+    return entry(log_id, datetime.date.fromordinal(day).strftime("%d.%m.%Y"), rating=rating, events=events)
+
+
+def naive_streaks(days, today):
+    """对照实现：直接在日期集合上数"""
+    longest = run = 0
+    for day in sorted(days):
+        run = run + 1 if day - 1 in days else 1
+        longest = max(longest, run)
+    end = today if today in days else today - 1
+    current = 0
+    while end - current in days: current += 1
+    return current, longest
+
+
+def summary(stats, days_to_check):
+    return (stats.count(), stats.average(), stats.months(), stats.rating_distribution(),
+            stats.top_events(limit=100), [stats.streaks(today) for today in days_to_check],
+            sorted(stats._run_end.items()))
+
+
+def test_streaks_count_through_today_with_later_entries():
+    stats = LogStats()
+    base = datetime.date(2025, 2, 1).toordinal()
+    for i, day in enumerate(range(base + 3, base + 7)): # 第 3-6 天
+        stats.add(on_day(i, day))
+
+    assert stats.streaks(today=base + 5) == (3, 4)  # 第 7 天以后的记录不算进当前连续
+    assert stats.streaks(today=base + 6) == (4, 4)
+    assert stats.streaks(today=base + 7) == (4, 4)  # 今天还没记：看昨天
+    assert stats.streaks(today=base + 8) == (0, 4)
+    assert stats.streaks(today=base + 2) == (0, 4)
+
+
+def test_streaks_join_and_split_runs():
+    stats = LogStats()
+    base = datetime.date(2025, 2, 1).toordinal()
+    for i in (1, 2, 4, 5):
+        stats.add(on_day(i, base + i))
+    assert stats.streaks(today=base + 5) == (2, 2)
+
+    middle = on_day(3, base + 3)
+    stats.add(middle)       # 补上中间一天：两段拼成一段
+    assert stats.streaks(today=base + 5) == (5, 5)
+
+    extra = on_day(33, base + 3)
+    stats.add(extra)        # 同一天第二条：不影响区间
+    stats.remove(middle)
+    assert stats.streaks(today=base + 5) == (5, 5)
+    stats.remove(extra)     # 这天删光了：从这天断开
+    assert stats.streaks(today=base + 5) == (2, 2)
+    assert sorted(stats._run_end.items()) == [(base + 1, base + 2), (base + 4, base + 5)]
+
+
+def test_incremental_stats_match_full_rebuild():
+    """3000 次随机增删后，增量维护的汇总和从头重建的一致"""
+    rng = random.Random(2025)
+    base = datetime.date(2025, 1, 1).toordinal()
+    stats = LogStats()
+    live = {}
+    for step in range(3000):
+        if live and rng.random() < 0.45:
+            stats.remove(live.pop(rng.choice(list(live))))
+        else:
+            events = rng.sample(["吃饭", " 散步 ", "洗澡", "看 医生", ""], rng.randint(0, 3))
+            item = on_day(step, base + rng.randint(0, 90), rating=rng.randint(0, 5), events=events)
+            live[step] = item
+            stats.add(item)
+
+        if step % 500 == 499:
+            rebuilt = LogStats()
+            for item in live.values(): rebuilt.add(item)
+            days_to_check = range(base - 1, base + 93, 7)
+            assert summary(stats, days_to_check) == summary(rebuilt, days_to_check)
+            days = {LogStats.day_of(item) for item in live.values()}
+            assert [stats.streaks(t) for t in days_to_check] == [naive_streaks(days, t) for t in days_to_check]
+
+
+# ---------- WriteBehindStorage ----------
+
+def test_write_behind_coalesces_writes_within_the_window():
+    inner = FlakyStorage()
+    storage = WriteBehindStorage(inner, delay=0.05)
+    storage.set("a", "1")
+    storage.set("a", "2")
+    storage.set("b", "x")
+    storage.remove("b")
+
+    assert storage.get("a") == "2" and storage.get("b") is None
+    assert inner.writes == []
+    wait_until(lambda: "a" in inner.data)
+    assert [(key, value) for key, value, _ in inner.writes] == [("a", "2")]
+    assert "b" not in inner.data
+
+
+def test_write_behind_reads_values_still_being_written():
+    inner = FlakyStorage(block=True)
+    storage = WriteBehindStorage(inner, delay=10)
+    storage.set("a", "1")
+    flusher = threading.Thread(target=storage.flush)
+    flusher.start()
+    inner.started.wait(5)
+
+    assert storage.get("a") == "1" # 写出中：存储里还没有
+    storage.set("a", "2")
+    assert storage.get("a") == "2" # 新写入的优先
+    inner.release.set()
+    flusher.join(5)
+    assert inner.data["a"] == "1"
+    storage.flush()
+    assert inner.data["a"] == "2"
+
+
+def test_write_behind_retries_with_backoff():
+    inner = FlakyStorage(failures=2)
+    errors = []
+    storage = WriteBehindStorage(inner, delay=0.02, on_error=lambda key, ex: errors.append(key))
+    storage.set("a", "1")
+
+    wait_until(lambda: inner.data.get("a") == "1")
+    times = [t for _, _, t in inner.writes]
+    assert len(times) == 3
+    assert times[2] - times[1] > times[1] - times[0] # 间隔越来越长
+    assert errors == []
+
+
+def test_write_behind_gives_up_after_max_retries_but_keeps_the_value():
+    inner = FlakyStorage(failures=WriteBehindStorage.MAX_RETRIES)
+    errors = []
+    storage = WriteBehindStorage(inner, delay=0.005, on_error=lambda key, ex: errors.append(key))
+    storage.set("a", "1")
+
+    wait_until(lambda: errors)
+    time.sleep(0.1)
+    assert errors == ["a"]
+    assert len(inner.writes) == WriteBehindStorage.MAX_RETRIES
+    assert storage.get("a") == "1" # 还在队列里
+    storage.set("b", "2")           # 下次写入时一起再试
+    wait_until(lambda: inner.data.get("a") == "1" and inner.data.get("b") == "2")
+
+
+def test_write_behind_failed_value_does_not_overwrite_newer_one():
+    inner = FlakyStorage(failures=1, block=True)
+    storage = WriteBehindStorage(inner, delay=10)
+    storage.set("a", "old")
+    flusher = threading.Thread(target=storage.flush)
+    flusher.start()
+    inner.started.wait(5)
+    storage.set("a", "new")
+    inner.release.set()
+    flusher.join(5)
+
+    storage.flush()
+    assert inner.data["a"] == "new"
+
+
+def test_write_behind_stops_after_close():
+    inner = FlakyStorage(failures=1)
+    errors = []
+    storage = WriteBehindStorage(inner, delay=0.01, on_error=lambda key, ex: errors.append(key))
+    storage.set("a", "1")
+    wait_until(lambda: inner.writes)
+    storage.close()
+    storage.set("b", "2")
+    storage.flush()
+    time.sleep(0.1)
+
+    assert len(inner.writes) == 1
+    assert inner.data == {} and errors == []
+
+
+def test_write_behind_close_with_flush_writes_pending_values():
+    inner = FlakyStorage()
+    storage = WriteBehindStorage(inner, delay=10)
+    storage.set("a", "1")
+    storage.close(flush=True)
+
+    assert inner.data == {"a": "1"}
+
+
+def test_write_behind_close_with_flush_on_unreachable_storage():
+    # 会话已经断开：写不进去就丢掉，不抛异常，也不再重试
+    inner = FlakyStorage(failures=100)
+    errors = []
+    storage = WriteBehindStorage(inner, delay=0.01, on_error=lambda key, ex: errors.append(key))
+    storage.set("a", "1")
+    storage.close(flush=True)
+    time.sleep(0.1)
+
+    assert len(inner.writes) == 1
+    assert inner.data == {} and errors == []
+
+
+def test_write_behind_stops_at_first_failure_and_keeps_order():
+    inner = FlakyStorage(failures=1)
+    storage = WriteBehindStorage(inner, delay=10)
+    for key in "abc":
+        storage.set(key, key)
+
+    assert not storage.flush()
+    assert inner.data == {}                 # a 写失败：b、c 不能抢先写出
+    storage.set("c", "new")
+    storage.set("d", "d")
+    assert storage.flush()
+    assert [key for key, _, _ in inner.writes] == ["a", "a", "b", "c", "d"]
+    assert inner.data == {"a": "a", "b": "b", "c": "new", "d": "d"}
+
+
+def test_legacy_migration_survives_a_failed_chunk_write():
+    inner = FlakyStorage(failures=1)
+    legacy = [entry(1, "01.02.2025"), entry(2, "01.03.2025")]
+    inner.data[LogRepository.LEGACY_KEY] = json.dumps(legacy)
+    storage = WriteBehindStorage(inner, delay=10)
+    assert LogRepository(storage).count() == 2
+
+    # 第一个分片写失败：清单没写、旧 key 还在，下次启动会重新迁移
+    assert not storage.flush()
+    assert set(inner.data) == {LogRepository.LEGACY_KEY}
+    restarted = DictStorage()
+    restarted.data = dict(inner.data)
+    assert LogRepository(restarted).count() == 2
+
+    assert storage.flush()
+    assert [key for key, _, _ in inner.writes] == [
+        "tuntun_logs:2025-02", "tuntun_logs:2025-02", "tuntun_logs:2025-03", LogRepository.MANIFEST_KEY]
+    assert LogRepository.LEGACY_KEY not in inner.data
+    assert ids(LogRepository(inner)) == [1, 2]
+
+
+# ---------- LogRepository.merge ----------
+
+def test_merge_adds_updates_and_skips_unchanged():
+    storage = DictStorage()
+    repo = LogRepository(storage)
+    repo.add(entry(1, "01.02.2025"))
+    repo.add(entry(2, "02.02.2025"))
+
+    added, updated = repo.merge([
+        entry(1, "01.02.2025"),               # 完全相同
+        entry(2, "02.02.2025", rating=5),     # 更新
+        entry(3, "03.02.2025"),               # 新增
+    ])
+
+    assert (added, updated) == (1, 1)
+    assert [e["id"] for e in repo.ordered()] == [1, 2, 3]
+    assert repo.month(2025, 2)[1]["rating"] == 5
+    assert stored_ids(storage, "2025-02") == [1, 2, 3]
+
+
+def test_merge_dedups_ids_within_one_batch():
+    storage = DictStorage()
+    repo = LogRepository(storage)
+    repo.add(entry(1, "01.02.2025"))
+
+    added, updated = repo.merge([
+        entry(2, "02.02.2025"), entry(2, "02.02.2025", rating=1), entry(2, "02.02.2025", rating=4),
+        entry(1, "01.02.2025", rating=0), entry(1, "01.02.2025", rating=5),
+    ])
+
+    assert (added, updated) == (1, 1)
+    assert repo.count() == 2
+    assert {e["id"]: e["rating"] for e in repo.all()} == {1: 5, 2: 4}
+    assert stored_ids(storage, "2025-02") == [1, 2]
+
+
+def test_merge_moves_entry_to_another_month():
+    storage = DictStorage()
+    repo = LogRepository(storage)
+    repo.add(entry(1, "01.02.2025"))
+    repo.add(entry(2, "05.02.2025"))
+
+    assert repo.merge([entry(1, "15.03.2025", events=["搬家"])]) == (0, 1)
+
+    assert [e["id"] for e in repo.month(2025, 2)] == [2]
+    assert [e["id"] for e in repo.month(2025, 3)] == [1]
+    assert [e["id"] for e in repo.search("搬家")] == [1]
+    assert stored_ids(storage, "2025-02") == [2]
+    assert stored_ids(storage, "2025-03") == [1]
+    assert json.loads(storage.data[LogRepository.MANIFEST_KEY])["chunks"] == ["2025-02", "2025-03"]
+
+    # 月份分片空了就删掉
+    repo.merge([entry(2, "01.04.2025")])
+    assert LogRepository.CHUNK_PREFIX + "2025-02" not in storage.data
+    assert json.loads(storage.data[LogRepository.MANIFEST_KEY])["chunks"] == ["2025-03", "2025-04"]
+
+    reloaded = LogRepository(storage)
+    assert [(e["id"], e["date_str"]) for e in reloaded.ordered()] == [(1, "15.03.2025"), (2, "01.04.2025")]
+
+
+def test_concurrent_merges_with_readers():
+    """5 个线程同时导入、3 个线程同时读：读到的始终是完整一致的快照，最后一条也不少"""
+    storage = DictStorage()
+    repo = LogRepository(storage)
+    batches = [[entry(w * 1000 + i, f"{i % 28 + 1:02d}.{w + 1:02d}.2025", events=[f"批次{w}"])
+                for i in range(200)] for w in range(5)]
+    errors = []
+    done = threading.Event()
+
+    def writer(batch):
+        try:
+            assert repo.merge(batch) == (len(batch), 0)
+        except Exception as ex:
+            errors.append(ex)
+
+    def reader():
+        try:
+            while not done.is_set():
+                ordered = repo.ordered()
+                assert len(ordered) % 200 == 0 # 一批要么全部可见，要么都不可见
+                assert ordered == sorted(ordered, key=lambda e: (e["ts"], e["id"]))
+                for w in range(5):
+                    assert len(repo.search(f"批次{w}")) in (0, 200)
+        except Exception as ex:
+            errors.append(ex)
+
+    readers = [threading.Thread(target=reader) for _ in range(3)]
+    writers = [threading.Thread(target=writer, args=(batch,)) for batch in batches]
+    for t in readers + writers: t.start()
+    for t in writers: t.join()
+    done.set()
+    for t in readers: t.join()
+
+    assert not errors
+    assert repo.count() == 1000
+    assert sorted(e["id"] for e in LogRepository(storage).all()) == sorted(e["id"] for b in batches for e in b)
+
+
+# ---------- SQLite 后端 ----------
+
+def test_sqlite_search_and_stats_follow_writes(tmp_path):
+    sqlite = SqliteLogBackend(str(tmp_path / "logs.db")).open()
+    repo = LogRepository(DictStorage())
+    for backend in (sqlite, repo):
+        backend.merge([entry(1, "01.02.2025", events=["搬家", "吃饭"]), entry(2, "03.02.2025", events=["搬家公司"]),
+                       entry(3, "05.02.2025", events=["\"搬\"家"])])
+    stats = sqlite.stats()
+    assert [e["id"] for e in sqlite.search("搬家", reverse=True)] == [2, 1]
+
+    # 建好索引之后的增删改：搜索结果和 JSON 后端一致
+    for backend in (sqlite, repo):
+        backend.add(entry(4, "02.02.2025", events=["又搬家"]))
+        backend.merge([entry(1, "01.02.2025", events=["吃饭"])])
+        backend.delete(2)
+    for keyword in ("搬家", "搬", "\"", "02.2025", "吃饭", "没有"):
+        assert sqlite.search(keyword) == repo.search(keyword)
+
+    assert stats.count() == 3                    # 拿到的是快照，之后的写入不影响它
+    assert sqlite.stats().count() == repo.stats().count() == 3
+    sqlite.clear()
+    assert sqlite.search("吃饭") == []
+
+
+# ---------- 切换后端 (LazyLogBackend.migrate) ----------
+
+def ids(backend):
+    return [e["id"] for e in backend.ordered()]
+
+
+def test_migrate_round_trip_keeps_entries_written_on_either_side(tmp_path):
+    storage = DictStorage()
+    db_path = str(tmp_path / "logs.db")
+    repo = LazyLogBackend(lambda: LogRepository(storage))
+    repo.add(entry(1, "01.02.2025"))
+
+    # JSON -> SQLite：JSON 分片清空，不留过期副本
+    assert repo.migrate(SqliteLogBackend(db_path).open()) == 1
+    repo.add(entry(2, "02.02.2025"))
+    assert LogRepository(storage).count() == 0
+
+    # 这次会话 SQLite 打不开，退回 JSON 写了一条
+    fallback = LogRepository(storage)
+    fallback.add(entry(3, "03.02.2025"))
+
+    # 再切回 SQLite：库里的第 2 条不能被清掉
+    session = LazyLogBackend(lambda: fallback)
+    assert session.migrate(SqliteLogBackend(db_path).open()) == 1
+    assert ids(session) == [1, 2, 3]
+    assert LogRepository(storage).count() == 0
+
+
+def test_move_entries_merges_into_non_empty_target(tmp_path):
+    source = LogRepository(DictStorage())
+    source.add(entry(1, "01.02.2025", rating=5))
+    target = SqliteLogBackend(str(tmp_path / "logs.db")).open()
+    target.merge([entry(1, "01.02.2025", rating=1), entry(2, "02.02.2025")])
+
+    assert move_entries(source, target) == 1
+
+    assert {e["id"]: e["rating"] for e in target.all()} == {1: 5, 2: 3}
+    assert source.count() == 0
+
+
+def test_old_backend_is_cleared_and_closed_after_last_reader(tmp_path):
+    sqlite = SqliteLogBackend(str(tmp_path / "logs.db")).open()
+    sqlite.add(entry(1, "01.02.2025"))
+    sqlite.add(entry(2, "01.03.2025"))
+    repo = LazyLogBackend(lambda: sqlite)
+
+    chunks = repo.iter_chunks() # 导出线程拿着还没读完的生成器
+    assert [e["id"] for e in next(chunks)] == [1]
+    migration = threading.Thread(target=repo.migrate, args=(LogRepository(DictStorage()),))
+    migration.start()
+    migration.join(0.2)
+
+    assert migration.is_alive()      # 还有读取在用旧后端：先不清空、不关闭
+    assert ids(repo) == [1, 2]       # 新的读取已经走新后端
+    assert [e["id"] for c in chunks for e in c] == [2]
+    migration.join(5)
+    assert not migration.is_alive()
+    assert sqlite._conn is None      # 最后一个读取结束后关闭
+
+
+def test_reads_started_before_migrate_finish_on_old_backend(tmp_path):
+    sqlite = SqliteLogBackend(str(tmp_path / "logs.db")).open()
+    sqlite.merge([entry(i, "01.02.2025", f"{i // 60:02d}:{i % 60:02d}") for i in range(500)])
+    repo = LazyLogBackend(lambda: sqlite)
+    errors = []
+    done = threading.Event()
+
+    def reader():
+        try:
+            while not done.is_set():
+                assert len(repo.month(2025, 2)) == 500
+        except Exception as ex:
+            errors.append(ex)
+
+    readers = [threading.Thread(target=reader) for _ in range(3)]
+    for t in readers: t.start()
+    repo.migrate(LogRepository(DictStorage()))
+    repo.migrate(SqliteLogBackend(str(tmp_path / "other.db")).open())
+    done.set()
+    for t in readers: t.join()
+
+    assert not errors
+    assert sqlite._conn is None
+
+
+def test_migrate_aborts_when_target_storage_write_fails(tmp_path):
+    sqlite = SqliteLogBackend(str(tmp_path / "logs.db")).open()
+    sqlite.merge([entry(1, "01.02.2025"), entry(2, "01.03.2025")])
+    repo = LazyLogBackend(lambda: sqlite)
+    target = LogRepository(WriteBehindStorage(FlakyStorage(failures=1), delay=10))
+
+    with pytest.raises(OSError):
+        repo.migrate(target)
+
+    # 写进 JSON 的那一步没成功：继续用 SQLite，里面的记录一条不少
+    assert repo.resolve() is sqlite
+    assert ids(repo) == [1, 2]
+    assert sqlite._conn is not None
+
+
+# ---------- BookingStore ----------
+
+def booking(date_str, time_str="08:00", start="Hauptstr 1", end="Pontstr 5", **fields):
+    return dict(fields, date_str=date_str, time_str=time_str, start=start, end=end)
+
+
+def test_booking_save_many_dedups_by_date_time_start_end():
+    storage = DictStorage()
+    store = BookingStore(storage)
+    first, same, other_time = store.save_many([
+        booking("05.03.2025", price="90"),
+        booking("05.03.2025", price="120"),         # 同一单：更新
+        booking("05.03.2025", "09:00"),
+    ])
+
+    assert same["id"] == first["id"]
+    assert other_time["id"] != first["id"]
+    assert store.count() == 2
+    assert [b["price"] for b in store.day(2025, 3, 5) if b["time_str"] == "08:00"] == ["120"]
+    assert len(BookingStore(storage).day(2025, 3, 5)) == 2
+
+
+def test_booking_update_by_id_moves_to_new_date():
+    storage = DictStorage()
+    store = BookingStore(storage)
+    saved = store.save(booking("31.03.2025"))
+
+    moved = store.save(dict(saved, date_str="02.04.2025"))
+
+    assert moved["id"] == saved["id"]
+    assert store.count() == 1
+    assert store.day(2025, 3, 31) == []
+    assert [b["id"] for b in store.day(2025, 4, 2)] == [saved["id"]]
+    assert BookingStore.CHUNK_PREFIX + "2025-03" not in storage.data
+    assert json.loads(storage.data[BookingStore.MANIFEST_KEY])["chunks"] == ["2025-04"]
+
+
+def test_booking_update_by_id_onto_another_bookings_slot_merges_them():
+    store = BookingStore(DictStorage())
+    a = store.save(booking("05.03.2025", "08:00"))
+    b = store.save(booking("05.03.2025", "09:00"))
+
+    merged = store.save(dict(a, time_str="09:00"))
+
+    assert merged["id"] == a["id"]
+    assert [x["id"] for x in store.day(2025, 3, 5)] == [a["id"]]
+    assert store.count() == 1 and b["id"] != a["id"]
+
+
+def test_booking_without_valid_date_is_skipped():
+    storage = DictStorage()
+    store = BookingStore(storage)
+
+    assert store.save_many([booking(""), booking("dd.mm.yyyy"), booking("31.02.2025"), booking("05.03.2025")])[:3] == [None] * 3
+    assert store.count() == 1
+    assert BookingStore.CHUNK_PREFIX + BookingStore.UNKNOWN_CHUNK not in storage.data
+
+
+def test_address_suggestions_follow_bookings():
+    store = BookingStore(DictStorage())
+    a = store.save(booking("05.03.2025", start="Hauptstr 1", end="Pontstr 5"))
+    b = store.save(booking("06.03.2025", start="hauptstr  1", end="Pontstr 7"))
+
+    assert store.suggest_addresses("HAUPT") == ["hauptstr  1"] # 最近一次的写法
+    assert store.suggest_addresses("pontstr") == ["Pontstr 7", "Pontstr 5"] # 用得一样多：最近的在前
+
+    store.delete(b["id"])
+    assert store.suggest_addresses("haupt") == ["Hauptstr 1"]
+    assert store.suggest_addresses("pontstr 7") == [] # 最后一单删了就不再提示
+
+    store.save(dict(a, end="Markt 3")) # 改地址：旧地址也不再提示
+    assert store.suggest_addresses("pont") == []
+    assert store.suggest_addresses("mar") == ["Markt 3"]
+    store.delete(a["id"])
+    assert store.suggest_addresses("h") == [] and store.suggest_addresses("m") == []
@@ -0,0 +1,45 @@
+import flet as ft
+
+import theme
+from theme import DARK_PALETTE, LIGHT_PALETTE, restyle_controls, with_opacity
+
+
+def test_restyle_controls_swaps_palette_colors():
+    light = LIGHT_PALETTE
+    text = ft.Text("你好", color=light["text"])
+    hint = ft.Text("提示", color=with_opacity(0.5, light["sub_text"]))
+    plain = ft.Text("原色", color="red")
+    card = ft.Container(
+        content=ft.Column([text, hint, plain]),
+        bgcolor=light["card"],
+        border=ft.border.all(1, light["divider"]),
+    )
+
+    restyle_controls([card], "dark")
+
+    assert card.bgcolor == DARK_PALETTE["card"]
+    assert card.border.top.color == DARK_PALETTE["divider"]
+    assert text.color == DARK_PALETTE["text"]
+    assert hint.color == f"{DARK_PALETTE['sub_text']},0.5"
+    assert plain.color == "red"
+
+    restyle_controls([card], "light")
+
+    assert card.bgcolor == light["card"]
+    assert text.color == light["text"]
+    assert hint.color == f"{light['sub_text']},0.5"
+
+
+def test_missing_flet_internals_warn_instead_of_failing(monkeypatch, capsys):
+    assert theme.RESTYLE_SUPPORTED
+    monkeypatch.delattr(ft.Control, "_get_children")
+
+    assert theme._check_flet_internals() is False
+    assert "_get_children" in capsys.readouterr().out
+
+
+def test_other_flet_version_falls_back_to_rebuild(monkeypatch, capsys):
+    monkeypatch.setattr(ft.version, "version", "0.23.0")
+
+    assert theme._check_flet_internals() is False
+    assert "0.23.0" in capsys.readouterr().out
@@ -0,0 +1,168 @@
+import datetime
+import itertools
+import re
+
+import pytest
+
+from tools_view import (build_move_quote, csv_delimiter, extract_share_links, format_share_message,
+                        is_move_csv_header, parse_move_csv, strip_link_trailing)
+
+
+# ---------- 百度网盘链接清洗 ----------
+
+@pytest.mark.parametrize("url, expected", [
+    ("https://pan.baidu.com/s/1abc.", "https://pan.baidu.com/s/1abc"),
+    ("https://pan.baidu.com/s/1abc?pwd=ab12\",", "https://pan.baidu.com/s/1abc?pwd=ab12"),
+    ("https://pan.baidu.com/s/1abc)", "https://pan.baidu.com/s/1abc"),
+    ("https://pan.baidu.com/s/1abc]).", "https://pan.baidu.com/s/1abc"),
+    ("https://pan.baidu.com/s/1a(b)c", "https://pan.baidu.com/s/1a(b)c"),
+    ("https://pan.baidu.com/s/1a(b)", "https://pan.baidu.com/s/1a(b)"),
+    ("https://pan.baidu.com/s/1a(b))", "https://pan.baidu.com/s/1a(b)"),
+])
+def test_strip_link_trailing(url, expected):
+    assert strip_link_trailing(url) == expected
+
+
+def test_extract_multiple_links_with_their_own_codes():
+    text = (
+        "链接：https://pan.baidu.com/s/1first 提取码：ab12 复制这段内容打开\n"
+        "第二个：https://pan.baidu.com/s/1second?pwd=cd34 提取码：zz99\n"
+        "第三个 https://pan.baidu.com/s/1third\n"
+        "再发一次 https://pan.baidu.com/s/1first 提取码：ab12"
+    )
+
+    assert extract_share_links(text) == [
+        ("https://pan.baidu.com/s/1first", "ab12"),
+        ("https://pan.baidu.com/s/1second?pwd=cd34", "cd34"),   # 链接里的 ?pwd= 优先
+        ("https://pan.baidu.com/s/1third", None),               # 不会串到后面那个链接的提取码
+    ]
+
+
+def test_extract_link_stops_at_first_non_ascii_character():
+    text = "https://pan.baidu.com/s/1abc提取码:ab12"
+
+    assert extract_share_links(text) == [("https://pan.baidu.com/s/1abc", "ab12")]
+
+
+def test_extract_link_wrapped_in_brackets():
+    assert extract_share_links("资料 (https://pan.baidu.com/s/1abc) 密码 x9y8") == [("https://pan.baidu.com/s/1abc", "x9y8")]
+    assert extract_share_links("[https://pan.baidu.com/s/1a(b)c]") == [("https://pan.baidu.com/s/1a(b)c", None)]
+
+
+def test_format_share_message_writes_code_only_without_pwd():
+    links = [("https://pan.baidu.com/s/1a", "ab12"), ("https://pan.baidu.com/s/1b?pwd=cd34", "cd34")]
+
+    assert format_share_message(links, "复制并打开", "说明") == (
+        "复制并打开\n"
+        "链接1:https://pan.baidu.com/s/1a\n提取码:ab12\n"
+        "链接2:https://pan.baidu.com/s/1b?pwd=cd34"
+        "\n\n\n说明"
+    )
+    assert format_share_message(links[:1], "前缀", "后缀").startswith("前缀\n链接:https://pan.baidu.com/s/1a\n")
+
+
+# ---------- 搬家报价 ----------
+
+def old_move_preview(d_str, t_str, h_str, s_addr, e_addr, price, trips, is_temp, furniture):
+    """最早版本 update_move_preview 里拼文字的部分 (原样搬过来做对照)"""
+    d_str = d_str or "dd.mm.yyyy"
+    t_str = t_str or "xx:xx"
+    s_addr = re.sub(r'Aachen\s*$', 'AC', s_addr or "", flags=re.IGNORECASE)
+    e_addr = re.sub(r'Aachen\s*$', 'AC', e_addr or "", flags=re.IGNORECASE)
+    price = price if price else "90"
+    trips = trips or "1"
+    if is_temp:
+        cancellation_text = "临时预定不接受取消/更改，"
+    else:
+        try:
+            dt = datetime.datetime.strptime(d_str, "%d.%m.%Y")
+            notify_dt = dt - datetime.timedelta(days=2)
+            cancellation_text = f"如有时间更改需要请于{notify_dt.day}号结束前通知，过后取消/更改需收取20%原标价。"
+        except ValueError:
+            cancellation_text = "如有时间更改需要请于(dd-2)号结束前通知，过后取消/更改需收取20%原标价。"
+    furniture_text = "如有大件请保证提前拆卸和通道畅通。" if furniture else ""
+    return (
+        f"🗓️ {d_str}   🕗 {t_str}   {h_str}\n\n"
+        f"{s_addr}\n"
+        f"➡ \n"
+        f"{e_addr}\n\n\n"
+        f"{price}€  {trips}x\n\n"
+        f"_________________________________ \n"
+        f"车型已确定，{cancellation_text}{furniture_text}如遇时间轻微变动以司机信息为准，敬请谅解。现场支持现金/PayPal付款。"
+    )
+
+
+def test_move_quote_matches_old_preview():
+    """5120 种输入组合下和旧版逐字节一致"""
+    addresses = ["", "Hauptstr. 1, Aachen", "Pontstr 5 aachen  ", "Köln"]
+    combos = itertools.product(
+        ["", "05.03.2025", "01.03.2025", "29.02.2024", "bad"], ["", "08:30"], ["m.T.", "o.T."],
+        addresses, addresses, ["", "120"], ["", "2"], [False, True], [False, True],
+    )
+    count = 0
+    for args in combos:
+        assert build_move_quote(*args[:7], is_temp=args[7], furniture=args[8]).encode() == old_move_preview(*args).encode()
+        count += 1
+    assert count == 5120
+
+
+# ---------- CSV 批量模式 ----------
+
+def test_csv_delimiter_ignores_quoted_cells():
+    assert csv_delimiter('"a;b;c",x,y\n1;2;3') == ","
+    assert csv_delimiter("\n\ndatum;zeit;von, nach\n") == ";"
+    assert csv_delimiter("date\ttime\tstart\n") == "\t"
+    assert csv_delimiter("") == ","
+
+
+def test_is_move_csv_header():
+    assert is_move_csv_header(["Datum", "Zeit", "Start", "Ziel", "Notes"])
+    assert is_move_csv_header(["日期", "时间", "备注"])
+    assert is_move_csv_header([" start ", "x", "y", "z"])
+    assert not is_move_csv_header(["05.03.2025", "08:00", "Hauptstr 1", "Pontstr 5"])
+    assert not is_move_csv_header(["", " "])
+
+
+def test_parse_semicolon_csv_with_optional_columns():
+    text = (
+        "﻿Datum;Zeit;Start;Ziel;Preis;趟数;Helper\n"
+        "05.03.2025;08:00;Hauptstr 1 Aachen;Pontstr 5;120;2;ja\n"
+        "06.03.2025;09:30;Köln;Bonn;;;nein\n"
+        ";;;;;;\n"
+        "07.03.2025;10:00;;;90;1;\n"
+    )
+    bookings, skipped = parse_move_csv(text)
+
+    assert skipped == 1
+    assert [(b["date_str"], b["start"], b["end"], b["price"], b["trips"], b["helper"]) for b in bookings] == [
+        ("05.03.2025", "Hauptstr 1 Aachen", "Pontstr 5", "120", "2", "m.T."),
+        ("06.03.2025", "Köln", "Bonn", "", "", "o.T."),
+    ]
+    assert not bookings[0]["temp"] and not bookings[0]["furniture"]
+
+
+def test_parse_csv_without_header_and_ragged_rows():
+    # 没有表头：按默认列顺序；有的行带了临时/大件列，有的没有
+    text = "05.03.2025;08:00;A;B;100;1;x;ja;ja\n06.03.2025;09:00;C;D;;;\n"
+    bookings, skipped = parse_move_csv(text)
+
+    assert skipped == 0
+    assert [(b["start"], b["temp"], b["furniture"]) for b in bookings] == [("A", True, True), ("C", False, False)]
+
+
+def test_parse_csv_header_with_extra_notes_column():
+    text = "date,time,start,end,price,Notes\n05.03.2025,08:00,A,B,100,call first\n"
+    bookings, skipped = parse_move_csv(text)
+
+    assert skipped == 0
+    assert len(bookings) == 1
+    assert (bookings[0]["start"], bookings[0]["end"], bookings[0]["price"]) == ("A", "B", "100")
+
+
+def test_parse_csv_quoted_commas():
+    text = 'date,time,start,end\n05.03.2025,08:00,"Hauptstr. 1, 52062 Aachen","Pontstr. 5, Köln"\n'
+    (booking,), skipped = parse_move_csv(text)
+
+    assert skipped == 0
+    assert booking["start"] == "Hauptstr. 1, 52062 Aachen"
+    assert booking["end"] == "Pontstr. 5, Köln"
@@ -0,0 +1,146 @@
+# 主题：预先算好的浅色/深色调色板 + 切换主题时的换色遍历
+import dataclasses
+from collections.abc import Mapping
+from types import MappingProxyType
+import flet as ft
+
+class ThemeColor(str):
+    """调色板里取出的颜色：值就是颜色字符串 (Flet 照常使用)，另外记着自己的角色名
+    切换主题时按角色换成另一套调色板里的颜色，所以控件不用重建"""
+    def __new__(cls, value, role, opacity=None):
+        color = str.__new__(cls, value if opacity is None else f"{value},{opacity}")
+        color.role = role
+        color.opacity = opacity
+        return color
+
+def _palette(**colors):
+    # 只读：所有视图共用同一份，谁也改不了
+    return MappingProxyType({role: ThemeColor(value, role) for role, value in colors.items()})
+
+LIGHT_PALETTE = _palette(
+    bg="grey100",        # 大背景
+    card="white",        # 卡片背景
+    text="black",        # 主要文字
+    sub_text="grey",     # 次要文字
+    icon="grey700",      # 图标
+    divider="grey200",   # 分割线
+    input_bg="white",    # 输入框背景
+    orange="orange600",
+    blue="blue600",
+    shadow="black12",    # 浅色 12
+)
+DARK_PALETTE = _palette(
+    bg="grey900",
+    card="grey800",
+    text="white",
+    sub_text="grey400",
+    icon="white",
+    divider="grey700",
+    input_bg="grey900",
+    orange="orange400",  # 深色下调亮一点
+    blue="blue400",
+    shadow="black",      # 深色全黑
+)
+
+def palette_for(mode):
+    return DARK_PALETTE if mode == "dark" else LIGHT_PALETTE
+
+class LivePalette(Mapping):
+    """按页面当前主题取色 (不创建新字典)
+    视图构建时保存下来的 colors 就是它，切换主题后新建的控件也会拿到新颜色"""
+    def __init__(self, page):
+        self.page = page
+
+    def __getitem__(self, role):
+        return palette_for(self.page.theme_mode)[role]
+
+    def __iter__(self):
+        return iter(LIGHT_PALETTE)
+
+    def __len__(self):
+        return len(LIGHT_PALETTE)
+
+def with_opacity(opacity, color):
+    """ft.colors.with_opacity 的主题版：换主题时保留透明度"""
+    if isinstance(color, ThemeColor):
+        return ThemeColor(color.split(",")[0], color.role, opacity)
+    return ft.colors.with_opacity(opacity, color)
+
+def _swap(color, palette):
+    new = palette.get(color.role)
+    if new is None: return color
+    return new if color.opacity is None else ThemeColor(new, color.role, color.opacity)
+
+def _restyle_value(value, palette, seen):
+    """原地换掉 dataclass (边框/阴影/按钮样式...)、dict、list 里的 ThemeColor，返回换好的值"""
+    if isinstance(value, ThemeColor):
+        return _swap(value, palette)
+    if isinstance(value, ft.Control) or id(value) in seen:
+        return value # 子控件由控件树遍历负责
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        seen.add(id(value))
+        for f in dataclasses.fields(value):
+            old = getattr(value, f.name)
+            new = _restyle_value(old, palette, seen)
+            if new is not old: setattr(value, f.name, new)
+    elif isinstance(value, dict):
+        seen.add(id(value))
+        for key, old in value.items():
+            new = _restyle_value(old, palette, seen)
+            if new is not old: value[key] = new
+    elif isinstance(value, list):
+        seen.add(id(value))
+        for i, old in enumerate(value):
+            new = _restyle_value(old, palette, seen)
+            if new is not old: value[i] = new
+    return value
+
+_FLET_INTERNALS = ("_Control__attrs", "_set_attr_internal", "_get_children")
+RESTYLE_FLET_VERSION = "0.22.1" # 核对过内部属性的 Flet 版本 (和 requirements.txt 一致)
+
+def _check_flet_internals():
+    """restyle_controls 能不能用：Flet 必须正是核对过的版本，依赖的内部属性也都在；否则打印警告并返回 False
+    (属性名对得上不代表语义没变，所以版本不同一律走重建视图)
+    不在导入时报错：主题模块启动就会导入，报错等于整个应用打不开 (安卓上是黑屏)"""
+    if ft.version.version != RESTYLE_FLET_VERSION:
+        print(f"theme.restyle_controls 只支持 Flet {RESTYLE_FLET_VERSION}，当前是 {ft.version.version}，"
+              "切换主题时改为重建视图")
+        return False
+    missing = [name for name in _FLET_INTERNALS[1:] if not callable(getattr(ft.Control, name, None))]
+    if not missing:
+        attrs = getattr(ft.Text(), _FLET_INTERNALS[0], None)
+        if not isinstance(attrs, dict):
+            missing.append(f"{_FLET_INTERNALS[0]} (dict)")
+    if missing:
+        print(f"theme.restyle_controls 不支持 Flet {ft.version.version}：缺少 {', '.join(missing)}，"
+              "切换主题时改为重建视图 (请核对 requirements.txt 固定的版本)")
+        return False
+    return True
+
+# False 时调用方不要用 restyle_controls，改为重建视图
+RESTYLE_SUPPORTED = _check_flet_internals()
+
+def restyle_controls(controls, mode):
+    """把这些控件 (连同子控件) 上的调色板颜色全部换成 mode 主题的颜色
+    只改属性，不重建控件；之后 page.update() 只会发送变了颜色的属性
+    注意：用到了 Flet 0.22.1 的内部属性 (_Control__attrs/_set_attr_internal/_get_children)，
+    所以 requirements.txt 固定了 flet 版本；导入时核对版本和这些属性，结果见 RESTYLE_SUPPORTED"""
+    palette = palette_for(mode)
+    seen = set()
+    stack = [c for c in controls if c is not None]
+    count = 0
+    while stack:
+        ctrl = stack.pop()
+        if id(ctrl) in seen: continue
+        seen.add(id(ctrl))
+        count += 1
+        # 1. 直接存在控件属性里的颜色 (Text.color、Container.bgcolor ...)
+        for name, (value, _) in list(ctrl._Control__attrs.items()):
+            if isinstance(value, ThemeColor):
+                ctrl._set_attr_internal(name, _swap(value, palette))
+        # 2. 控件自己保存的对象 (border、shadow、style ...)，更新前才序列化
+        for name, value in list(vars(ctrl).items()):
+            new = _restyle_value(value, palette, seen)
+            if new is not value: setattr(ctrl, name, new)
+        stack.extend(c for c in ctrl._get_children() if c is not None)
+    return count
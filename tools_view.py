@@ -0,0 +1,1001 @@
+import flet as ft
+import re
+import datetime
+import functools
+
+# ==========================================
+# 百度网盘链接清洗引擎
+# 正则在模块加载时编译一次，输入框每次变化只做匹配
+# 一段文字里可以有多个分享链接，每个链接配上它后面 (到下一个链接之前) 出现的提取码
+# 和最早的版本 (整段只取第一个链接、链接一直取到空白为止、不输出提取码) 相比：
+#   1. 链接取到空白或第一个非 ASCII 字符为止，粘在一起的“提取码:xxxx”不会算进链接里
+#      (网盘分享链接都是 ASCII，中文会被百分号编码)
+#   2. 链接后面写了提取码、链接本身又没带 ?pwd= 时，多输出一行“提取码:xxxx”
+# ==========================================
+BAIDU_LINK_RE = re.compile(r"https?://pan\.baidu\.com/[\x21-\x7e]*") # 链接只会是 ASCII，遇到中文/空白就结束
+URL_PWD_RE = re.compile(r"[?&]pwd=([A-Za-z0-9]{4})")
+SHARE_CODE_RE = re.compile(r"(?:提取码|提取碼|密码|code)\s*[:：]?\s*([A-Za-z0-9]{4})(?![A-Za-z0-9])", re.IGNORECASE)
+LINK_PUNCTUATION = ".,;:!?'\"" # 粘在链接末尾的句末标点/引号不算链接
+LINK_BRACKETS = {")": "(", "]": "[", "}": "{", ">": "<"} # 末尾的右括号只有没配对时才去掉
+BATCH_SEPARATOR = "\n\n--------------------\n\n"
+
+def strip_link_trailing(url):
+    """去掉链接末尾的句末标点，以及没有配对的右括号 (比如整个链接被括号括起来)"""
+    while url:
+        last = url[-1]
+        if last in LINK_PUNCTUATION or (last in LINK_BRACKETS and url.count(last) > url.count(LINK_BRACKETS[last])):
+            url = url[:-1]
+        else:
+            break
+    return url
+
+def extract_share_links(text):
+    """从一段文字里提取所有分享链接，返回 [(链接, 提取码或 None)]，重复的链接只保留第一次"""
+    matches = list(BAIDU_LINK_RE.finditer(text or ""))
+    links, seen = [], set()
+    for i, m in enumerate(matches):
+        url = strip_link_trailing(m.group(0))
+        if url in seen: continue
+        seen.add(url)
+        pwd = URL_PWD_RE.search(url)
+        if pwd:
+            code = pwd.group(1)
+        else:
+            # 只在本链接和下一个链接之间找提取码，避免串到别的分享上
+            end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+            found = SHARE_CODE_RE.search(text, m.end(), end)
+            code = found.group(1) if found else None
+        links.append((url, code))
+    return links
+
+def format_share_message(links, prefix, suffix):
+    """把一组链接排成一条消息：prefix + 每个链接一行 (有提取码时下面再跟一行提取码) + 空两行 + suffix"""
+    lines = []
+    for n, (url, code) in enumerate(links, 1):
+        label = "链接" if len(links) == 1 else f"链接{n}"
+        lines.append(f"{label}:{url}")
+        # 链接里已经带了 ?pwd= 的，打开就会自动填写，不用再单独写提取码
+        if code and not URL_PWD_RE.search(url):
+            lines.append(f"提取码:{code}")
+    return f"{prefix}\n" + "\n".join(lines) + f"\n\n\n{suffix}"
+
+def format_share_batch(links, prefix, suffix):
+    """批量模式：每个链接单独生成一条消息，用分隔线隔开"""
+    return BATCH_SEPARATOR.join(format_share_message([link], prefix, suffix) for link in links)
+
+# ==========================================
+# 搬家报价引擎
+# 模板和地址缩写表都只编译一次；取消期限按日期字符串缓存，同一天不重复 strptime
+# 批量模式：一份 CSV (每行一单) 一次生成全部消息，给一天要派很多单的调度用
+# ==========================================
+MOVE_QUOTE_TEMPLATE = (
+    "🗓️ {date}   🕗 {time}   {helper}\n\n"
+    "{start}\n"
+    "➡ \n"
+    "{end}\n\n\n"
+    "{price}€  {trips}x\n\n"
+    "_________________________________ \n"
+    "车型已确定，{cancellation}{furniture}如遇时间轻微变动以司机信息为准，敬请谅解。现场支持现金/PayPal付款。"
+)
+render_move_quote = MOVE_QUOTE_TEMPLATE.format # 绑定好的格式化方法，调用时不再查找
+CANCEL_TEMP_TEXT = "临时预定不接受取消/更改，"
+CANCEL_DEADLINE_TEXT = "如有时间更改需要请于{day}号结束前通知，过后取消/更改需收取20%原标价。"
+FURNITURE_TEXT = "如有大件请保证提前拆卸和通道畅通。"
+DEFAULT_PRICE = "90"
+
+# 地址末尾的城市名 -> 缩写 (不区分大小写)，可以在搬家助手里修改
+DEFAULT_ABBREVIATIONS = {"Aachen": "AC"}
+
+class AddressAbbreviator:
+    """把缩写表编译成一个正则：地址末尾是表里的城市名就换成缩写"""
+    def __init__(self, table):
+        self.source = {k.strip(): v.strip() for k, v in table.items() if k.strip()}
+        self.table = {k.lower(): v for k, v in self.source.items()}
+        if self.table:
+            names = sorted(self.table, key=len, reverse=True) # 长的优先，避免被前缀抢先匹配
+            self._pattern = re.compile(r"(%s)\s*$" % "|".join(re.escape(n) for n in names), re.IGNORECASE)
+        else:
+            self._pattern = None
+
+    def __call__(self, address):
+        if not address or self._pattern is None: return address or ""
+        return self._pattern.sub(lambda m: self.table[m.group(1).lower()], address, count=1)
+
+    @classmethod
+    def parse(cls, text):
+        """从“城市=缩写”每行一条的文字构建"""
+        table = {}
+        for line in (text or "").splitlines():
+            name, sep, abbr = line.partition("=")
+            if sep and name.strip() and abbr.strip(): table[name] = abbr
+        return cls(table)
+
+    def to_text(self):
+        return "\n".join(f"{name}={abbr}" for name, abbr in self.source.items())
+
+DEFAULT_ABBREVIATOR = AddressAbbreviator(DEFAULT_ABBREVIATIONS)
+
+@functools.lru_cache(maxsize=128)
+def cancellation_text(date_str, is_temp):
+    """取消说明：临时预定固定文字，否则截止日是搬家日期的前两天"""
+    if is_temp: return CANCEL_TEMP_TEXT
+    try:
+        dt = datetime.datetime.strptime(date_str, "%d.%m.%Y")
+        day = (dt - datetime.timedelta(days=2)).day
+    except ValueError:
+        day = "(dd-2)"
+    return CANCEL_DEADLINE_TEXT.format(day=day)
+
+def build_move_quote(date, time, helper, start, end, price, trips, is_temp=False, furniture=False, abbreviate=None):
+    """生成一条搬家信息 (空字段用占位符/默认值补上)"""
+    abbreviate = abbreviate or DEFAULT_ABBREVIATOR
+    date = date or "dd.mm.yyyy"
+    return render_move_quote(
+        date=date, time=time or "xx:xx", helper=helper,
+        start=abbreviate(start), end=abbreviate(end),
+        price=price or DEFAULT_PRICE, trips=trips or "1",
+        cancellation=cancellation_text(date, bool(is_temp)),
+        furniture=FURNITURE_TEXT if furniture else ""
+    )
+
+# CSV 列：日期, 时间, 起点, 终点, 价格, 趟数, 帮手, [临时预定], [大件]
+# 第一行可以是表头 (中英文都认)，没有表头就按上面的顺序
+MOVE_CSV_COLUMNS = ("date", "time", "start", "end", "price", "trips", "helper", "temp", "furniture")
+MOVE_CSV_HEADERS = {
+    "date": "date", "datum": "date", "日期": "date",
+    "time": "time", "zeit": "time", "时间": "time",
+    "start": "start", "from": "start", "起点": "start",
+    "end": "end", "to": "end", "ziel": "end", "终点": "end",
+    "price": "price", "preis": "price", "价格": "price",
+    "trips": "trips", "趟数": "trips",
+    "helper": "helper", "帮手": "helper",
+    "temp": "temp", "临时": "temp", "临时预定": "temp",
+    "furniture": "furniture", "大件": "furniture",
+}
+CSV_TRUE = {"1", "y", "yes", "ja", "true", "x", "是", "有", "m.t."}
+
+def parse_flag(value):
+    return (value or "").strip().lower() in CSV_TRUE
+
+def quote_for_booking(booking, abbreviate=None):
+    """按预约记录 (BookingStore 的格式) 生成消息"""
+    return build_move_quote(
+        booking.get("date_str"), booking.get("time_str"), booking.get("helper") or "m.T.",
+        booking.get("start"), booking.get("end"), booking.get("price"), booking.get("trips"),
+        is_temp=booking.get("temp"), furniture=booking.get("furniture"), abbreviate=abbreviate
+    )
+
+CSV_DELIMITERS = ",;\t" # 逗号、德语 Excel 默认的分号、制表符
+
+def csv_delimiter(text):
+    """按第一行非空行 (一般是表头) 里哪种分隔符最多来定，引号里的不算
+    不用 csv.Sniffer：可选列 (临时/家具) 让各行字段数不一样时它会直接报错"""
+    line = next((l for l in text.splitlines() if l.strip()), "")
+    line = re.sub(r'"[^"]*"', "", line)
+    return max(CSV_DELIMITERS, key=line.count) # 一样多时取前面的 (逗号)
+
+def is_move_csv_header(row):
+    """第一行是不是表头：有起点/终点列名，或者一半以上的格子是认识的列名
+    (多出一两列备注之类的也算表头，不会被当成一单)"""
+    cells = [c.strip().lower() for c in row if c.strip()]
+    known = [MOVE_CSV_HEADERS[c] for c in cells if c in MOVE_CSV_HEADERS]
+    return bool(known) and ("start" in known or "end" in known or len(known) * 2 > len(cells))
+
+def parse_move_csv(text):
+    """批量模式：解析 CSV，返回 (预约记录列表, 跳过的行数)"""
+    import csv, io # 只有批量模式用得到
+    text = (text or "").lstrip("\ufeff") # 去掉 Excel 导出的 BOM
+    rows = csv.reader(io.StringIO(text), delimiter=csv_delimiter(text))
+    rows = [r for r in rows if any(c.strip() for c in r)]
+    columns = MOVE_CSV_COLUMNS
+    if rows and is_move_csv_header(rows[0]):
+        # 认不出的列 (备注/Notes ...) 对应 None，解析时直接忽略
+        columns = [MOVE_CSV_HEADERS.get(c.strip().lower()) for c in rows[0]]
+        rows = rows[1:]
+    bookings, skipped = [], 0
+    for row in rows:
+        fields = {col: cell.strip() for col, cell in zip(columns, row) if col}
+        if not (fields.get("start") or fields.get("end")):
+            skipped += 1
+            continue
+        helper = fields.get("helper", "")
+        bookings.append({
+            "date_str": fields.get("date", ""), "time_str": fields.get("time", ""),
+            "helper": "m.T." if (not helper or parse_flag(helper)) else "o.T.",
+            "start": fields.get("start", ""), "end": fields.get("end", ""),
+            "price": fields.get("price", ""), "trips": fields.get("trips", ""),
+            "temp": parse_flag(fields.get("temp")), "furniture": parse_flag(fields.get("furniture")),
+        })
+    return bookings, skipped
+
+def build_move_quotes_csv(text, abbreviate=None):
+    """批量模式：解析 CSV 并生成全部消息，返回 (消息列表, 跳过的行数)"""
+    bookings, skipped = parse_move_csv(text)
+    return [quote_for_booking(b, abbreviate) for b in bookings], skipped
+
+# ==========================================
+# 脏控件记录：只把改过的控件推给前端
+# page.update() 每次都要把整棵控件树 (连同隐藏着的日志页、设置页) 对比一遍，
+# 输入框每敲一个字就来一次；这里只记下真正改了值的控件，flush() 时一次性只更新它们
+# ==========================================
+class DirtyControls:
+    def __init__(self, page):
+        self.page = page
+        self._controls = []
+
+    def set(self, ctrl, attr, value):
+        """改属性，值真的变了才记为脏"""
+        if getattr(ctrl, attr) != value:
+            setattr(ctrl, attr, value)
+            self.mark(ctrl)
+
+    def mark(self, *ctrls):
+        for ctrl in ctrls:
+            if ctrl not in self._controls: self._controls.append(ctrl)
+
+    def flush(self):
+        controls, self._controls = self._controls, []
+        # 还没挂到页面上的控件 (比如当前显示的是菜单) 跳过，打开对应工具页时会整体发送
+        controls = [c for c in controls if c.page]
+        if controls: self.page.update(*controls)
+
+# ---------------------------------------------------
+# 页面 2: 工具箱 (修复版：严格顺序 + 补全缺失函数 + 动态主题)
+# ---------------------------------------------------
+def build_tools_view(ctx):
+    # 共享状态都从 ctx (AppContext) 取
+    page = ctx.page
+    app_storage = ctx.storage
+    booking_store = ctx.booking_store
+    get_app_colors = ctx.get_app_colors
+
+    colors = get_app_colors() # 获取动态颜色
+
+    # --- 1. 初始化主容器 ---
+    tools_layout = ft.Column(expand=True, spacing=0)
+
+    # 定义一个状态列表，记录当前在哪里
+    # "menu" = 菜单页, "tool" = 工具页
+    current_view_status = ["menu"]
+
+    # 【优化】：输入事件只更新改动过的控件，不再整页 page.update()
+    dirty = DirtyControls(page)
+
+    # --- 2. 侧边手势返回逻辑 ---
+    def on_keyboard(e: ft.KeyboardEvent):
+        if e.key == "Back":
+            # 如果当前是在工具页，则拦截返回键，执行回到菜单
+            if current_view_status[0] == "tool":
+                show_menu()
+            else:
+                # 如果在菜单页，什么都不做，让系统执行默认的退出操作
+                pass
+    
+    # 【关键】：必须把这个函数绑定给 page
+    page.on_keyboard_event = on_keyboard
+
+    # --- 3. 状态与 Overlay 初始化 (必须最先执行) ---
+    # 【修改】：不再 page.overlay.clear()，视图缓存会负责清理各自挂载的控件
+    
+    # 搬家助手：日历/时间回调
+    def on_date_change(e):
+        if date_picker.value:
+            dirty.set(date_input, "value", date_picker.value.strftime("%d.%m.%Y"))
+            update_move_preview(None)
+    
+    def on_time_change(e):
+        if time_picker.value:
+            dirty.set(time_input, "value", time_picker.value.strftime("%H:%M"))
+            update_move_preview(None)
+
+    date_picker = ft.DatePicker(on_change=on_date_change)
+    time_picker = ft.TimePicker(on_change=on_time_change)
+    page.overlay.extend([date_picker, time_picker])
+
+    # 搬家助手：帮手状态
+    helper_value = ["m.T."]
+
+    # --- 3. 定义所有 UI 控件 (必须在逻辑函数之前) ---
+    
+    # === A. 百度网盘清洗控件 ===
+    DEFAULT_PREFIX = "复制并打开"
+    DEFAULT_SUFFIX = (
+        "责任说明：因官方持续随机出新题，题库无法做到100%覆盖。"
+        "个人考试行为和能力无法控制，题库是帮助您降低学习压力，提高通过可能性的工具，而不是通过的绝对保证。"
+        "“最新”定义为买家个人整理资料的编辑时间为最新。"
+    )
+    prefix_field = ft.TextField(label="前缀文字", value=DEFAULT_PREFIX, height=40, text_size=14, content_padding=10, border_color="grey300", bgcolor=colors["input_bg"])
+    suffix_field = ft.TextField(label="免责声明后缀", value=DEFAULT_SUFFIX, multiline=True, min_lines=3, text_size=12, content_padding=10, border_color="grey300", bgcolor=colors["input_bg"])
+    
+    # 【重要】cleaner_input 必须在这里定义
+    cleaner_input = ft.TextField(multiline=True, min_lines=3, max_lines=5, hint_text="直接粘贴整段百度网盘分享口令...", bgcolor=colors["input_bg"], border_color="transparent", text_size=14, content_padding=10)
+    cleaner_output = ft.TextField(multiline=True, read_only=True, value="", min_lines=6, text_style=ft.TextStyle(color=colors["text"], size=14), bgcolor=colors["input_bg"], border_color="transparent", content_padding=10)
+    cleaner_feedback = ft.Text(value="", color="green600", size=14, weight="bold", text_align="center")
+    # 【新增】：批量模式开关 —— 每个链接单独生成一条消息
+    cleaner_batch_switch = ft.Switch(value=False, active_color=colors["blue"])
+    
+    # === B. 搬家助手控件 (V7.3 修复版) ===
+    
+    # 1. 日期控件组 (输入框 + 按钮)
+    date_input = ft.TextField(
+        label="日期", hint_text="dd.mm.yyyy",
+        expand=True, height=40, content_padding=10, text_size=14, 
+        border_color="grey300", 
+        text_align="center",
+        border_radius=8, # 【新增】：圆角
+        bgcolor=colors["input_bg"]
+    )
+    # 独立的日期选择按钮 (绝对能点)
+    date_button = ft.IconButton(
+        icon="calendar_month", 
+        icon_color=colors["orange"], 
+        on_click=lambda _: date_picker.pick_date()
+    )
+
+    # 2. 时间控件组 (输入框 + 按钮)
+    time_input = ft.TextField(
+        label="时间", hint_text="HH:MM", 
+        expand=True, height=40, content_padding=10, text_size=14, 
+        border_color="grey300", 
+        text_align="center",
+        border_radius=8, # 【新增】：圆角
+        bgcolor=colors["input_bg"]
+    )
+    time_button = ft.IconButton(
+        icon="access_time", 
+        icon_color=colors["orange"], 
+        on_click=lambda _: time_picker.pick_time()
+    )
+
+    # 3. 地址输入 (保持不变)
+    start_addr_input = ft.TextField(
+        hint_text="起点地址...", expand=True, height=50, text_size=14, 
+        content_padding=10, border_color="grey300",
+        border_radius=8, # 【新增】
+        bgcolor=colors["input_bg"]
+    )
+
+    end_addr_input = ft.TextField(
+        hint_text="终点地址...", expand=True, height=50, text_size=14, 
+        content_padding=10, border_color="grey300",
+        border_radius=8, # 【新增】
+        bgcolor=colors["input_bg"]
+    )
+
+    # 4. 价格与趟数 (大字号版)
+    price_input = ft.TextField(
+        label="价格", suffix_text="€", 
+        value="90", #显示预设值
+        expand=1, 
+        height=50, # 【修改点】：高度增加
+        content_padding=10, 
+        text_size=20, # 【修改点】：字号加大
+        border_color="grey300", keyboard_type="number", 
+        text_align="center",
+        border_radius=8,
+        bgcolor=colors["input_bg"]
+    )
+    trips_input = ft.TextField(
+        label="趟数", suffix_text="x", 
+        expand=1, 
+        height=50, # 【修改点】：高度增加
+        content_padding=10, 
+        text_size=20, # 【修改点】：字号加大
+        border_color="grey300", keyboard_type="number", value="1",
+        text_align="center",
+        border_radius=8,
+        bgcolor=colors["input_bg"]
+    )
+
+    # 5. 选项 (保持不变)
+    is_temp_booking = ft.Checkbox(label="临时预定 (不接受取消/更改)", value=False)
+    has_big_furniture = ft.Checkbox(label="大件家具 (显示提示)", value=False)
+
+    # 预览/反馈
+    move_preview_text = ft.Text(value="", font_family="monospace", size=13, color=colors["text"], selectable=True)
+    move_feedback_text = ft.Text(value="", color="green600", size=14, weight="bold", text_align="center")
+
+    # 6. 【新增】：地址提示 (从以前的预约里按前缀查)，点一下直接填入
+    start_suggestions = ft.Row(wrap=True, spacing=5, run_spacing=5, visible=False)
+    end_suggestions = ft.Row(wrap=True, spacing=5, run_spacing=5, visible=False)
+
+    # 7. 【新增】：预约记录 (日/周视图)
+    history_date = [datetime.date.today()]
+    history_mode = ["day"] # "day" 或 "week"
+    history_label = ft.Text("", size=14, weight="bold", color=colors["text"])
+    history_mode_button = ft.TextButton("看整周")
+    history_list = ft.Column(spacing=5)
+
+    # 8. 【新增】：地址缩写表 (每行 城市=缩写)，改完立即重新编译并保存
+    stored_abbr = app_storage.get("move_abbreviations")
+    abbreviator = [AddressAbbreviator.parse(stored_abbr) if stored_abbr is not None else DEFAULT_ABBREVIATOR]
+    abbr_field = ft.TextField(label="地址缩写 (每行 城市=缩写)", value=abbreviator[0].to_text(), multiline=True, min_lines=2, text_size=13, content_padding=10, border_color="grey300", bgcolor=colors["input_bg"])
+
+    # --- 4. 定义逻辑函数 (必须在控件之后，视图之前) ---
+
+    # === A. 清洗逻辑 ===
+    # 上一次解析的 [原文, 链接列表]：只改前缀/后缀时不用重新扫描原文
+    parsed_links = [None, []]
+
+    def clean_link(e):
+        raw_text = cleaner_input.value
+        if not raw_text:
+            dirty.set(cleaner_output, "value", "")
+            dirty.flush()
+            return
+        if raw_text != parsed_links[0]:
+            parsed_links[0] = raw_text
+            parsed_links[1] = extract_share_links(raw_text)
+        links = parsed_links[1]
+        if not links:
+            output = "❌ 未检测到有效的百度网盘链接..."
+        elif cleaner_batch_switch.value:
+            output = format_share_batch(links, prefix_field.value, suffix_field.value)
+        else:
+            output = format_share_message(links, prefix_field.value, suffix_field.value)
+        dirty.set(cleaner_output, "value", output)
+        dirty.set(cleaner_feedback, "value", f"识别到 {len(links)} 个链接" if len(links) > 1 else "")
+        dirty.flush()
+
+    def on_share_file_picked(e: ft.FilePickerResultEvent):
+        """批量模式：从文本文件读入一整批分享文案"""
+        if not e.files: return
+        try:
+            # utf-8-sig：兼容带 BOM 的文本文件
+            with open(e.files[0].path, 'r', encoding='utf-8-sig', errors='replace') as f:
+                dirty.set(cleaner_input, "value", f.read())
+            dirty.set(cleaner_batch_switch, "value", True)
+            clean_link(None)
+        except Exception as ex:
+            dirty.set(cleaner_feedback, "value", f"❌ 读取失败: {ex}")
+            dirty.flush()
+
+    share_file_picker = ft.FilePicker(on_result=on_share_file_picked)
+    page.overlay.append(share_file_picker)
+
+    def paste_and_clean(e):
+        try:
+            clip_text = page.get_clipboard()
+            if clip_text:
+                dirty.set(cleaner_input, "value", clip_text)
+                clean_link(None)
+        except: pass
+
+    def restore_defaults(e):
+        dirty.set(prefix_field, "value", DEFAULT_PREFIX)
+        dirty.set(suffix_field, "value", DEFAULT_SUFFIX)
+        clean_link(None)
+
+    # 【修复点】：你之前漏掉了这个函数，导致 NameError
+    def copy_cleaner_result(e):
+        if cleaner_output.value and "❌" not in cleaner_output.value:
+            page.set_clipboard(cleaner_output.value)
+            dirty.set(cleaner_feedback, "value", "✅ 已成功复制到剪贴板")
+        else:
+            dirty.set(cleaner_feedback, "value", "⚠️ 没有内容可复制")
+        dirty.flush()
+    
+    # 绑定清洗事件
+    cleaner_input.on_change = clean_link
+    prefix_field.on_change = clean_link
+    suffix_field.on_change = clean_link
+    cleaner_batch_switch.on_change = clean_link
+
+    # === B. 搬家逻辑 ===
+    # 最近一次批量生成的预约 (预览里是批量结果时，复制就把这一批存起来)
+    move_batch = [None]
+    # 这次编辑已经存过的预约 id：再复制时更新这几单，而不是每复制一次多存一份
+    # (模式, [id, ...])，模式是 "single" 或 "batch"；回到菜单、换一批 CSV、载入旧预约时重新开始
+    move_session = [("single", [])]
+
+    def current_booking():
+        return {
+            "date_str": date_input.value or "", "time_str": time_input.value or "",
+            "helper": helper_value[0],
+            "start": (start_addr_input.value or "").strip(), "end": (end_addr_input.value or "").strip(),
+            "price": price_input.value or "", "trips": trips_input.value or "",
+            "temp": bool(is_temp_booking.value), "furniture": bool(has_big_furniture.value),
+        }
+
+    def update_move_preview(e):
+        move_batch[0] = None
+        # 【优化】：模板、缩写表、取消期限都走报价引擎 (预编译 + 缓存)
+        # 价格输入框是空的 (用户没填) 就取默认的 90
+        dirty.set(move_preview_text, "value", build_move_quote(
+            date_input.value, time_input.value, helper_value[0],
+            start_addr_input.value, end_addr_input.value,
+            price_input.value, trips_input.value,
+            is_temp=is_temp_booking.value, furniture=has_big_furniture.value,
+            abbreviate=abbreviator[0]
+        ))
+        dirty.flush()
+
+    def on_abbr_change(e):
+        abbreviator[0] = AddressAbbreviator.parse(abbr_field.value)
+        app_storage.set("move_abbreviations", abbr_field.value or "")
+        update_move_preview(None)
+
+    def restore_default_abbr(e):
+        abbreviator[0] = DEFAULT_ABBREVIATOR
+        app_storage.remove("move_abbreviations")
+        dirty.set(abbr_field, "value", DEFAULT_ABBREVIATOR.to_text())
+        update_move_preview(None)
+
+    abbr_field.on_change = on_abbr_change
+
+    # 批量模式：CSV 里每行一单，一次生成全部消息
+    def run_move_batch(text):
+        bookings, skipped = parse_move_csv(text)
+        if bookings:
+            dirty.set(move_preview_text, "value", BATCH_SEPARATOR.join(quote_for_booking(b, abbreviator[0]) for b in bookings))
+            move_batch[0] = bookings
+            move_session[0] = ("batch", [])
+            msg = f"✅ 已生成 {len(bookings)} 条"
+            if skipped: msg += f"，跳过 {skipped} 行"
+        else:
+            msg = "⚠️ CSV 里没有可用的行"
+        dirty.set(move_feedback_text, "value", msg)
+        dirty.flush()
+
+    def on_move_csv_picked(e: ft.FilePickerResultEvent):
+        if not e.files: return
+        try:
+            # newline=""：交给 csv 自己处理引号里的换行
+            with open(e.files[0].path, 'r', encoding='utf-8-sig', errors='replace', newline="") as f:
+                run_move_batch(f.read())
+        except Exception as ex:
+            dirty.set(move_feedback_text, "value", f"❌ 读取失败: {ex}")
+            dirty.flush()
+
+    def paste_move_csv(e):
+        try:
+            clip_text = page.get_clipboard()
+            if clip_text: run_move_batch(clip_text)
+        except: pass
+
+    move_csv_picker = ft.FilePicker(on_result=on_move_csv_picked)
+    page.overlay.append(move_csv_picker)
+
+    def copy_move_result(e):
+        if move_preview_text.value:
+            page.set_clipboard(move_preview_text.value)
+            # 【新增】：复制 = 这单确定了，存进预约记录 (回到菜单清空表单也不会丢)
+            mode = "batch" if move_batch[0] else "single"
+            kind, ids = move_session[0]
+            if kind != mode: ids = []
+            bookings = [b for b in (move_batch[0] or [current_booking()]) if b["start"] or b["end"]]
+            # 改了地址/时间再复制：带上这次已经存过的 id，更新原来那单
+            bookings = [dict(b, id=ids[i]) if i < len(ids) else b for i, b in enumerate(bookings)]
+            results = booking_store.save_many(bookings) if bookings else []
+            for stale_id in ids[len(bookings):]: # 这次少了的单
+                booking_store.delete(stale_id)
+            move_session[0] = (mode, [r["id"] if r else b.get("id") for r, b in zip(results, bookings)])
+            saved = [r for r in results if r]
+            undated = len(results) - len(saved) # 没填日期的存不进记录
+            note = f"，{undated} 单没有日期未存" if undated else ""
+            if saved:
+                render_history()
+                dirty.set(move_feedback_text, "value", f"✅ 已复制搬家信息，已存入预约记录 ({len(saved)} 单{note})")
+            else:
+                dirty.set(move_feedback_text, "value", f"✅ 已复制搬家信息{note}")
+        else:
+            dirty.set(move_feedback_text, "value", "⚠️ 信息为空")
+        dirty.flush()
+
+    # === C. 地址提示 ===
+    def refresh_suggestions(field, row):
+        text = (field.value or "").strip()
+        # 至少两个字再提示；已经完整填上的地址不再重复提示
+        matches = [a for a in booking_store.suggest_addresses(text) if a != text] if len(text) >= 2 else []
+        if tuple(matches) == row.data: return
+        row.data = tuple(matches)
+        row.controls = [
+            ft.Container(
+                content=ft.Text(address, size=12, color=colors["text"]),
+                bgcolor=colors["input_bg"], border=ft.border.all(1, colors["divider"]), border_radius=15,
+                padding=ft.padding.symmetric(horizontal=10, vertical=5),
+                on_click=lambda _, a=address: pick_suggestion(field, row, a)
+            ) for address in matches
+        ]
+        row.visible = bool(matches)
+        dirty.mark(row)
+
+    def clear_suggestions(*rows):
+        for row in rows:
+            row.controls, row.data, row.visible = [], (), False
+
+    def pick_suggestion(field, row, address):
+        dirty.set(field, "value", address)
+        refresh_suggestions(field, row)
+        update_move_preview(None)
+
+    def on_start_addr_change(e):
+        refresh_suggestions(start_addr_input, start_suggestions)
+        update_move_preview(None)
+
+    def on_end_addr_change(e):
+        refresh_suggestions(end_addr_input, end_suggestions)
+        update_move_preview(None)
+
+    # === D. 预约记录 (日/周视图) ===
+    WEEKDAYS = ["周一", "周二", "周三", "周四", "周五", "周六", "周日"]
+
+    def history_days():
+        d = history_date[0]
+        if history_mode[0] == "day": return [d]
+        monday = d - datetime.timedelta(days=d.weekday())
+        return [monday + datetime.timedelta(days=i) for i in range(7)]
+
+    def make_booking_row(booking):
+        return ft.Container(
+            content=ft.Row([
+                ft.Text(booking.get("time_str") or "--:--", size=13, weight="bold", color=colors["orange"], width=45),
+                ft.Text(f"{booking.get('start') or '?'} ➡ {booking.get('end') or '?'}", size=13, color=colors["text"], expand=True),
+                ft.Text(f"{booking.get('price') or DEFAULT_PRICE}€", size=13, color=colors["sub_text"]),
+                ft.IconButton(icon="delete_outline", icon_size=18, icon_color=colors["sub_text"], on_click=lambda _, i=booking["id"]: delete_booking(i))
+            ], spacing=5),
+            padding=ft.padding.only(left=5), border_radius=8,
+            on_click=lambda _, b=booking: load_booking(b), ink=True
+        )
+
+    def render_history():
+        days = history_days()
+        if len(days) == 1:
+            history_label.value = f"{WEEKDAYS[days[0].weekday()]} {days[0].strftime('%d.%m.%Y')}"
+        else:
+            history_label.value = f"{days[0].strftime('%d.%m')} - {days[-1].strftime('%d.%m.%Y')}"
+        history_mode_button.text = "看当天" if history_mode[0] == "week" else "看整周"
+        rows = []
+        for d, bookings in booking_store.days(days):
+            if not bookings: continue
+            if len(days) > 1:
+                rows.append(ft.Text(f"{WEEKDAYS[d.weekday()]} {d.strftime('%d.%m')}", size=12, weight="bold", color=colors["sub_text"]))
+            rows.extend(make_booking_row(b) for b in bookings)
+        history_list.controls = rows or [ft.Text("这段时间没有预约", size=13, color=colors["sub_text"])]
+        dirty.mark(history_label, history_mode_button, history_list)
+
+    def shift_history(days):
+        step = 7 if history_mode[0] == "week" else 1
+        history_date[0] += datetime.timedelta(days=days * step)
+        render_history()
+        dirty.flush()
+
+    def toggle_history_mode(e):
+        history_mode[0] = "day" if history_mode[0] == "week" else "week"
+        render_history()
+        dirty.flush()
+
+    def delete_booking(booking_id):
+        booking_store.delete(booking_id)
+        render_history()
+        dirty.flush()
+
+    def load_booking(booking):
+        """点一条以前的预约：填回表单，老客户不用重新输入 (复制时存成新的一单，旧的不动)"""
+        move_session[0] = ("single", [])
+        dirty.set(date_input, "value", booking.get("date_str", ""))
+        dirty.set(time_input, "value", booking.get("time_str", ""))
+        dirty.set(start_addr_input, "value", booking.get("start", ""))
+        dirty.set(end_addr_input, "value", booking.get("end", ""))
+        dirty.set(price_input, "value", booking.get("price", ""))
+        dirty.set(trips_input, "value", booking.get("trips") or "1")
+        dirty.set(is_temp_booking, "value", bool(booking.get("temp")))
+        dirty.set(has_big_furniture, "value", bool(booking.get("furniture")))
+        set_helper(booking.get("helper") or "m.T.")
+        clear_suggestions(start_suggestions, end_suggestions)
+        dirty.mark(start_suggestions, end_suggestions)
+        update_move_preview(None)
+
+    history_mode_button.on_click = toggle_history_mode
+    
+    # 帮手切换逻辑 (需要在此处定义toggle_helper，因为它用到 update_move_preview)
+    def toggle_helper(e):
+        set_helper(e.control.data)
+        update_move_preview(None)
+
+    def set_helper(val):
+        helper_value[0] = val
+        btn_mt.bgcolor = colors["orange"] if val == "m.T." else "grey200"
+        btn_mt_content.color = "white" if val == "m.T." else "black"
+        btn_ot.bgcolor = colors["orange"] if val == "o.T." else "grey200"
+        btn_ot_content.color = "white" if val == "o.T." else "black"
+        dirty.mark(btn_mt, btn_ot) # 更新容器时会连同里面的文字一起更新
+
+    # 定义帮手按钮 (逻辑之后)
+    btn_mt_content = ft.Text("m.T. (有帮手)", color="white", weight="bold", size=16)
+    btn_ot_content = ft.Text("o.T. (无帮手)", color="black", weight="bold", size=16)
+    btn_mt = ft.Container(content=btn_mt_content, data="m.T.", expand=True, height=40, bgcolor=colors["orange"], border_radius=ft.border_radius.only(top_left=8, bottom_left=8), alignment=ft.alignment.center, on_click=toggle_helper)
+    btn_ot = ft.Container(content=btn_ot_content, data="o.T.", expand=True, height=40, bgcolor="grey200", border_radius=ft.border_radius.only(top_right=8, bottom_right=8), alignment=ft.alignment.center, on_click=toggle_helper)
+    helper_switch_row = ft.Row([btn_mt, btn_ot], spacing=1)
+
+    # 绑定搬家事件
+    for ctrl in [price_input, trips_input, is_temp_booking, has_big_furniture, date_input, time_input]:
+        ctrl.on_change = update_move_preview
+    start_addr_input.on_change = on_start_addr_change
+    end_addr_input.on_change = on_end_addr_change
+
+    # --- 5. 视图组装 (卡片工厂 & 路由函数) ---
+    def make_card(content_ctrl, border_color="transparent", padding_val=15):
+        border_arg = None
+        if border_color != "transparent":
+            border_arg = ft.border.all(2, border_color)
+        return ft.Container(
+            content=content_ctrl, bgcolor=colors["card"], padding=padding_val, border_radius=12, border=border_arg,
+            shadow=ft.BoxShadow(spread_radius=1, blur_radius=5, color=colors["shadow"])
+        )
+    
+    # --- 增加数据重置逻辑 ---
+    # 【修改点2】：定义重置函数
+    def reset_all_data():
+        # 重置清洗工具
+        cleaner_input.value = ""
+        cleaner_output.value = ""
+        cleaner_feedback.value = ""
+        cleaner_batch_switch.value = False
+        # 重置搬家助手
+        date_input.value = ""
+        time_input.value = ""
+        start_addr_input.value = ""
+        end_addr_input.value = ""
+        price_input.value = ""
+        trips_input.value = "1"
+        is_temp_booking.value = False
+        has_big_furniture.value = False
+        move_feedback_text.value = "" # 清空搬家助手的反馈
+        move_session[0] = ("single", []) # 下一次复制就是新的一单
+        clear_suggestions(start_suggestions, end_suggestions)
+        helper_value[0] = "m.T." # 重置帮手状态
+        # 重置按钮样式
+        btn_mt.bgcolor = colors["orange"]
+        btn_mt_content.color = "white"
+        btn_ot.bgcolor = "grey200"
+        btn_ot_content.color = "black"
+        
+    # 1. 菜单页
+    def show_menu(e=None):
+        current_view_status[0] = "menu" # 标记为菜单页
+        reset_all_data() # 【修改点2】：每次回到菜单时，清空数据
+        tools_layout.controls = [
+            ft.Container(height=50), # 避开刘海
+            # 菜单卡片1
+            ft.Container(
+                padding=20, margin=ft.margin.symmetric(horizontal=20),
+                bgcolor=colors["card"], border_radius=15, height=150,
+                shadow=ft.BoxShadow(blur_radius=10, color=colors["shadow"]),
+                content=ft.Row([
+                    ft.Container(width=3), # 缩进
+                    ft.Icon("cleaning_services", size=50, color=colors["blue"]),
+                    ft.Container(width=1), # 缩进
+                    ft.Column([
+                        ft.Text("百度网盘链接清洗", size=22, weight="bold", color=colors["text"]),
+                        ft.Text("自动格式化分享链接", size=16, color=colors["sub_text"])
+                    ], spacing=2, alignment="center")
+                ], alignment="start"),
+                on_click=show_cleaner
+            ),
+            ft.Container(height=20),
+            # 菜单卡片2
+            ft.Container(
+                padding=20, margin=ft.margin.symmetric(horizontal=20),
+                bgcolor=colors["card"], border_radius=15, height=150,
+                shadow=ft.BoxShadow(blur_radius=10, color=colors["shadow"]),
+                content=ft.Row([
+                    ft.Container(width=3), # 缩进
+                    ft.Icon("local_shipping", size=50, color=colors["orange"]),
+                    ft.Container(width=1), # 缩进
+                    ft.Column([
+                        ft.Text("搬家助手", size=22, weight="bold", color=colors["text"]),
+                        ft.Text("生成搬家信息小结", size=16, color=colors["sub_text"])
+                    ], spacing=2, alignment="center")
+                ], alignment="start"),
+                on_click=show_mover
+            )
+        ]
+        page.update()
+
+    # 2. 清洗工具页
+    def show_cleaner(e):
+        current_view_status[0] = "tool" # 标记为工具页
+        tools_layout.controls = [
+            # 顶部返回栏 (Top Margin 45)
+            ft.Container(
+                bgcolor=colors["blue"], padding=10, margin=ft.margin.only(top=25, bottom=20),
+                content=ft.Row([
+                    # 【核心修改】：用 Container 包裹 Icon 代替 IconButton
+                    ft.Container(
+                        content=ft.Icon("arrow_back", color="white"),
+                        padding=12, # 增加内边距，扩大点击范围
+                        on_click=show_menu, # 点击事件绑在容器上
+                        border_radius=70, # 圆形点击反馈
+                        ink=True # (可选) 增加点击水波纹效果
+                    ),
+                    ft.Text("百度网盘链接清洗", size=24, color="white", weight="bold")
+                ])
+            ),
+            # 滚动内容
+            ft.Column(expand=True, scroll="hidden", controls=[
+                ft.Container(padding=ft.padding.symmetric(horizontal=20), content=make_card(
+                    ft.ExpansionTile(
+                        title=ft.Text("⚙️ 修改固定话术", size=13, weight="bold", color=colors["sub_text"]),
+                        initially_expanded=False,
+                        tile_padding=ft.padding.only(left=10, right=10, top=0, bottom=0),
+                        controls_padding=ft.padding.only(top=10, bottom=10),
+                        controls=[prefix_field, ft.Container(height=10), suffix_field, ft.Container(height=10), ft.TextButton("恢复默认话术", icon="restore", on_click=restore_defaults)]
+                    ), padding_val=5
+                )),
+                ft.Container(height=5),
+                ft.Container(padding=ft.padding.symmetric(horizontal=20), content=make_card(ft.Column([
+                    ft.Row([ft.Text("  步骤1: 粘贴原始分享文案", size=15, weight="bold", color=colors["text"]),
+                            ft.ElevatedButton("粘贴并处理", icon="paste", on_click=paste_and_clean, height=36, width=140, style=ft.ButtonStyle(padding=0, bgcolor="blue50", color=colors["blue"], elevation=0))
+                    ], alignment="spaceBetween"),
+                    ft.Container(height=5), cleaner_input, # 这里引用不会报错了，因为上面已经定义了
+                    ft.Row([
+                        ft.Row([cleaner_batch_switch, ft.Text("批量模式 (每个链接一条)", size=13, color=colors["sub_text"])], spacing=0),
+                        ft.TextButton("从文件导入", icon="upload_file", on_click=lambda _: share_file_picker.pick_files(allow_multiple=False, allowed_extensions=["txt"]))
+                    ], alignment="spaceBetween")
+                ]))),
+                ft.Container(height=5),
+                ft.Container(padding=ft.padding.symmetric(horizontal=20), content=make_card(ft.Column([
+                    ft.Row([ft.Text("  步骤2: 复制发送", size=15, weight="bold", color=colors["text"]),
+                            ft.Container(content=ft.Text("最终效果 (已加空行)", size=14, color="white", weight="bold", text_align="center"), bgcolor=colors["blue"], height=30, width=140, alignment=ft.alignment.center, padding=ft.padding.symmetric(horizontal=0, vertical=5), border_radius=20)
+                    ], alignment="spaceBetween"),
+                    ft.Container(height=5), cleaner_output
+                ]), border_color=colors["blue"])),
+                ft.Container(height=20)
+            ]),
+            # 底部按钮
+            ft.Container(
+                bgcolor=colors["card"], padding=ft.padding.only(left=20, right=20, top=10, bottom=10),
+                shadow=ft.BoxShadow(blur_radius=10, color="black12", offset=ft.Offset(0, -5)),
+                content=ft.Column([
+                    ft.Container(content=cleaner_feedback, alignment=ft.alignment.center, padding=ft.padding.only(bottom=2)),
+                    ft.ElevatedButton(
+                        content=ft.Row([ft.Icon("rocket_launch", color="white"), ft.Text("一键复制", size=20, weight="bold", color="white")], alignment="center", spacing=5),
+                        on_click=copy_cleaner_result, # 这里引用不会报错了
+                        height=60, width=float("inf"),
+                        style=ft.ButtonStyle(shape=ft.RoundedRectangleBorder(radius=12), bgcolor=colors["blue"], color="white")
+                    )
+                ], spacing=0)
+            )
+        ]
+        page.update()
+
+    # 3. 搬家工具页
+    def show_mover(e):
+        current_view_status[0] = "tool" # 标记为工具页
+        update_move_preview(None)
+        render_history()
+        tools_layout.controls = [
+            # 顶部返回栏 (Top Margin 45)
+            ft.Container(
+                bgcolor=colors["orange"], padding=10, margin=ft.margin.only(top=25, bottom=20),
+                content=ft.Row([
+                    # 【核心修改】：用 Container 包裹 Icon 代替 IconButton
+                    ft.Container(
+                        content=ft.Icon("arrow_back", color="white"),
+                        padding=12, # 增加内边距，扩大点击范围
+                        on_click=show_menu, # 点击事件绑在容器上
+                        border_radius=70, # 圆形点击反馈
+                        ink=True # (可选) 增加点击水波纹效果
+                    ),
+                    ft.Text("搬家助手", size=24, color="white", weight="bold")
+                ])
+            ),
+            ft.Column(expand=True, scroll="hidden", controls=[
+                # 预览卡片 (修复底部空白)
+                ft.Container(padding=ft.padding.symmetric(horizontal=20), content=make_card(ft.Column([
+                    
+                    # 顶部标题栏
+                    ft.Row([
+                        ft.Text("信息预览", size=15, weight="bold", color=colors["text"]), 
+                        ft.ElevatedButton("复制文本", icon="copy", on_click=copy_move_result, height=36, style=ft.ButtonStyle(bgcolor=colors["orange"], color="white"))], alignment="spaceBetween"),
+                    
+                    ft.Container(height=10), # 标题和内容的间距
+                    
+                    # 内容区域
+                    ft.Container(
+                        content=move_preview_text, 
+                        border=ft.border.only(left=ft.border.BorderSide(4, colors["orange"])), 
+                        padding=ft.padding.only(left=15)
+                    ),
+                    
+                    # 【核心修改】：移除之前这里的 Container(height=5)
+                    # 【核心修改】：直接放反馈文字，它会自动紧贴
+                    ft.Container(
+                        content=move_feedback_text, 
+                        alignment=ft.alignment.center,
+                        # 如果有文字显示时，稍微给点上边距；没有文字时高度几乎为0
+                        padding=ft.padding.only(top=5) 
+                    )
+                ], spacing=0))), # 【关键】：显式设置 spacing=0，消除默认的大间距
+                
+                ft.Container(height=1),
+                # 表单
+                # 填写表单
+                ft.Container(padding=ft.padding.symmetric(horizontal=20), content=make_card(ft.Column([
+                    # 【核心修改】：显式添加 spacing=0，消除默认间距
+                    ft.Text("基础信息", size=15, weight="bold", color=colors["sub_text"]),
+                    ft.Container(height=5), 
+                    
+                    # 日期行
+                    ft.Row([date_input, date_button], spacing=5),
+                    ft.Container(height=5), # 现在这里的 5 就是真实的 5px
+                    
+                    # 时间行
+                    ft.Row([time_input, time_button], spacing=5),
+                    ft.Container(height=10), 
+                    
+                    # 帮手切换
+                    helper_switch_row, 
+                    ft.Container(height=15), # 分区大间距
+                    
+                    # 地址栏
+                    ft.Text("地址:  自动 AC", size=15, weight="bold", color=colors["sub_text"]),
+                    ft.Container(height=10),
+                    ft.Row([ft.Icon("location_on", color="green"), start_addr_input]),
+                    start_suggestions,
+                    ft.Container(height=10),
+                    ft.Row([ft.Icon("location_on", color="red"), end_addr_input]),
+                    end_suggestions,
+                    ft.Container(height=15),
+                    
+                    # 价格与趟数
+                    ft.Row([price_input, trips_input], spacing=10),
+                    ft.Container(height=10),
+                    
+                    # 选项
+                    ft.Container(content=is_temp_booking, bgcolor=colors["input_bg"], padding=2, border_radius=8),
+                    ft.Container(height=5),
+                    ft.Container(content=has_big_furniture, bgcolor=colors["input_bg"], padding=2, border_radius=8),
+                ], spacing=2))), # 【注意】：这里加上 spacing=0
+                ft.Container(height=1),
+                # 【新增】：预约记录 (日/周)
+                ft.Container(padding=ft.padding.symmetric(horizontal=20), content=make_card(ft.Column([
+                    ft.Row([
+                        ft.Text("预约记录", size=15, weight="bold", color=colors["sub_text"]),
+                        history_mode_button
+                    ], alignment="spaceBetween"),
+                    ft.Row([
+                        ft.IconButton(icon="chevron_left", icon_color=colors["orange"], on_click=lambda _: shift_history(-1)),
+                        history_label,
+                        ft.IconButton(icon="chevron_right", icon_color=colors["orange"], on_click=lambda _: shift_history(1)),
+                    ], alignment="spaceBetween"),
+                    history_list
+                ], spacing=2))),
+                ft.Container(height=1),
+                # 【新增】：地址缩写 + 批量生成
+                ft.Container(padding=ft.padding.symmetric(horizontal=20), content=make_card(
+                    ft.ExpansionTile(
+                        title=ft.Text("⚙️ 地址缩写 / 批量生成 (CSV)", size=13, weight="bold", color=colors["sub_text"]),
+                        initially_expanded=False,
+                        tile_padding=ft.padding.only(left=10, right=10, top=0, bottom=0),
+                        controls_padding=ft.padding.only(top=10, bottom=10),
+                        controls=[
+                            abbr_field,
+                            ft.TextButton("恢复默认缩写", icon="restore", on_click=restore_default_abbr),
+                            ft.Text("CSV 每行一单：日期, 时间, 起点, 终点, 价格, 趟数, 帮手(1/0), 临时预定(1/0), 大件(1/0)", size=12, color=colors["sub_text"]),
+                            ft.Row([
+                                ft.TextButton("粘贴 CSV", icon="paste", on_click=paste_move_csv),
+                                ft.TextButton("从文件导入", icon="upload_file", on_click=lambda _: move_csv_picker.pick_files(allow_multiple=False, allowed_extensions=["csv", "txt"]))
+                            ], alignment="spaceBetween")
+                        ]
+                    ), padding_val=5
+                )),
+                ft.Container(height=50)
+            ])
+        ]
+        page.update()
+
+    # 切换主题时，当前没显示的工具页里的控件也要换色 (菜单/外框每次打开都会按当前主题重新拼)
+    ctx.theme_roots["tools"] = lambda: [
+        prefix_field, suffix_field, cleaner_input, cleaner_output, cleaner_feedback, cleaner_batch_switch,
+        date_input, date_button, time_input, time_button, start_addr_input, end_addr_input,
+        start_suggestions, end_suggestions, price_input, trips_input, is_temp_booking, has_big_furniture,
+        helper_switch_row, move_preview_text, move_feedback_text,
+        history_label, history_mode_button, history_list, abbr_field,
+    ]
+
+    # 启动显示
+    show_menu()
+    return tools_layout
+    